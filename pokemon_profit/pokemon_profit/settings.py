@@ -32,6 +32,18 @@ load_dotenv()
 TCGAPIS_API_KEY = os.getenv("TCGAPIS_API_KEY")
 POKEMONTCG_API_KEY = os.getenv("POKEMONTCG_API_KEY", "")
 
+# How long each PriceSnapshot tier is kept before `compact_prices` rolls it
+# into the next coarser one (raw -> daily -> weekly -> monthly, kept forever).
+PRICE_RETENTION = {
+    "raw_days": 90,
+    "daily_days": 365,
+    "weekly_days": 365 * 3,
+}
+
+# list views page with keyset cursors; ?per_page= is capped at the max
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -83,6 +95,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL: readers keep reading the last committed data while an
+            # import (e.g. a --shadow swap) holds the write lock
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
     }
 }
 
@@ -1,5 +1,15 @@
 from django.contrib import admin
-from .models import Card, SealedProduct, Purchase, Sale, CatalogItem, PriceSnapshot
+from .models import Card, SealedProduct, Purchase, Sale, CatalogItem, CardCatalog, SetAlias, CatalogSetGroup, PriceSnapshot, PortfolioSummary
+from .services.search import search_filter
+
+
+class CatalogSearchMixin:
+    """Admin search through the catalog search index instead of icontains scans."""
+    search_fields = ("name",)  # shows the search box; get_search_results() does the matching
+
+    def get_search_results(self, request, queryset, search_term):
+        # every match, not a top-N: the changelist counts and pages them itself
+        return queryset.filter(search_filter(self.model, search_term)), False
 
 
 @admin.register(Card)
@@ -20,6 +30,9 @@ class CardAdmin(admin.ModelAdmin):
     list_filter = ("printing",)
     list_select_related = ("catalog_item",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_valuation()
+
 
 @admin.register(SealedProduct)
 class SealedProductAdmin(admin.ModelAdmin):
@@ -37,6 +50,9 @@ class SealedProductAdmin(admin.ModelAdmin):
     search_fields = ("name", "set_name")
     list_select_related = ("catalog_item",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_valuation()
+
 
 @admin.register(Purchase)
 class PurchaseAdmin(admin.ModelAdmin):
@@ -70,5 +86,42 @@ class SaleAdmin(admin.ModelAdmin):
         return obj.card or obj.sealed_product
 
 
-admin.site.register(CatalogItem)
+@admin.register(CatalogItem)
+class CatalogItemAdmin(CatalogSearchMixin, admin.ModelAdmin):
+    list_display = ("name", "card_number", "printing", "is_sealed", "product_id", "latest_market")
+    list_filter = ("is_sealed",)
+
+
+@admin.register(CardCatalog)
+class CardCatalogAdmin(CatalogSearchMixin, admin.ModelAdmin):
+    list_display = ("name", "set_name", "number", "rarity", "catalog_id")
+
+
+@admin.register(SetAlias)
+class SetAliasAdmin(admin.ModelAdmin):
+    list_display = ("alias", "set_id")
+    search_fields = ("alias", "set_id")
+
+
+@admin.register(CatalogSetGroup)
+class CatalogSetGroupAdmin(admin.ModelAdmin):
+    list_display = ("group_id", "set_id", "shared")
+    search_fields = ("set_id",)
+
+
 admin.site.register(PriceSnapshot)
+
+
+@admin.register(PortfolioSummary)
+class PortfolioSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "cards_count",
+        "sealed_count",
+        "total_spent",
+        "total_sales",
+        "realized_profit",
+        "unrealized_profit",
+        "updated_at",
+    )
+    list_select_related = ("user",)
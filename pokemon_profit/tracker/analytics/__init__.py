@@ -0,0 +1,39 @@
+"""
+Vectorized price analytics over PriceSnapshot (and PriceRollup) history.
+
+History is bulk-loaded into flat NumPy arrays grouped by item (see
+PriceHistory); every metric is computed for all items at once.
+"""
+import math
+from datetime import datetime
+
+from .engine import PriceHistory, load_history, compute_metrics, rolling_mean, log_returns, drawdowns
+
+__all__ = [
+    "PriceHistory",
+    "load_history",
+    "compute_metrics",
+    "rolling_mean",
+    "log_returns",
+    "drawdowns",
+    "catalog_metrics",
+]
+
+
+def catalog_metrics(*, item_ids=None, since: datetime | None = None, window: int = 7) -> dict[int, dict]:
+    """
+    { item_id: {points, first, last, total_return, mean_return, volatility,
+    rolling_mean, max_drawdown} } for every item with price history.
+    Undefined values (e.g. volatility from a single point) are None.
+    """
+    metrics = compute_metrics(load_history(item_ids=item_ids, since=since), window=window)
+    names = [k for k in metrics if k != "item_id"]
+    columns = [metrics[k].tolist() for k in names]
+
+    out = {}
+    for i, item_id in enumerate(metrics["item_id"].tolist()):
+        out[item_id] = {
+            name: (None if isinstance(col[i], float) and math.isnan(col[i]) else col[i])
+            for name, col in zip(names, columns)
+        }
+    return out
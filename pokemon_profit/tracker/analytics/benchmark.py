@@ -0,0 +1,50 @@
+import time
+
+import numpy as np
+
+from .engine import PriceHistory, compute_metrics
+
+
+def synthetic_history(rows: int, items: int, *, seed: int = 0) -> PriceHistory:
+    """
+    A deterministic random-walk history of about `rows` points spread
+    unevenly over `items` items, one point per day.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.random(items) + 0.1
+    lengths = np.maximum(1, (weights / weights.sum() * rows).astype(np.int64))
+    offsets = np.r_[0, np.cumsum(lengths)]
+    total = int(offsets[-1])
+
+    steps = rng.normal(0.0, 0.02, total)
+    steps[offsets[:-1]] = np.log(rng.uniform(0.5, 500.0, items))
+    seg = np.repeat(np.arange(items), lengths)
+    # restart the cumulative walk at every item boundary
+    cs = np.cumsum(steps)
+    base = np.r_[0.0, cs[offsets[1:-1] - 1]]
+    prices = np.exp(cs - base[seg])
+
+    day = np.arange(total) - np.repeat(offsets[:-1], lengths)
+    times = 1_600_000_000 + day * 86_400
+    return PriceHistory(
+        item_ids=np.arange(1, items + 1, dtype=np.int64),
+        offsets=offsets.astype(np.int64),
+        times=times.astype(np.int64),
+        prices=prices,
+    )
+
+
+def run_benchmark(rows: int = 5_000_000, items: int = 20_000, *, window: int = 7, repeat: int = 3) -> dict:
+    """Times compute_metrics over a synthetic history; reports the best run."""
+    history = synthetic_history(rows, items)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        compute_metrics(history, window=window)
+        best = min(best, time.perf_counter() - t0)
+    return {
+        "rows": len(history),
+        "items": items,
+        "seconds": best,
+        "rows_per_sec": len(history) / best if best else float("inf"),
+    }
@@ -0,0 +1,194 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+
+import numpy as np
+
+from tracker.models import PriceRollup, PriceSnapshot
+from tracker.services.price_history import period_end
+
+LOAD_CHUNK = 50_000
+
+
+@dataclass
+class PriceHistory:
+    """
+    Price history for many CatalogItems in flat, contiguous arrays.
+
+    Rows are sorted by (item, time). Item k owns rows
+    offsets[k]:offsets[k + 1] of `times` / `prices`.
+    """
+    item_ids: np.ndarray  # int64, one per item
+    offsets: np.ndarray   # int64, len(item_ids) + 1
+    times: np.ndarray     # int64 epoch seconds
+    prices: np.ndarray    # float64
+
+    @classmethod
+    def from_rows(cls, item_ids, times, prices) -> "PriceHistory":
+        """Build from per-row arrays already sorted by (item, time)."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, item_ids[1:] != item_ids[:-1]]) if len(item_ids) else np.empty(0, np.int64)
+        return cls(
+            item_ids=item_ids[starts],
+            offsets=np.r_[starts, len(item_ids)].astype(np.int64),
+            times=np.asarray(times, dtype=np.int64),
+            prices=np.asarray(prices, dtype=np.float64),
+        )
+
+    def __len__(self):
+        return len(self.prices)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def series(self, item_id: int) -> tuple[np.ndarray, np.ndarray]:
+        k = np.searchsorted(self.item_ids, item_id)
+        if k == len(self.item_ids) or self.item_ids[k] != item_id:
+            return np.empty(0, np.int64), np.empty(0, np.float64)
+        a, b = self.offsets[k], self.offsets[k + 1]
+        return self.times[a:b], self.prices[a:b]
+
+
+def _rollup_rows(item_ids, since: datetime | None) -> list[tuple]:
+    """
+    (item_id, epoch seconds, close) for the PriceRollup bars compact_prices
+    left in place of raw snapshots; each bar counts as one point at the
+    start of its bucket.
+    """
+    qs = PriceRollup.objects.filter(close__gt=0)
+    if item_ids is not None:
+        qs = qs.filter(item_id__in=list(item_ids))
+    if since is not None:
+        # a monthly bar can start up to a month before the bucket holding `since` ends
+        qs = qs.filter(period_start__gte=since.date() - timedelta(days=31))
+    rows = qs.values_list("item_id", "period", "period_start", "close")
+    return [
+        (item_id, int(datetime.combine(start, time.min, tzinfo=timezone.utc).timestamp()), float(close))
+        for item_id, period, start, close in rows.iterator(chunk_size=LOAD_CHUNK)
+        if since is None or period_end(period, start) >= since.date()
+    ]
+
+
+def load_history(*, item_ids=None, since: datetime | None = None, field: str = "market") -> PriceHistory:
+    """
+    Bulk-loads PriceSnapshot history into a PriceHistory. Rows with a missing
+    or non-positive price are dropped (returns are taken in log space).
+    Market history older than the raw snapshots is read from the rollups
+    compact_prices wrote, one point per bar; other fields are not rolled up.
+    """
+    qs = PriceSnapshot.objects.filter(**{f"{field}__gt": 0})
+    if item_ids is not None:
+        qs = qs.filter(item_id__in=list(item_ids))
+    if since is not None:
+        qs = qs.filter(captured_at__gte=since)
+
+    rollups = _rollup_rows(item_ids, since) if field == "market" else []
+    n = qs.count()
+    ids = np.empty(n + len(rollups), dtype=np.int64)
+    times = np.empty(n + len(rollups), dtype=np.int64)
+    prices = np.empty(n + len(rollups), dtype=np.float64)
+
+    i = 0
+    rows = qs.order_by("item_id", "captured_at").values_list("item_id", "captured_at", field)
+    for item_id, captured_at, price in rows.iterator(chunk_size=LOAD_CHUNK):
+        if i == n:  # rows inserted since the count
+            break
+        ids[i] = item_id
+        times[i] = int(captured_at.timestamp())
+        prices[i] = price
+        i += 1
+
+    if not rollups:
+        return PriceHistory.from_rows(ids[:i], times[:i], prices[:i])
+
+    k = i + len(rollups)
+    ids[i:k], times[i:k], prices[i:k] = zip(*rollups)
+    order = np.lexsort((times[:k], ids[:k]))
+    return PriceHistory.from_rows(ids[order], times[order], prices[order])
+
+
+def _segment_ids(history: PriceHistory) -> np.ndarray:
+    return np.repeat(np.arange(len(history.item_ids)), history.lengths)
+
+
+def rolling_mean(history: PriceHistory, window: int) -> np.ndarray:
+    """Trailing mean over the last `window` rows of each item, for every row."""
+    p = history.prices
+    if not len(p):
+        return np.empty(0)
+    cs = np.r_[0.0, np.cumsum(p)]
+    idx = np.arange(len(p))
+    seg_start = np.repeat(history.offsets[:-1], history.lengths)
+    lo = np.maximum(seg_start, idx - window + 1)
+    return (cs[idx + 1] - cs[lo]) / (idx + 1 - lo)
+
+
+def log_returns(history: PriceHistory) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row log return vs. the previous row of the same item.
+    Returns (returns, valid) where valid is False on each item's first row.
+    """
+    p = history.prices
+    r = np.zeros(len(p))
+    if len(p) > 1:
+        r[1:] = np.log(p[1:] / p[:-1])
+    valid = np.ones(len(p), dtype=bool)
+    valid[history.offsets[:-1][history.lengths > 0]] = False
+    r[~valid] = 0.0
+    return r, valid
+
+
+def drawdowns(history: PriceHistory) -> np.ndarray:
+    """Per-row drawdown from the item's running peak (0 at a new high)."""
+    p = history.prices
+    if not len(p):
+        return np.empty(0)
+    seg = _segment_ids(history)
+    seg_max = np.maximum.reduceat(p, history.offsets[:-1])
+    q = p / np.repeat(seg_max, history.lengths)  # (0, 1] within each item
+    # offsetting each item by its index keeps one cumulative max from
+    # leaking across item boundaries
+    peak = np.maximum.accumulate(seg + 0.5 * q) - seg
+    return q / (2 * peak) - 1
+
+
+def compute_metrics(history: PriceHistory, *, window: int = 7) -> dict[str, np.ndarray]:
+    """
+    Vectorized per-item metrics, aligned with history.item_ids:
+    points, first, last, total_return, mean_return, volatility (std of log
+    returns), rolling_mean (last `window` points) and max_drawdown.
+    """
+    n_items = len(history.item_ids)
+    if not len(history):
+        empty = np.empty(0)
+        return {
+            "item_id": history.item_ids, "points": np.empty(0, np.int64), "first": empty, "last": empty,
+            "total_return": empty, "mean_return": empty, "volatility": empty,
+            "rolling_mean": empty, "max_drawdown": empty,
+        }
+
+    starts = history.offsets[:-1]
+    ends = history.offsets[1:] - 1
+    p = history.prices
+    points = history.lengths
+
+    r, valid = log_returns(history)
+    n_ret = points - 1
+    sum_r = np.add.reduceat(r, starts)
+    sum_r2 = np.add.reduceat(r * r, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_r = np.where(n_ret > 0, sum_r / n_ret, np.nan)
+        var = np.where(n_ret > 1, (sum_r2 - n_ret * mean_r ** 2) / (n_ret - 1), np.nan)
+    volatility = np.sqrt(np.maximum(var, 0.0))
+
+    return {
+        "item_id": history.item_ids,
+        "points": points,
+        "first": p[starts],
+        "last": p[ends],
+        "total_return": p[ends] / p[starts] - 1,
+        "mean_return": mean_r,
+        "volatility": np.where(np.isnan(var), np.nan, volatility),
+        "rolling_mean": rolling_mean(history, window)[ends],
+        "max_drawdown": np.minimum.reduceat(drawdowns(history), starts) if n_items else np.empty(0),
+    }
@@ -0,0 +1,22 @@
+"""
+Synthetic large-portfolio data and an end-to-end benchmark suite.
+
+`seed_benchmark_data` fills the database from a SeedConfig; `run_benchmarks`
+times every view and the import/linking commands against it and writes a
+JSON report that can be compared with a saved baseline.
+"""
+from .seed import SeedConfig, seed_benchmark_data, reset_benchmark_data, write_tcgcsv
+from .suite import Case, run_case, run_suite, view_cases, command_cases, compare
+
+__all__ = [
+    "SeedConfig",
+    "seed_benchmark_data",
+    "reset_benchmark_data",
+    "write_tcgcsv",
+    "Case",
+    "run_case",
+    "run_suite",
+    "view_cases",
+    "command_cases",
+    "compare",
+]
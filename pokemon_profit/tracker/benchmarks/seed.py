@@ -0,0 +1,283 @@
+import csv
+import random
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracker.models import (
+    Card, SealedProduct, Purchase, Sale, LotMatch, MarketPrice, CatalogItem, PriceSnapshot, PriceRollup,
+    PortfolioSummary, PortfolioValuePoint, CatalogCrossRef, CatalogSetGroup, money,
+)
+from tracker.services.lots import rebuild_lots
+from tracker.services.portfolio import rebuild_summary, refresh_valuations
+
+# Seeded rows live in their own id ranges so they can be told apart from
+# real data and dropped again with `seed_benchmark_data --reset`.
+USERNAME_PREFIX = "bench_user_"
+PRODUCT_BASE = 900_000_000
+GROUP_BASE = 900_000
+CSV_PRODUCT_BASE = 950_000_000
+WRITE_BATCH = 5000
+
+SPECIES = [
+    "Bulbasaur", "Charmander", "Squirtle", "Pikachu", "Eevee", "Snorlax", "Gengar", "Dragonite",
+    "Mewtwo", "Mew", "Lucario", "Gardevoir", "Umbreon", "Sylveon", "Rayquaza", "Greninja",
+    "Charizard", "Blastoise", "Venusaur", "Gyarados", "Lapras", "Tyranitar", "Garchomp", "Togekiss",
+]
+SUFFIXES = ["", " ex", " V", " VMAX", " VSTAR", " GX"]
+PRINTINGS = ["Normal", "Holofoil", "Reverse Holofoil"]
+SEALED_KINDS = ["Booster Pack", "Booster Box", "Elite Trainer Box", "Booster Bundle", "Collection Box"]
+PLATFORMS = ["eBay", "TCGplayer", "Local", "Facebook"]
+TCGCSV_HEADER = [
+    "productId", "name", "cleanName", "imageUrl", "categoryId", "groupId", "url", "modifiedOn",
+    "imageCount", "lowPrice", "midPrice", "highPrice", "marketPrice", "directLowPrice",
+    "subTypeName", "extNumber", "extRarity",
+]
+
+
+@dataclass
+class SeedConfig:
+    users: int = 5
+    items: int = 2000
+    sealed_items: int = 200
+    sets: int = 20
+    days: int = 730
+    snapshot_every: int = 1
+    cards_per_user: int = 400
+    sealed_per_user: int = 40
+    purchases_per_holding: int = 3
+    sell_ratio: float = 0.3
+    unlinked_ratio: float = 0.2
+    seed: int = 0
+
+
+@dataclass
+class _Item:
+    product_id: int
+    name: str
+    set_name: str
+    card_number: str
+    printing: str
+    is_sealed: bool
+    prices: list  # one Decimal per day, oldest first
+    pk: int | None = None
+
+
+def _price_path(rng: random.Random, days: int) -> list:
+    p = rng.uniform(0.25, 400.0)
+    path = []
+    for _ in range(days):
+        p = max(0.05, p * (1 + rng.gauss(0.0003, 0.02)))
+        path.append(money(Decimal(p)))
+    return path
+
+
+def _catalog(rng: random.Random, cfg: SeedConfig) -> list[_Item]:
+    items = []
+    set_names = [f"Benchmark Set {i + 1:02d}" for i in range(cfg.sets)]
+    numbers = [0] * cfg.sets
+    for i in range(cfg.items):
+        s = i % cfg.sets
+        is_sealed = i < cfg.sealed_items
+        if is_sealed:
+            name = f"{set_names[s]} {rng.choice(SEALED_KINDS)}"
+            number, printing = "", "Normal"
+        else:
+            numbers[s] += 1
+            name = f"{rng.choice(SPECIES)}{rng.choice(SUFFIXES)}"
+            number, printing = f"{numbers[s]:03d}", rng.choice(PRINTINGS)
+        items.append(_Item(
+            product_id=PRODUCT_BASE + i, name=name, set_name=set_names[s], card_number=number,
+            printing=printing, is_sealed=is_sealed, prices=_price_path(rng, cfg.days),
+        ))
+    set_size = {s: n for s, n in zip(set_names, numbers)}
+    for item in items:
+        if item.card_number:
+            item.card_number = f"{item.card_number}/{set_size[item.set_name]:03d}"
+    return items
+
+
+def _insert_catalog(items: list[_Item], cfg: SeedConfig, first_day, log) -> None:
+    set_index = {name: i for i, name in enumerate(sorted({i.set_name for i in items}))}
+    CatalogItem.objects.bulk_create([
+        CatalogItem(
+            product_id=i.product_id, group_id=GROUP_BASE + set_index[i.set_name], category_id=3,
+            name=i.name, card_number=i.card_number, printing=i.printing, is_sealed=i.is_sealed,
+            **CatalogItem.match_keys_for(name=i.name, card_number=i.card_number),
+        )
+        for i in items
+    ], batch_size=WRITE_BATCH)
+    pks = dict(CatalogItem.objects.filter(product_id__gte=PRODUCT_BASE).values_list("product_id", "pk"))
+    for i in items:
+        i.pk = pks[i.product_id]
+
+    days = range(0, cfg.days, cfg.snapshot_every)
+    if cfg.days and days[-1] != cfg.days - 1:
+        days = [*days, cfg.days - 1]  # always end on the last day
+    stamps = [timezone.make_aware(datetime.combine(first_day + timedelta(days=d), time(12))) for d in days]
+
+    batch, written = [], 0
+    for i in items:
+        for d, at in zip(days, stamps):
+            p = i.prices[d]
+            batch.append(PriceSnapshot(
+                item_id=i.pk, captured_at=at, market=p, mid=money(p * Decimal("0.95")),
+                low=money(p * Decimal("0.85")), high=money(p * Decimal("1.4")), source="benchmark",
+            ))
+        if len(batch) >= WRITE_BATCH:
+            PriceSnapshot.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    PriceSnapshot.objects.bulk_create(batch)
+    written += len(batch)
+    log(f"  {len(items)} catalog items, {written} price snapshots")
+
+    # bulk_create skips PriceSnapshot.save(); every item's newest snapshot
+    # shares the last stamp, so the latest_* columns come from one query.
+    latest = {s.item_id: s for s in PriceSnapshot.objects.filter(item_id__in=pks.values(), captured_at=stamps[-1])}
+    rows = []
+    for item_id, snap in latest.items():
+        row = CatalogItem(pk=item_id)
+        for name, value in PriceSnapshot.latest_fields(snap).items():
+            setattr(row, name, value)
+        rows.append(row)
+    CatalogItem.objects.bulk_update(rows, list(PriceSnapshot.latest_fields(None)), batch_size=WRITE_BATCH)
+
+
+def _seed_user(rng: random.Random, cfg: SeedConfig, n: int, singles, sealed_items, first_day) -> tuple[int, int, int]:
+    user = get_user_model().objects.create_user(f"{USERNAME_PREFIX}{n:03d}", password="benchmark")
+
+    def linked(item):
+        return None if rng.random() < cfg.unlinked_ratio else item.pk
+
+    owned_singles = rng.sample(singles, min(cfg.cards_per_user, len(singles)))
+    owned_sealed = rng.sample(sealed_items, min(cfg.sealed_per_user, len(sealed_items)))
+    cards = Card.objects.bulk_create([
+        Card(
+            user=user, name=i.name, set_name=i.set_name, card_number=i.card_number, printing=i.printing,
+            catalog_item_id=linked(i),
+        )
+        for i in owned_singles
+    ], batch_size=WRITE_BATCH)
+    sealed = SealedProduct.objects.bulk_create([
+        SealedProduct(user=user, name=i.name, set_name=i.set_name, quantity=rng.randint(1, 6), catalog_item_id=linked(i))
+        for i in owned_sealed
+    ], batch_size=WRITE_BATCH)
+
+    purchases, sales = [], []
+    holdings = [({"card_id": c.pk}, i) for c, i in zip(cards, owned_singles)]
+    holdings += [({"sealed_product_id": s.pk}, i) for s, i in zip(sealed, owned_sealed)]
+    sold = []
+    for owner, item in holdings:
+        bought = []
+        for _ in range(rng.randint(1, 2 * cfg.purchases_per_holding - 1)):
+            d = rng.randrange(cfg.days)
+            qty = rng.randint(1, 3)
+            each = money(item.prices[d] * Decimal(rng.uniform(0.85, 1.1)))
+            purchases.append(Purchase(user=user, date=first_day + timedelta(days=d), quantity=qty, price_each=each, **owner))
+            bought.append((d, qty))
+        if rng.random() < cfg.sell_ratio:
+            first = min(d for d, _ in bought)
+            units = sum(q for _, q in bought)
+            for _ in range(rng.randint(1, units)):
+                d = rng.randrange(first, cfg.days)
+                price = money(item.prices[d] * Decimal(rng.uniform(0.9, 1.2)))
+                sales.append(Sale(user=user, date=first_day + timedelta(days=d), price=price, platform=rng.choice(PLATFORMS), **owner))
+            sold.append(owner)
+
+    Purchase.objects.bulk_create(purchases, batch_size=WRITE_BATCH)
+    Sale.objects.bulk_create(sales, batch_size=WRITE_BATCH)
+
+    # bulk_create bypasses the signals; derive what they would have
+    for owner in sold:
+        rebuild_lots(**owner)
+    refresh_valuations([c.pk for c in cards], [s.pk for s in sealed])
+    rebuild_summary(user.pk)
+    return len(cards) + len(sealed), len(purchases), len(sales)
+
+
+def seed_benchmark_data(cfg: SeedConfig, *, log=print) -> None:
+    """
+    Deterministically generates a large synthetic dataset: a catalog with
+    `cfg.days` of daily price history, and `cfg.users` users holding cards
+    and sealed products with purchases and sales spread over that window.
+    The history ends today. The same config always yields the same rows.
+    """
+    rng = random.Random(cfg.seed)
+    first_day = timezone.localdate() - timedelta(days=cfg.days - 1)
+
+    items = _catalog(rng, cfg)
+    with transaction.atomic():
+        _insert_catalog(items, cfg, first_day, log)
+
+    singles = [i for i in items if not i.is_sealed]
+    sealed_items = [i for i in items if i.is_sealed]
+    for n in range(cfg.users):
+        with transaction.atomic():
+            holdings, purchases, sales = _seed_user(rng, cfg, n, singles, sealed_items, first_day)
+        log(f"  {USERNAME_PREFIX}{n:03d}: {holdings} holdings, {purchases} purchases, {sales} sales")
+
+
+def _delete(qs) -> int:
+    """DELETE ... WHERE pk IN (qs) in one statement, without the ORM's per-row collection and signals."""
+    qn = connection.ops.quote_name
+    sql, params = qs.values("pk").query.sql_with_params()
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {qn(qs.model._meta.db_table)} WHERE {qn(qs.model._meta.pk.column)} IN ({sql})", params)
+        return cur.rowcount
+
+
+def reset_benchmark_data(*, log=print) -> None:
+    """
+    Drops everything seed_benchmark_data created, and what later imports
+    derived from it (cross-references, set groups). The bulk tables are
+    deleted without signals: the owning users and items go too, so there
+    is nothing left to keep in sync.
+    """
+    users = get_user_model().objects.filter(username__startswith=USERNAME_PREFIX)
+    items = CatalogItem.objects.filter(product_id__gte=PRODUCT_BASE)
+    with transaction.atomic():
+        for model, owner in (
+            (LotMatch, "sale__user__in"), (Sale, "user__in"), (Purchase, "user__in"),
+            (MarketPrice, "card__user__in"), (MarketPrice, "sealed_product__user__in"),
+            (PortfolioValuePoint, "user__in"), (PortfolioSummary, "user__in"),
+            (Card, "user__in"), (SealedProduct, "user__in"),
+        ):
+            _delete(model.objects.filter(**{owner: users}))
+        deleted_users, _ = users.delete()
+
+        # real holdings may have been linked to seeded items
+        Card.objects.filter(catalog_item__in=items).update(catalog_item=None)
+        SealedProduct.objects.filter(catalog_item__in=items).update(catalog_item=None)
+        items.update(latest_snapshot=None)
+        groups = set(items.values_list("group_id", flat=True)) - set(
+            CatalogItem.objects.exclude(pk__in=items).values_list("group_id", flat=True).distinct()
+        )
+        _delete(CatalogSetGroup.objects.filter(group_id__in=groups))
+        for model in (PriceSnapshot, PriceRollup, CatalogCrossRef):
+            _delete(model.objects.filter(item__in=items))
+        deleted_items = _delete(items)
+    log(f"  removed {deleted_users} users and {deleted_items} catalog items")
+
+
+def write_tcgcsv(path, rows: int, *, seed: int = 0) -> None:
+    """A synthetic TCGCSV export of `rows` products for import benchmarks."""
+    rng = random.Random(seed)
+    modified = timezone.now().replace(microsecond=0, tzinfo=None).isoformat()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(TCGCSV_HEADER)
+        for i in range(rows):
+            sealed = i % 10 == 0
+            name = f"Benchmark {rng.choice(SEALED_KINDS)}" if sealed else f"{rng.choice(SPECIES)}{rng.choice(SUFFIXES)}"
+            market = rng.uniform(0.25, 400.0)
+            w.writerow([
+                CSV_PRODUCT_BASE + i, name, name, "", 3, GROUP_BASE + i % 20, "", modified, 1,
+                f"{market * 0.85:.2f}", f"{market * 0.95:.2f}", f"{market * 1.4:.2f}", f"{market:.2f}", "",
+                "Normal" if sealed else rng.choice(PRINTINGS), "" if sealed else f"{i % 250 + 1:03d}/250",
+                "" if sealed else "Common",
+            ])
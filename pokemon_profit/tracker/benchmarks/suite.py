@@ -0,0 +1,175 @@
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from io import StringIO
+from typing import Callable
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from tracker import urls as tracker_urls
+from tracker.models import Card, SealedProduct, Purchase, Sale, CatalogItem, PriceSnapshot, CardCatalog
+
+# url name prefix -> model whose first row fills the <int:pk> of edit/delete views
+PK_MODELS = {"card": Card, "sealed": SealedProduct, "purchase": Purchase, "sale": Sale}
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable
+    setup: Callable | None = None
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def _rolled_back():
+    """Every case starts from the same database: its writes are undone afterwards."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def _measure(case: Case, *, memory: bool) -> dict:
+    counter = _QueryCounter()
+    with _rolled_back():
+        if case.setup:
+            case.setup()
+        if memory:
+            tracemalloc.start()
+        try:
+            with connection.execute_wrapper(counter):
+                t0 = time.perf_counter()
+                # deferred refreshes are part of the cost; run them in the rollback
+                with TestCase.captureOnCommitCallbacks(execute=True):
+                    out = case.run()
+                seconds = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] if memory else None
+        finally:
+            if memory:
+                tracemalloc.stop()
+    return {"seconds": seconds, "queries": counter.count, "peak_bytes": peak, "status": getattr(out, "status_code", None)}
+
+
+def run_case(case: Case, *, repeat: int = 3, memory: bool = True) -> dict:
+    """
+    Best wall time and query count over `repeat` runs. Peak Python memory
+    (tracemalloc) comes from one extra run so tracing does not skew timings.
+    """
+    runs = [_measure(case, memory=False) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["seconds"])
+    result = {
+        "seconds": best["seconds"],
+        "runs": [r["seconds"] for r in runs],
+        "queries": best["queries"],
+        "peak_kb": None,
+    }
+    if best["status"] is not None:
+        result["status"] = best["status"]
+    if memory:
+        result["peak_kb"] = round(_measure(case, memory=True)["peak_bytes"] / 1024)
+    return result
+
+
+def view_cases(user) -> list[Case]:
+    """One GET per tracker URL, as `user`, plus a sorted deep list page."""
+    client = Client()
+    first_pk = {
+        prefix: model.objects.filter(user=user).order_by("pk").values_list("pk", flat=True).first()
+        for prefix, model in PK_MODELS.items()
+    }
+
+    cases = []
+    for pattern in tracker_urls.urlpatterns:
+        kwargs = {}
+        if "pk" in pattern.pattern.converters:
+            kwargs["pk"] = first_pk.get(pattern.name.split("_")[0])
+            if kwargs["pk"] is None:
+                continue
+        url = reverse(pattern.name, kwargs=kwargs)
+        cases.append(Case(f"view:{pattern.name}", lambda url=url: client.get(url), lambda: client.force_login(user)))
+
+    url = reverse("card_list") + "?sort=-market&per_page=500"
+    cases.append(Case("view:card_list:sorted", lambda: client.get(url), lambda: client.force_login(user)))
+    return cases
+
+
+def command_cases(*, tcgcsv_path=None, catalog_zip=None, catalog_limit: int = 0) -> list[Case]:
+    cases = []
+    if tcgcsv_path:
+        cases.append(Case("command:import_tcgcsv", lambda: call_command("import_tcgcsv", str(tcgcsv_path), stdout=StringIO())))
+    if catalog_zip:
+        cases.append(Case("command:import_catalog", lambda: call_command(
+            "import_catalog", str(catalog_zip), limit=catalog_limit, stdout=StringIO(),
+        )))
+    cases.append(Case("command:auto_link_owned", lambda: call_command("auto_link_owned", force=True, stdout=StringIO())))
+    return cases
+
+
+def dataset_info() -> dict:
+    return {
+        "users": get_user_model().objects.count(),
+        "catalog_items": CatalogItem.objects.count(),
+        "price_snapshots": PriceSnapshot.objects.count(),
+        "card_catalog": CardCatalog.objects.count(),
+        "cards": Card.objects.count(),
+        "sealed_products": SealedProduct.objects.count(),
+        "purchases": Purchase.objects.count(),
+        "sales": Sale.objects.count(),
+    }
+
+
+def run_suite(cases: list[Case], *, repeat: int = 3, memory: bool = True, log=print) -> dict:
+    """Runs every case and returns a JSON-serializable report."""
+    report = {
+        "meta": {
+            "started_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": repeat,
+            "dataset": dataset_info(),
+        },
+        "cases": {},
+    }
+    # the test client needs its host allowed like any other request
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for case in cases:
+            result = run_case(case, repeat=repeat, memory=memory)
+            report["cases"][case.name] = result
+            log(f"  {case.name}: {result['seconds'] * 1000:.1f} ms, {result['queries']} queries"
+                + (f", peak {result['peak_kb']} KiB" if result["peak_kb"] is not None else ""))
+    return report
+
+
+def compare(report: dict, baseline: dict, *, tolerance: float = 0.2) -> list[dict]:
+    """
+    Cases slower than the baseline by more than `tolerance` (a fraction), or
+    issuing more queries. Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, now in report["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        if now["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append({"case": name, "metric": "seconds", "baseline": base["seconds"], "current": now["seconds"]})
+        if now["queries"] > base["queries"]:
+            regressions.append({"case": name, "metric": "queries", "baseline": base["queries"], "current": now["queries"]})
+    return regressions
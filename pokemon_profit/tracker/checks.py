@@ -0,0 +1,24 @@
+from django.core.checks import Tags, Warning, register
+
+from tracker.services.search import missing_search_triggers
+
+
+@register(Tags.database)
+def search_triggers_check(app_configs, databases=None, **kwargs):
+    """
+    The catalog search index is only kept in sync by triggers, and SQLite
+    drops them whenever a migration rebuilds tracker_catalogitem or
+    tracker_cardcatalog (most AddField/AlterField operations). A warning,
+    not an error, so `migrate` can still apply the migration that fixes it.
+    """
+    errors = []
+    for alias in databases or ():
+        missing = missing_search_triggers(alias)
+        if missing:
+            errors.append(Warning(
+                f"Catalog search triggers missing on {alias!r}: {', '.join(missing)}.",
+                hint="Add a migration recreating them after the one that changed the table "
+                     "(see 0027_restore_search_triggers), then run rebuild_search_index.",
+                id="tracker.W001",
+            ))
+    return errors
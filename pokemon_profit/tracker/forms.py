@@ -1,23 +1,61 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from .models import Card, SealedProduct, Purchase, Sale, CatalogItem
 
+
+class CatalogSelect(forms.Select):
+    """
+    A catalog <select> that renders only the selected option (one indexed
+    lookup) instead of the whole catalog. catalog_autocomplete.js adds a
+    search box that fills in options from the catalog_autocomplete view.
+    """
+
+    class Media:
+        js = ["tracker/js/catalog_autocomplete.js"]
+
+    def __init__(self, kind: str, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def get_context(self, name, value, attrs):
+        attrs = {**(attrs or {}), "data-autocomplete": reverse_lazy("catalog_autocomplete"), "data-kind": self.kind}
+        return super().get_context(name, value, attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        iterator = self.choices
+        selected = [v for v in value if v not in ("", None)]
+        try:
+            objs = list(iterator.queryset.filter(pk__in=selected)) if selected else []
+        except (ValueError, ValidationError):  # a mangled POST value
+            objs = []
+        self.choices = [("", iterator.field.empty_label or "")] + [iterator.choice(obj) for obj in objs]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = iterator
+
+
 class CardForm(forms.ModelForm):
     class Meta:
         model = Card
-        fields = ["name", "set_name", "card_number", "printing", "condition", "catalog", "catalog_id_str", "catalog_item"]
-        
+        fields = ["name", "set_name", "card_number", "printing", "condition", "catalog", "catalog_id_str", "catalog_item", "cost_basis_method"]
+        widgets = {"catalog": CatalogSelect("card"), "catalog_item": CatalogSelect("single")}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Only show card items (not sealed)
-        self.fields["catalog_item"].queryset = CatalogItem.objects.filter(is_sealed=False).order_by("name")
+        # Only accept card items (not sealed)
+        self.fields["catalog_item"].queryset = CatalogItem.objects.filter(is_sealed=False)
 
 class SealedProductForm(forms.ModelForm):
     class Meta:
         model = SealedProduct
-        fields = ["name", "set_name", "quantity", "catalog_item"]
+        fields = ["name", "set_name", "quantity", "catalog_item", "cost_basis_method"]
+        widgets = {"catalog_item": CatalogSelect("sealed")}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields["catalog_item"].queryset = CatalogItem.objects.filter(is_sealed=True).order_by("name")
+        self.fields["catalog_item"].queryset = CatalogItem.objects.filter(is_sealed=True)
 
 class PurchaseForm(forms.ModelForm):
     class Meta:
@@ -36,7 +74,7 @@ class PurchaseForm(forms.ModelForm):
 class SaleForm(forms.ModelForm):
     class Meta:
         model = Sale
-        fields = ["date", "card", "sealed_product", "price", "platform"]
+        fields = ["date", "card", "sealed_product", "price", "platform", "lot"]
         widgets = {"date": forms.DateInput(attrs={"type": "date"})}
     
     def clean(self):
@@ -45,5 +83,11 @@ class SaleForm(forms.ModelForm):
         sealed = cleaned.get("sealed_product")
         if (card is None and sealed is None) or (card is not None and sealed is not None):
             raise forms.ValidationError("Select either a Card or a Sealed Product (not both).")
+        lot = cleaned.get("lot")
+        if lot is not None:
+            if (lot.card_id, lot.sealed_product_id) != (getattr(card, "pk", None), getattr(sealed, "pk", None)):
+                self.add_error("lot", "That purchase is not of this card or sealed product.")
+            elif cleaned.get("date") and lot.date > cleaned["date"]:
+                self.add_error("lot", "That purchase is dated after the sale.")
         return cleaned
 
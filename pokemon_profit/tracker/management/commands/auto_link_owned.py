@@ -1,22 +1,9 @@
-import re
 from django.core.management.base import BaseCommand
-from tracker.models import Card, SealedProduct, CatalogItem
-
-def norm(s: str) -> str:
-    s = (s or "").lower().strip()
-    s = s.replace("&", "and")
-    s = re.sub(r"[^a-z0-9\s]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-def tokens(s: str) -> set[str]:
-    t = set(norm(s).split())
-    # remove very common junk words
-    stop = {"the", "and", "of", "a", "an", "tcg", "pokemon", "pokémon", "sv", "scarlet", "violet"}
-    return {w.rstrip("s") for w in t if w not in stop and len(w) > 1}
-
-def base_number(n: str) -> str:
-    return (n or "").split("/")[0].strip()
+from tracker.models import Card, SealedProduct
+from tracker.matching import base_number, tokens
+from tracker.services.linking import save_links
+from tracker.services.portfolio import batched_refresh
+from tracker.services.resolver import CatalogResolver
 
 class Command(BaseCommand):
     help = "Auto-link owned Cards and SealedProducts to CatalogItem using imported TCGCSV catalog."
@@ -34,70 +21,38 @@ class Command(BaseCommand):
         linked_cards = linked_sealed = 0
         skipped_cards = skipped_sealed = 0
 
+        # one pass over the catalogs; every holding is matched against them in memory
+        # (the same matching card_create / sealed_create do on save)
+        resolver = CatalogResolver(cards=not sealed_only, sealed=not cards_only)
+
         # ---------------- CARDS ----------------
+        changed_cards = []
         if not sealed_only:
-            for c in Card.objects.all():
-                if c.catalog_item_id and not force:
-                    skipped_cards += 1
-                    continue
+            qs = Card.objects.only("pk", "user_id", "name", "set_name", "card_number", "printing", "catalog_id", "catalog_item_id")
+            if not force:
+                skipped_cards += qs.filter(catalog_item__isnull=False).count()
+                qs = qs.filter(catalog_item__isnull=True)
 
+            for c in qs:
                 num = base_number(c.card_number)
                 if not num:
                     self.stdout.write(self.style.WARNING(f"[CARD] Missing number: {c.name}"))
                     skipped_cards += 1
                     continue
 
-                name_n = norm(c.name)
-                printing = (c.printing or "").strip().lower()
-
-                qs = CatalogItem.objects.filter(is_sealed=False)
-
-                # First: narrow by number presence
-                candidates = list(qs.filter(card_number__icontains=num)[:500])
-
-                if not candidates:
+                best, best_score, confident, _ = resolver.match_card(c)
+                if best is None:
                     self.stdout.write(self.style.WARNING(
                         f"[CARD] No catalog candidates for number {num}: {c.name}"
                     ))
                     skipped_cards += 1
                     continue
 
-                best = None
-                best_score = -1
-
-                for item in candidates:
-                    score = 0
-                    item_name = norm(item.name)
-                    item_num = (item.card_number or "")
-                    item_print = (item.printing or "").strip().lower()
-
-                    # number match
-                    if num and num in item_num:
-                        score += 20
-
-                    # name match
-                    if item_name == name_n:
-                        score += 15
-                    elif name_n and name_n in item_name:
-                        score += 8
-
-                    # printing match (bonus only)
-                    if printing and item_print == printing:
-                        score += 6
-
-                    # set hint (bonus)
-                    if hasattr(item, "set_name") and c.set_name and item.set_name:
-                        if norm(c.set_name) in norm(item.set_name):
-                            score += 4
-
-                    if score > best_score:
-                        best_score = score
-                        best = item
-
                 # Lower threshold since number is already strong
-                if best and best_score >= 25:
-                    c.catalog_item = best
-                    c.save(update_fields=["catalog_item"])
+                if confident:
+                    if c.catalog_item_id != best.pk:
+                        c.catalog_item_id = best.pk
+                        changed_cards.append(c)
                     linked_cards += 1
                     self.stdout.write(self.style.SUCCESS(
                         f"[CARD] Linked {c.name} #{c.card_number} ({c.printing}) -> productId={best.product_id} "
@@ -110,43 +65,23 @@ class Command(BaseCommand):
                     ))
 
         # ---------------- SEALED ----------------
+        changed_sealed = []
         if not cards_only:
-            for s in SealedProduct.objects.all():
-                if s.catalog_item_id and not force:
-                    skipped_sealed += 1
-                    continue
+            qs = SealedProduct.objects.only("pk", "user_id", "name", "catalog_item_id")
+            if not force:
+                skipped_sealed += qs.filter(catalog_item__isnull=False).count()
+                qs = qs.filter(catalog_item__isnull=True)
 
-                owned_tokens = tokens(s.name)
-                if not owned_tokens:
+            for s in qs:
+                if not tokens(s.name):
                     skipped_sealed += 1
                     continue
 
-                qs = CatalogItem.objects.filter(is_sealed=True)
-
-                best = None
-                best_score = -1
-
-                # Only scan first N for speed; should be fine if you're importing a single set CSV
-                for item in qs[:2000]:
-                    item_tokens = tokens(item.name)
-                    overlap = len(owned_tokens & item_tokens)
-                    if overlap == 0:
-                        continue
-
-                    score = overlap * 10
-
-                    # bonus for set hint
-                    if hasattr(item, "set_name") and s.set_name and item.set_name:
-                        if norm(s.set_name) in norm(item.set_name):
-                            score += 6
-
-                    if score > best_score:
-                        best_score = score
-                        best = item
-
-                if best and best_score >= 10:
-                    s.catalog_item = best
-                    s.save(update_fields=["catalog_item"])
+                best, best_score, confident, _ = resolver.match_sealed(s)
+                if confident:
+                    if s.catalog_item_id != best.pk:
+                        s.catalog_item_id = best.pk
+                        changed_sealed.append(s)
                     linked_sealed += 1
                     self.stdout.write(self.style.SUCCESS(
                         f"[SEALED] Linked '{s.name}' -> productId={best.product_id} catalog='{best.name}' score={best_score}"
@@ -157,6 +92,10 @@ class Command(BaseCommand):
                         f"[SEALED] Could not confidently link '{s.name}'. Try making the name closer to catalog."
                     ))
 
+        with batched_refresh():
+            save_links(Card, changed_cards)
+            save_links(SealedProduct, changed_sealed)
+
         self.stdout.write(self.style.SUCCESS(
             f"Done ✅ cards_linked={linked_cards}, cards_skipped={skipped_cards}, "
             f"sealed_linked={linked_sealed}, sealed_skipped={skipped_sealed}"
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.services.price_history import compact_prices
+
+
+class Command(BaseCommand):
+    help = "Roll old PriceSnapshots into daily/weekly/monthly OHLC rollups per settings.PRICE_RETENTION."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--raw-days", type=int, default=None)
+        parser.add_argument("--daily-days", type=int, default=None)
+        parser.add_argument("--weekly-days", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        policy = dict(getattr(settings, "PRICE_RETENTION", {}))
+        for key in ("raw_days", "daily_days", "weekly_days"):
+            if opts[key] is not None:
+                policy[key] = opts[key]
+
+        try:
+            removed = compact_prices(
+                raw_days=policy.get("raw_days", 90),
+                daily_days=policy.get("daily_days", 365),
+                weekly_days=policy.get("weekly_days", 365 * 3),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done ✅ snapshots_rolled={removed['snapshots']}, daily_rolled={removed['daily']}, "
+            f"weekly_rolled={removed['weekly']}"
+        ))
@@ -1,119 +1,101 @@
-import csv
-from decimal import Decimal, InvalidOperation
+import os
+from contextlib import nullcontext
 from datetime import datetime, timezone
-from django.core.management.base import BaseCommand
-from tracker.models import CatalogItem, PriceSnapshot
-
-
-def dec(v):
-    try:
-        return Decimal(v) if v not in ("", None) else None
-    except InvalidOperation:
-        return None
-
-
-def parse_dt(v):
-    if not v:
-        return datetime.now(timezone.utc)
-    try:
-        dt = datetime.fromisoformat(v)
-        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-    except ValueError:
-        return datetime.now(timezone.utc)
+from django.core.management.base import BaseCommand, CommandError
+from tracker.services.crossref import rebuild_crossref
+from tracker.services.portfolio import batched_refresh
+from tracker.services.tcgcsv import (
+    DEFAULT_BATCH_SIZE, ImportStats, ShadowImport, expand_paths, parse_files, write_batch,
+    changed_files, manifest_options, record_files,
+)
 
 
 class Command(BaseCommand):
-    help = "Import products and prices from a TCGCSV export (header-based)."
+    help = "Import products and prices from TCGCSV exports (header-based): files, directories or globs."
 
     def add_arguments(self, parser):
-        parser.add_argument("csv_path", type=str)
+        parser.add_argument("csv_path", nargs="+", type=str,
+                            help="Export file (.csv, .csv.gz, .zip), directory of them, or glob pattern (quote it).")
         parser.add_argument("--category-id", type=int)
         parser.add_argument("--group-id", type=int)
         parser.add_argument("--sealed-only", action="store_true")
         parser.add_argument("--singles-only", action="store_true")
-        parser.add_argument("--capture-now", action="store_true")
+        parser.add_argument("--capture-now", action="store_true",
+                            help="Record every row's prices as of now (instead of modifiedOn), "
+                                 "unchanged files and rows included.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="Rows written per transaction (bulk upsert).")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="Processes parsing files in parallel (default: one per CPU, at most one per file).")
+        parser.add_argument("--force", action="store_true",
+                            help="Re-import unchanged files and rows (ignore the import manifest).")
+        parser.add_argument("--skip-unchanged-prices", action="store_true",
+                            help="Don't store a snapshot that repeats the item's latest prices; "
+                                 "record when they were confirmed instead.")
+        parser.add_argument("--shadow", action="store_true",
+                            help="Stage the whole run in shadow tables and swap it in with one short transaction "
+                                 "(readers never see a partial import).")
 
     def handle(self, *args, **opts):
-        path = opts["csv_path"]
-        category_filter = opts.get("category_id")
-        group_filter = opts.get("group_id")
-        sealed_only = opts["sealed_only"]
-        singles_only = opts["singles_only"]
-        capture_now = opts["capture_now"]
-
-        created_items = updated_items = price_rows = skipped = 0
-
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                product_id = int(row["productId"])
-                name = row["name"].strip()
-                image_url = row["imageUrl"].strip()
-                category_id = int(row["categoryId"]) if row["categoryId"] else None
-                group_id = int(row["groupId"]) if row["groupId"] else None
-
-                if category_filter and category_id != category_filter:
-                    skipped += 1
-                    continue
-                if group_filter and group_id != group_filter:
-                    skipped += 1
-                    continue
-
-                card_number = (row.get("extNumber") or "").strip()
-                printing = (row.get("subTypeName") or "Normal").strip()
-                rarity = (row.get("extRarity") or "").strip()
-
-                is_single = bool(card_number)
-                is_sealed = not is_single
-
-                if sealed_only and not is_sealed:
-                    skipped += 1
-                    continue
-                if singles_only and not is_single:
-                    skipped += 1
-                    continue
-
-                item, created = CatalogItem.objects.update_or_create(
-                    product_id=product_id,
-                    printing=printing,
-                    defaults={
-                        "name": name,
-                        "image_url": image_url,
-                        "category_id": category_id,
-                        "group_id": group_id,
-                        "tcgcsv_url": row.get("url", ""),
-                        "card_number": card_number,
-                        "rarity": rarity,
-                        "is_sealed": is_sealed,
-                    }
-                )
-
-                created_items += int(created)
-                updated_items += int(not created)
-
-                captured_at = (
-                    datetime.now(timezone.utc)
-                    if capture_now
-                    else parse_dt(row.get("modifiedOn"))
-                )
-
-                if any(row.get(k) for k in ["lowPrice", "midPrice", "highPrice", "marketPrice"]):
-                    PriceSnapshot.objects.update_or_create(
-                        item=item,
-                        captured_at=captured_at,
-                        defaults={
-                            "low": dec(row.get("lowPrice")),
-                            "mid": dec(row.get("midPrice")),
-                            "high": dec(row.get("highPrice")),
-                            "market": dec(row.get("marketPrice")),
-                            "direct_low": dec(row.get("directLowPrice")),
-                            "source": "tcgcsv",
-                        }
-                    )
-                    price_rows += 1
+        paths = expand_paths(opts["csv_path"])
+        missing = [p for p in paths if not p.is_file()]
+        if missing:
+            raise CommandError(f"CSV not found: {missing[0]}")
+        if not paths:
+            raise CommandError("No CSV files matched.")
+
+        batch_size = max(1, opts["batch_size"])
+        workers = opts["workers"] or min(len(paths), os.cpu_count() or 1)
+        row_opts = dict(
+            category_id=opts.get("category_id"),
+            group_id=opts.get("group_id"),
+            sealed_only=opts["sealed_only"],
+            singles_only=opts["singles_only"],
+            # one capture time for the whole run
+            captured_at=datetime.now(timezone.utc) if opts["capture_now"] else None,
+        )
+
+        # a --capture-now run snapshots every row, unchanged files and rows included;
+        # only --skip-unchanged-prices turns repeated prices into a confirmation
+        recheck = opts["force"] or opts["capture_now"]
+        write_opts = dict(force=recheck, skip_unchanged_prices=opts["skip_unchanged_prices"])
+        stats = ImportStats()
+        options = manifest_options(row_opts)
+        files, unchanged = changed_files(paths, options, force=recheck)
+        stats.files_unchanged = len(unchanged)
+        paths = [p for p, _, _ in files]
+        workers = min(workers, max(1, len(paths)))
+        if len(paths) > 1:
+            self.stdout.write(f"Importing {len(paths)} files with {workers} parser process(es)...")
+
+        shadow = ShadowImport(**write_opts) if opts["shadow"] else None
+        write = shadow.add if shadow else lambda rows: write_batch(rows, **write_opts)
+
+        batch = []
+        # parsing fans out to the workers; this process is the only writer
+        with batched_refresh(), shadow or nullcontext():
+            try:
+                for parsed in parse_files(paths, row_opts, workers=workers):
+                    if parsed is None:
+                        stats.skipped += 1
+                        continue
+                    batch.append(parsed)
+                    if len(batch) >= batch_size:
+                        stats += write(batch)
+                        batch = []
+            except ValueError as e:  # bad header or unparseable row
+                raise CommandError(str(e))
+            stats += write(batch)
+            if shadow:
+                shadow.apply()
+        record_files(files, options)
 
         self.stdout.write(self.style.SUCCESS(
-            f"Done ✅ items_created={created_items}, items_updated={updated_items}, "
-            f"prices_upserted={price_rows}, skipped={skipped}"
+            f"Done ✅ files={len(paths)}, files_unchanged={stats.files_unchanged}, "
+            f"items_created={stats.items_created}, items_updated={stats.items_updated}, "
+            f"prices_upserted={stats.prices_upserted}, prices_confirmed={stats.prices_confirmed}, rows_unchanged={stats.rows_unchanged}, skipped={stats.skipped}"
         ))
+
+        if stats.items_created or stats.items_updated:
+            xref = rebuild_crossref()
+            self.stdout.write(f"Cross-reference: links={xref.links} (+{xref.added}/-{xref.removed}), group_sets={xref.sets}")
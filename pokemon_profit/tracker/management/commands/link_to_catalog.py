@@ -1,46 +1,74 @@
-from django.core.management.base import BaseCommand
-from tracker.models import Card, CardCatalog
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from tracker.models import Card, CardCatalog, SetAlias
+from tracker.services.linking import CardCatalogIndex, save_catalog_links, save_links
+from tracker.services.portfolio import batched_refresh
+
 
 class Command(BaseCommand):
-    help = "Link owned Cards to CardCatalog using set_name + card_number numerator."
+    help = (
+        "Link owned Cards to CardCatalog using their CatalogItem (cross-reference) or set_name (or a set alias) "
+        "+ card_number numerator; Cards without a CatalogItem get the cross-referenced one."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("--card-id", type=int, default=None)
+        parser.add_argument("--user", type=str, help="Only link this user's cards (username).")
         parser.add_argument("--force", action="store_true")
+        parser.add_argument("--alias", action="append", default=[], metavar="ALIAS=SET_ID",
+                            help='Save a set-name alias first, e.g. "SV: Scarlet & Violet 151=sv3pt5" (repeatable).')
+        parser.add_argument("--batch-size", type=int, default=500, help="Cards written per transaction.")
+
+    def _save_aliases(self, specs):
+        for spec in specs:
+            alias, sep, set_id = spec.rpartition("=")
+            alias, set_id = alias.strip(), set_id.strip()
+            if not (sep and alias and set_id):
+                raise CommandError(f"Expected ALIAS=SET_ID, got {spec!r}")
+            if not CardCatalog.objects.filter(set_id=set_id).exists():
+                raise CommandError(f"Unknown set_id {set_id!r}")
+            obj = SetAlias.objects.filter(alias_key=SetAlias.match_keys_for(alias=alias)["alias_key"]).first() or SetAlias()
+            obj.alias, obj.set_id = alias, set_id
+            obj.save()
+            self.stdout.write(f"Alias saved: {obj}")
 
     def handle(self, *args, **opts):
-        qs = Card.objects.all()
+        self._save_aliases(opts["alias"])
+
+        qs = Card.objects.only(
+            "pk", "user_id", "name", "set_name", "card_number", "printing", "catalog_id", "catalog_item_id",
+        ).order_by("pk")
         if opts["card_id"] is not None:
             qs = qs.filter(pk=opts["card_id"])
+        if opts["user"]:
+            user = get_user_model().objects.filter(username=opts["user"]).first()
+            if user is None:
+                raise CommandError(f"No user named {opts['user']!r}")
+            qs = qs.filter(user=user)
 
         linked = 0
         skipped = 0
         not_found = 0
+        items_linked = 0
+        if not opts["force"]:
+            skipped += qs.filter(catalog__isnull=False).count()
+            qs = qs.filter(catalog__isnull=True)
 
-        for card in qs:
-            if card.catalog_id and not opts["force"]:
-                skipped += 1
-                continue
-
-            if not card.set_name or not card.card_number:
-                skipped += 1
-                continue
-
-            num = (card.card_number.split("/", 1)[0]).strip()
-
-            hit = (
-                CardCatalog.objects
-                .filter(set_name__iexact=card.set_name.strip(), number=num)
-                .first()
-            )
+        batch_size = max(1, opts["batch_size"])
+        index = CardCatalogIndex()
+        pending = []
+        item_links = []
 
+        for card in qs.iterator(chunk_size=2000):
+            # one lookup when the card's product is already known
+            hit = index.for_item(card.catalog_item_id)
             if not hit:
-                # fallback: loose match (sometimes your set_name differs slightly)
-                hit = (
-                    CardCatalog.objects
-                    .filter(set_name__icontains=card.set_name.strip(), number=num)
-                    .first()
-                )
+                if not card.set_name or not card.card_number:
+                    skipped += 1
+                    continue
+
+                num = (card.card_number.split("/", 1)[0]).strip()
+                hit = index.find(card.set_name, num)
 
             if not hit:
                 not_found += 1
@@ -49,16 +77,29 @@ class Command(BaseCommand):
                 ))
                 continue
 
-            card.catalog = hit
+            card.catalog_id = hit.pk
             # Optionally normalize name/set from catalog
             card.name = hit.name
             card.set_name = hit.set_name
             card.card_number = f"{hit.number}/{card.card_number.split('/',1)[1]}" if "/" in card.card_number else hit.number
+            if card.catalog_item_id is None:
+                card.catalog_item_id = index.item_for(hit.pk, card.printing)
+                if card.catalog_item_id is not None:
+                    item_links.append(card)
+                    items_linked += 1
 
-            card.save()
+            pending.append(card)
+            if len(pending) >= batch_size:
+                save_catalog_links(pending, batch_size=batch_size)
+                pending = []
             linked += 1
             self.stdout.write(self.style.SUCCESS(
                 f"Linked Card(id={card.id}) -> Catalog({hit.set_name} #{hit.number} {hit.name})"
             ))
+        save_catalog_links(pending, batch_size=batch_size)
+        with batched_refresh():
+            save_links(Card, item_links, batch_size=batch_size)
 
-        self.stdout.write(self.style.SUCCESS(f"Done. Linked={linked}, Skipped={skipped}, NotFound={not_found}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Linked={linked}, Skipped={skipped}, NotFound={not_found}, ItemsLinked={items_linked}"
+        ))
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tracker.analytics import load_history, compute_metrics
+from tracker.analytics.benchmark import run_benchmark
+from tracker.models import CatalogItem
+
+SORT_FIELDS = ["total_return", "volatility", "max_drawdown", "mean_return", "last", "points"]
+
+
+class Command(BaseCommand):
+    help = "Compute returns, rolling average, volatility and drawdown for every CatalogItem."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--item-id", type=int, action="append", dest="item_ids")
+        parser.add_argument("--since-days", type=int, default=None)
+        parser.add_argument("--window", type=int, default=7)
+        parser.add_argument("--sort", choices=SORT_FIELDS, default="total_return")
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--benchmark", type=int, default=0, metavar="ROWS",
+                            help="Time the engine on a synthetic history of ROWS points instead.")
+        parser.add_argument("--benchmark-items", type=int, default=20_000)
+
+    def handle(self, *args, **opts):
+        if opts["benchmark"]:
+            res = run_benchmark(opts["benchmark"], opts["benchmark_items"], window=opts["window"])
+            self.stdout.write(self.style.SUCCESS(
+                f"Benchmark: rows={res['rows']}, items={res['items']}, "
+                f"seconds={res['seconds']:.3f}, rows_per_sec={res['rows_per_sec']:,.0f}"
+            ))
+            return
+
+        since = None
+        if opts["since_days"]:
+            since = timezone.now() - timedelta(days=opts["since_days"])
+
+        history = load_history(item_ids=opts["item_ids"], since=since)
+        m = compute_metrics(history, window=opts["window"])
+        self.stdout.write(f"Loaded {len(history)} snapshots for {len(history.item_ids)} items")
+
+        key = np.nan_to_num(m[opts["sort"]].astype(np.float64), nan=-np.inf)
+        order = np.argsort(-key, kind="stable")[: opts["top"]]
+        names = dict(CatalogItem.objects.filter(pk__in=m["item_id"][order].tolist()).values_list("pk", "name"))
+
+        for k in order:
+            item_id = int(m["item_id"][k])
+            self.stdout.write(
+                f"{names.get(item_id, item_id)} | points={m['points'][k]} last={m['last'][k]:.2f} "
+                f"return={m['total_return'][k]:+.2%} sma{opts['window']}={m['rolling_mean'][k]:.2f} "
+                f"vol={m['volatility'][k]:.4f} max_dd={m['max_drawdown'][k]:.2%}"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tracker.services.crossref import rebuild_crossref
+
+
+class Command(BaseCommand):
+    help = "Rebuild the CardCatalog <-> CatalogItem cross-reference and group_id <-> set_id map (normally done by the imports)."
+
+    def handle(self, *args, **opts):
+        stats = rebuild_crossref()
+        self.stdout.write(self.style.SUCCESS(
+            f"Done ✅ groups={stats.groups}, group_sets={stats.sets}, links={stats.links}, "
+            f"added={stats.added}, removed={stats.removed}"
+        ))
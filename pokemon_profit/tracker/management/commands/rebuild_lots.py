@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from tracker.models import Card, SealedProduct
+from tracker.services.lots import rebuild_lots
+from tracker.services.portfolio import batched_refresh, schedule_refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute lot matches and realized gains for every Card and SealedProduct."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        cards = Card.objects.filter(sale__isnull=False).distinct()
+        sealed = SealedProduct.objects.filter(sale__isnull=False).distinct()
+        if opts["user_id"] is not None:
+            cards = cards.filter(user_id=opts["user_id"])
+            sealed = sealed.filter(user_id=opts["user_id"])
+
+        sales = 0
+        with batched_refresh():
+            for card_id in cards.values_list("pk", flat=True):
+                sales += rebuild_lots(card_id=card_id)
+                schedule_refresh(card_ids={card_id})
+            for sealed_id in sealed.values_list("pk", flat=True):
+                sales += rebuild_lots(sealed_product_id=sealed_id)
+                schedule_refresh(sealed_ids={sealed_id})
+
+        self.stdout.write(self.style.SUCCESS(f"Done. SalesMatched={sales}"))
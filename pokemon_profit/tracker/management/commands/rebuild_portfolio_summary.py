@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tracker.models import Card, SealedProduct
+from tracker.services.portfolio import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute PortfolioSummary rows and cached holding valuations from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        users = get_user_model().objects.order_by("pk")
+        if opts["user_id"] is not None:
+            users = users.filter(pk=opts["user_id"])
+
+        rebuilt = 0
+        for user_id in users.values_list("pk", flat=True):
+            Card.objects.filter(user_id=user_id).refresh_valuation()
+            SealedProduct.objects.filter(user_id=user_id).refresh_valuation()
+            rebuild_summary(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Rebuilt={rebuilt}"))
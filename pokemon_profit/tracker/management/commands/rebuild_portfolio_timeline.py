@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tracker.services.timeline import extend_timeline, invalidate_timeline
+
+
+class Command(BaseCommand):
+    help = "Bring every user's portfolio value timeline up to date (--full recomputes it)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, default=None)
+        parser.add_argument("--full", action="store_true")
+
+    def handle(self, *args, **opts):
+        users = get_user_model().objects.order_by("pk")
+        if opts["user_id"] is not None:
+            users = users.filter(pk=opts["user_id"])
+
+        days = 0
+        for user_id in users.values_list("pk", flat=True):
+            if opts["full"]:
+                invalidate_timeline({user_id})
+            days += extend_timeline(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Done. DaysWritten={days}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tracker.services.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Refill the catalog search index from CatalogItem and CardCatalog (normally kept in sync by triggers)."
+
+    def handle(self, *args, **opts):
+        rows = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Done ✅ indexed={rows}"))
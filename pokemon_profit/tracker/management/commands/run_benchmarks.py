@@ -0,0 +1,93 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from tracker.benchmarks import run_suite, view_cases, command_cases, compare, write_tcgcsv
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every view and the import/linking commands, with query counts and peak memory. "
+        "All writes are rolled back. Writes a JSON report and optionally compares it to a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=str, help="Username for the view benchmarks (default: largest portfolio).")
+        parser.add_argument("--only", action="append", default=[], metavar="SUBSTRING",
+                            help="Only run cases whose name contains SUBSTRING (repeatable).")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run.")
+        parser.add_argument("--tcgcsv", type=str, help="CSV for import_tcgcsv (default: a synthetic export).")
+        parser.add_argument("--csv-rows", type=int, default=5000, help="Rows in the synthetic TCGCSV export.")
+        parser.add_argument("--catalog-zip", type=str, default=str(settings.BASE_DIR / "data" / "pokemon-tcg-data-master.zip"))
+        parser.add_argument("--catalog-limit", type=int, default=5000, help="Passed to import_catalog --limit (0 = all).")
+        parser.add_argument("--output", type=str, default="benchmark_results.json")
+        parser.add_argument("--baseline", type=str, help="Earlier report to compare against.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs. baseline (0.2 = 20%%).")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def _user(self, username):
+        User = get_user_model()
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"No user named {username!r}")
+            return user
+        user = User.objects.annotate(n=Count("cards")).order_by("-n", "pk").first()
+        if user is None:
+            raise CommandError("No users; run seed_benchmark_data first.")
+        return user
+
+    def handle(self, *args, **opts):
+        user = self._user(opts["user"])
+        catalog_zip = Path(opts["catalog_zip"])
+        if not catalog_zip.exists():
+            self.stdout.write(self.style.WARNING(f"{catalog_zip} not found; skipping import_catalog"))
+            catalog_zip = None
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tcgcsv = opts["tcgcsv"]
+            if not tcgcsv:
+                tcgcsv = Path(tmp) / "benchmark_tcgcsv.csv"
+                write_tcgcsv(tcgcsv, opts["csv_rows"])
+
+            cases = view_cases(user) + command_cases(
+                tcgcsv_path=tcgcsv, catalog_zip=catalog_zip, catalog_limit=opts["catalog_limit"],
+            )
+            if opts["only"]:
+                cases = [c for c in cases if any(s in c.name for s in opts["only"])]
+
+            self.stdout.write(f"Running {len(cases)} benchmarks as {user.username} (repeat={opts['repeat']})...")
+            report = run_suite(cases, repeat=max(1, opts["repeat"]), memory=not opts["no_memory"], log=self.stdout.write)
+        report["meta"]["user"] = user.username
+
+        with open(opts["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {opts['output']}"))
+
+        if not opts["baseline"]:
+            return
+        with open(opts["baseline"], encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        for name, now in report["cases"].items():
+            base = baseline.get("cases", {}).get(name)
+            if base:
+                self.stdout.write(
+                    f"  {name}: {now['seconds'] / base['seconds']:.2f}x time, "
+                    f"queries {base['queries']} -> {now['queries']}"
+                )
+        regressions = compare(report, baseline, tolerance=opts["tolerance"])
+        for r in regressions:
+            self.stdout.write(self.style.WARNING(
+                f"[REGRESSION] {r['case']} {r['metric']}: {r['baseline']} -> {r['current']}"
+            ))
+        if regressions and opts["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regression(s) vs. {opts['baseline']}")
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions vs. {opts['baseline']}"))
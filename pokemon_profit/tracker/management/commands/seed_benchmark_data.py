@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.benchmarks import SeedConfig, seed_benchmark_data, reset_benchmark_data
+from tracker.benchmarks.seed import USERNAME_PREFIX, PRODUCT_BASE
+from tracker.models import CatalogItem
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic large synthetic portfolio for benchmarking (bench_user_* users)."
+
+    def add_arguments(self, parser):
+        defaults = SeedConfig()
+        parser.add_argument("--users", type=int, default=defaults.users)
+        parser.add_argument("--items", type=int, default=defaults.items)
+        parser.add_argument("--sealed-items", type=int, default=defaults.sealed_items)
+        parser.add_argument("--sets", type=int, default=defaults.sets)
+        parser.add_argument("--days", type=int, default=defaults.days, help="Days of price history, ending today.")
+        parser.add_argument("--snapshot-every", type=int, default=defaults.snapshot_every, metavar="DAYS")
+        parser.add_argument("--cards-per-user", type=int, default=defaults.cards_per_user)
+        parser.add_argument("--sealed-per-user", type=int, default=defaults.sealed_per_user)
+        parser.add_argument("--purchases-per-holding", type=int, default=defaults.purchases_per_holding)
+        parser.add_argument("--sell-ratio", type=float, default=defaults.sell_ratio)
+        parser.add_argument("--unlinked-ratio", type=float, default=defaults.unlinked_ratio,
+                            help="Share of holdings left without a catalog item (work for auto_link_owned).")
+        parser.add_argument("--seed", type=int, default=defaults.seed)
+        parser.add_argument("--reset", action="store_true", help="Drop previously seeded data first.")
+        parser.add_argument("--reset-only", action="store_true", help="Drop previously seeded data and stop.")
+
+    def handle(self, *args, **opts):
+        log = self.stdout.write
+        if opts["reset"] or opts["reset_only"]:
+            self.stdout.write("Removing seeded benchmark data...")
+            reset_benchmark_data(log=log)
+            if opts["reset_only"]:
+                self.stdout.write(self.style.SUCCESS("Done ✅"))
+                return
+        elif CatalogItem.objects.filter(product_id__gte=PRODUCT_BASE).exists():
+            raise CommandError(f"Benchmark data already exists ({USERNAME_PREFIX}*); pass --reset to regenerate it.")
+
+        cfg = SeedConfig(
+            users=opts["users"],
+            items=opts["items"],
+            sealed_items=min(opts["sealed_items"], opts["items"]),
+            sets=max(1, opts["sets"]),
+            days=max(1, opts["days"]),
+            snapshot_every=max(1, opts["snapshot_every"]),
+            cards_per_user=opts["cards_per_user"],
+            sealed_per_user=opts["sealed_per_user"],
+            purchases_per_holding=max(1, opts["purchases_per_holding"]),
+            sell_ratio=opts["sell_ratio"],
+            unlinked_ratio=opts["unlinked_ratio"],
+            seed=opts["seed"],
+        )
+        self.stdout.write(f"Seeding benchmark data (seed={cfg.seed})...")
+        seed_benchmark_data(cfg, log=log)
+        self.stdout.write(self.style.SUCCESS("Done ✅"))
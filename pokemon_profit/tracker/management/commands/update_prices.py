@@ -1,65 +1,113 @@
+from collections import defaultdict
 from datetime import timedelta
-from django.core.management.base import BaseCommand
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Q
 from django.utils import timezone
 
-from tracker.models import Card, MarketPrice
-from tracker.services.pricing import fetch_price_by_product_id, RateLimitError
+from tracker.models import Card, SealedProduct, MarketPrice
+from tracker.services.portfolio import batched_refresh
+from tracker.services.price_refresh import PriceRefresher, save_market_prices
+from tracker.services.pricing import API_KEY, BASE
 
 class Command(BaseCommand):
-    help = "Update market prices from TCGAPIs"
+    help = "Update market prices from TCGAPIs (concurrent, rate limited; one request per linked product)"
 
     def add_arguments(self, parser):
         parser.add_argument("--card-id", type=int, default=None)
         parser.add_argument("--limit", type=int, default=0)
         parser.add_argument("--stale-hours", type=int, default=24)
-        parser.add_argument("--max-wait", type=int, default=60)
+        parser.add_argument("--max-wait", type=int, default=60,
+                            help="Seconds of 429 backoff one product may use before it is given up.")
+        parser.add_argument("--sealed", action="store_true", help="Also refresh sealed products.")
+        parser.add_argument("--rate", type=float, default=5.0, help="Requests per second across all workers.")
+        parser.add_argument("--burst", type=int, default=10, help="Requests allowed at once before --rate applies.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at most.")
+        parser.add_argument("--batch-size", type=int, default=200, help="Prices written per transaction.")
+        parser.add_argument("--base-url", type=str, default=BASE,
+                            help="API root, e.g. a local mock server for testing.")
+
+    def _stale(self, qs, cutoff):
+        return (
+            qs.select_related("catalog_item")
+            .annotate(last_price=Max("marketprice__date"))
+            .filter(Q(last_price__isnull=True) | Q(last_price__lt=cutoff))
+            .order_by("pk")
+        )
 
     def handle(self, *args, **opts):
-        qs = Card.objects.all()
+        if opts["base_url"] == BASE and not API_KEY:
+            raise CommandError("Missing TCGAPIS_API_KEY in .env")
+        if opts["rate"] <= 0:
+            raise CommandError("--rate must be positive")
 
+        stale_cutoff = timezone.now() - timedelta(hours=opts["stale_hours"])
+        qs = Card.objects.all()
         if opts["card_id"]:
             qs = qs.filter(id=opts["card_id"])
-
+        holdings = list(self._stale(qs, stale_cutoff))
+        if opts["sealed"] and not opts["card_id"]:
+            holdings += list(self._stale(SealedProduct.objects.all(), stale_cutoff))
         if opts["limit"]:
-            qs = qs[: opts["limit"]]
-
-        stale_cutoff = timezone.now() - timedelta(hours=opts["stale_hours"])
-        max_wait = int(opts["max_wait"])
+            holdings = holdings[: opts["limit"]]
 
         updated = skipped = errors = rate_limited = 0
 
-        for card in qs:
-            if not card.tcgapis_product_id:
-                self.stdout.write(f"Skipped {card.name} (no tcgapis_product_id)")
+        # holdings of the same product share one request
+        by_product = defaultdict(list)
+        for h in holdings:
+            if not h.catalog_item_id:
+                self.stdout.write(f"Skipped {h.name} (not linked to a catalog item)")
                 skipped += 1
                 continue
+            by_product[h.catalog_item.product_id].append(h)
 
-            latest = MarketPrice.objects.filter(card=card).order_by("-date").first()
-            if latest and latest.date and latest.date >= stale_cutoff:
-                self.stdout.write(f"Skipped {card.name} (fresh price)")
-                skipped += 1
-                continue
-
-            try:
-                price = fetch_price_by_product_id(card.tcgapis_product_id, max_wait_seconds=max_wait)
-                if price is None:
-                    self.stdout.write(f"No price found for {card.name} (productId={card.tcgapis_product_id})")
-                    skipped += 1
-                    continue
-
-                MarketPrice.objects.create(card=card, price=price, source="TCGAPIs")
-                self.stdout.write(self.style.SUCCESS(f"Updated {card.name}: {price}"))
-                updated += 1
+        refresher = PriceRefresher(
+            rate=opts["rate"],
+            burst=opts["burst"],
+            concurrency=opts["concurrency"],
+            base_url=opts["base_url"],
+            api_key=API_KEY,
+            max_wait=opts["max_wait"],
+        )
+        batch_size = max(1, opts["batch_size"])
+        pending, users = [], set()
 
-            except RateLimitError as e:
-                self.stdout.write(self.style.WARNING(f"RATE LIMITED: {card.name} -> {e}"))
-                rate_limited += 1
-                continue
+        with batched_refresh():
+            for result in refresher.run(list(by_product)):
+                owners = by_product[result.product_id]
+                if result.rate_limited:
+                    for h in owners:
+                        self.stdout.write(self.style.WARNING(f"RATE LIMITED: {h.name} -> {result.error}"))
+                    rate_limited += len(owners)
+                elif result.error:
+                    for h in owners:
+                        self.stdout.write(self.style.ERROR(f"ERROR {h.name}: {result.error}"))
+                    errors += len(owners)
+                elif result.price is None:
+                    for h in owners:
+                        self.stdout.write(f"No price found for {h.name} (productId={result.product_id})")
+                    skipped += len(owners)
+                else:
+                    price = Decimal(str(result.price))
+                    for h in owners:
+                        owner = {"card": h} if isinstance(h, Card) else {"sealed_product": h}
+                        pending.append(MarketPrice(price=price, source="TCGAPIs", **owner))
+                        users.add(h.user_id)
+                        self.stdout.write(self.style.SUCCESS(f"Updated {h.name}: {price}"))
+                    updated += len(owners)
 
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"ERROR {card.name}: {e}"))
-                errors += 1
+                if len(pending) >= batch_size:
+                    save_market_prices(pending, users)
+                    pending, users = [], set()
+            save_market_prices(pending, users)
 
+        report = refresher.report
+        ms = lambda p: report.percentile(p) * 1000
+        self.stdout.write(
+            f"Requests={report.requests} in {report.elapsed:.1f}s ({report.requests_per_second:.2f} req/s), "
+            f"429s={report.rate_limited}, latency p50={ms(50):.0f}ms p90={ms(90):.0f}ms p99={ms(99):.0f}ms max={ms(100):.0f}ms"
+        )
         self.stdout.write(
             f"Done. Updated={updated}, Skipped={skipped}, RateLimited={rate_limited}, Errors={errors}"
         )
@@ -0,0 +1,39 @@
+"""
+Name and number normalization for matching owned holdings to the catalog.
+
+CatalogItem and CardCatalog store these as indexed match keys (see
+MatchKeysMixin), so linkers can use equality lookups instead of redoing
+the normalization for every candidate.
+"""
+import re
+
+# remove very common junk words
+STOP_WORDS = {"the", "and", "of", "a", "an", "tcg", "pokemon", "pokémon", "sv", "scarlet", "violet"}
+
+
+def norm(s: str) -> str:
+    s = (s or "").lower().strip()
+    s = s.replace("&", "and")
+    s = re.sub(r"[^a-z0-9\s]+", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def tokens(s: str) -> set[str]:
+    t = set(norm(s).split())
+    return {w.rstrip("s") for w in t if w not in STOP_WORDS and len(w) > 1}
+
+
+def token_key(s: str) -> str:
+    """tokens() as a stable string: sorted and space-separated."""
+    return " ".join(sorted(tokens(s)))
+
+
+def base_number(n: str) -> str:
+    return (n or "").split("/")[0].strip()
+
+
+def number_key(n: str) -> str:
+    """base_number() compared loosely: case and leading zeros ignored ("004/102" -> "4")."""
+    key = base_number(n).lower()
+    return key.lstrip("0") or key[:1]
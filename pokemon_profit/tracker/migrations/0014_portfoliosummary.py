@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:00
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_remove_card_ptcg_id_remove_card_ptcg_image_large_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cards_count', models.PositiveIntegerField(default=0)),
+                ('sealed_count', models.PositiveIntegerField(default=0)),
+                ('purchases_count', models.PositiveIntegerField(default=0)),
+                ('sales_count', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('market_value', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('realized_profit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('unrealized_profit', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
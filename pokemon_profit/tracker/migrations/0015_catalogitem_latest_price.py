@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_latest_price(apps, schema_editor):
+    CatalogItem = apps.get_model("tracker", "CatalogItem")
+    PriceSnapshot = apps.get_model("tracker", "PriceSnapshot")
+
+    latest = PriceSnapshot.objects.filter(item=OuterRef("pk")).order_by("-captured_at")
+    CatalogItem.objects.update(
+        latest_snapshot=Subquery(latest.values("pk")[:1]),
+        latest_captured_at=Subquery(latest.values("captured_at")[:1]),
+        latest_low=Subquery(latest.values("low")[:1]),
+        latest_mid=Subquery(latest.values("mid")[:1]),
+        latest_high=Subquery(latest.values("high")[:1]),
+        latest_market=Subquery(latest.values("market")[:1]),
+        latest_direct_low=Subquery(latest.values("direct_low")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_portfoliosummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_captured_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_direct_low',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_high',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_low',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_market',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_mid',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='latest_snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tracker.pricesnapshot'),
+        ),
+        migrations.RunPython(backfill_latest_price, migrations.RunPython.noop),
+    ]
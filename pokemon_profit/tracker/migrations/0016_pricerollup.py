@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_catalogitem_latest_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Daily'), ('week', 'Weekly'), ('month', 'Monthly')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('open', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('high', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('low', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('close', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='tracker.catalogitem')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('item', 'period', 'period_start'), name='uniq_item_period_start')],
+            },
+        ),
+    ]
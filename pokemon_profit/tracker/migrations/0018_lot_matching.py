@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:08
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CENTS = Decimal("0.01")
+
+
+def _fifo_costs(lots, sales):
+    """
+    Frozen FIFO matcher: each sale takes one unit from the oldest lot bought
+    on or before its date. Yields (sale, lot_pk, quantity, cost) per match and
+    sets cost_basis / realized_gain on every sale.
+    """
+    lots = sorted(lots, key=lambda l: (l.date, l.pk))
+    remaining = {l.pk: l.quantity for l in lots}
+    for s in sorted(sales, key=lambda s: (s.date, s.pk)):
+        cost = Decimal("0")
+        for lot in lots:
+            if lot.date > s.date or not remaining[lot.pk]:
+                continue
+            remaining[lot.pk] -= 1
+            cost = lot.price_each
+            yield s, lot.pk, 1, cost
+            break
+        s.cost_basis = cost.quantize(CENTS, rounding=ROUND_HALF_UP)
+        s.realized_gain = (s.price - s.cost_basis).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def backfill_lots(apps, schema_editor):
+    Purchase = apps.get_model("tracker", "Purchase")
+    Sale = apps.get_model("tracker", "Sale")
+    LotMatch = apps.get_model("tracker", "LotMatch")
+
+    for owner in ("card_id", "sealed_product_id"):
+        owner_ids = Sale.objects.filter(**{f"{owner}__isnull": False}).values_list(owner, flat=True).distinct()
+        for owner_id in owner_ids:
+            lots = list(Purchase.objects.filter(**{owner: owner_id}).only("pk", "date", "quantity", "price_each"))
+            sales = list(Sale.objects.filter(**{owner: owner_id}))
+            LotMatch.objects.bulk_create([
+                LotMatch(sale_id=s.pk, purchase_id=lot_pk, quantity=qty, cost=cost)
+                for s, lot_pk, qty, cost in _fifo_costs(lots, sales)
+            ])
+            Sale.objects.bulk_update(sales, ["cost_basis", "realized_gain"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0017_portfoliovaluepoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='cost_basis_method',
+            field=models.CharField(choices=[('fifo', 'FIFO'), ('lifo', 'LIFO'), ('specific', 'Specific lot')], default='fifo', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='cost_basis',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='lot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tracker.purchase'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='realized_gain',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='sealedproduct',
+            name='cost_basis_method',
+            field=models.CharField(choices=[('fifo', 'FIFO'), ('lifo', 'LIFO'), ('specific', 'Specific lot')], default='fifo', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='LotMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('cost', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('purchase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_matches', to='tracker.purchase')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_matches', to='tracker.sale')),
+            ],
+        ),
+        migrations.RunPython(backfill_lots, migrations.RunPython.noop),
+    ]
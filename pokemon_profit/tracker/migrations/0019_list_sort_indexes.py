@@ -0,0 +1,215 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:10
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+VALUATION_COLUMNS = [
+    "cached_market_value", "cached_total_spent", "cached_total_sales",
+    "cached_realized_profit", "cached_unrealized_profit",
+]
+
+
+def _money(v):
+    return (v or Decimal("0")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def _backfill_valuation(apps, schema_editor, model_name, owner, per_unit=False):
+    """Fills the cached_* columns the way ValuationQuerySet.refresh_valuation() does, on the historical models."""
+    model = apps.get_model("tracker", model_name)
+    Purchase, Sale, MarketPrice = (apps.get_model("tracker", n) for n in ("Purchase", "Sale", "MarketPrice"))
+    money_field = DecimalField(max_digits=12, decimal_places=2)
+    zero = Value(Decimal("0"), output_field=money_field)
+
+    def summed(source, expr):
+        qs = (
+            source.objects.filter(**{owner: OuterRef("pk")}).order_by().values(owner)
+            .annotate(total=Sum(expr, output_field=money_field)).values("total")
+        )
+        return Coalesce(Subquery(qs, output_field=money_field), zero)
+
+    manual = Subquery(
+        MarketPrice.objects.filter(**{owner: OuterRef("pk")}).order_by("-date").values("price")[:1],
+        output_field=money_field,
+    )
+    market = Coalesce(manual, F("catalog_item__latest_market"), zero)
+    if per_unit:
+        market = market * F("quantity")
+    rows = model.objects.order_by().annotate(
+        market=market,
+        spent=summed(Purchase, F("price_each") * F("quantity")),
+        sales=summed(Sale, F("price")),
+        realized=summed(Sale, Coalesce(F("realized_gain"), F("price"))),
+    ).values_list("pk", "market", "spent", "sales", "realized")
+    params = [
+        [_money(market), _money(spent), _money(sales), _money(realized), _money(market - spent), pk]
+        for pk, market, spent, sales, realized in rows.iterator(chunk_size=2000)
+    ]
+    qn = schema_editor.connection.ops.quote_name
+    sql = (
+        f"UPDATE {qn(model._meta.db_table)} SET {', '.join(f'{qn(c)} = %s' for c in VALUATION_COLUMNS)} "
+        f"WHERE {qn(model._meta.pk.column)} = %s"
+    )
+    with schema_editor.connection.cursor() as cur:
+        cur.executemany(sql, params)
+
+
+def backfill_cached_valuation(apps, schema_editor):
+    _backfill_valuation(apps, schema_editor, "Card", "card")
+    _backfill_valuation(apps, schema_editor, "SealedProduct", "sealed_product", per_unit=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0018_lot_matching'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='cached_market_value',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='cached_realized_profit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='cached_total_sales',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='cached_total_spent',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='cached_unrealized_profit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='sealedproduct',
+            name='cached_market_value',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='sealedproduct',
+            name='cached_realized_profit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='sealedproduct',
+            name='cached_total_sales',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='sealedproduct',
+            name='cached_total_spent',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='sealedproduct',
+            name='cached_unrealized_profit',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'name', 'id'], name='card_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'set_name', 'id'], name='card_user_set_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'card_number', 'id'], name='card_user_card_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'printing', 'id'], name='card_user_printing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'cached_market_value', 'id'], name='card_user_market_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'cached_total_spent', 'id'], name='card_user_total_spent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'cached_total_sales', 'id'], name='card_user_total_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'cached_realized_profit', 'id'], name='card_user_realized_profi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'cached_unrealized_profit', 'id'], name='card_user_unrealized_pro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['user', 'date', 'id'], name='purchase_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['user', 'quantity', 'id'], name='purchase_user_quantity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['user', 'price_each', 'id'], name='purchase_user_price_each_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['user', 'date', 'id'], name='sale_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['user', 'price', 'id'], name='sale_user_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['user', 'platform', 'id'], name='sale_user_platform_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'name', 'id'], name='sealed_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'set_name', 'id'], name='sealed_user_set_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'quantity', 'id'], name='sealed_user_quantity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'cached_market_value', 'id'], name='sealed_user_market_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'cached_total_spent', 'id'], name='sealed_user_total_spent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'cached_total_sales', 'id'], name='sealed_user_total_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'cached_realized_profit', 'id'], name='sealed_user_realized_profi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sealedproduct',
+            index=models.Index(fields=['user', 'cached_unrealized_profit', 'id'], name='sealed_user_unrealized_pro_idx'),
+        ),
+        migrations.RunPython(backfill_cached_valuation, migrations.RunPython.noop),
+    ]
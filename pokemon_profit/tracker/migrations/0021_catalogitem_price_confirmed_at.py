@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0020_import_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogitem',
+            name='price_confirmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0021_catalogitem_price_confirmed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSetState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=10)),
+                ('set_id', models.CharField(max_length=80)),
+                ('crc32', models.BigIntegerField()),
+                ('size', models.BigIntegerField()),
+                ('set_name', models.CharField(blank=True, default='', max_length=255)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('language', 'set_id'), name='uniq_catalog_set_state')],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+from tracker.matching import norm, number_key, token_key
+
+
+def _backfill(schema_editor, model, sources, keys):
+    """Fills `keys` (key column -> (source index, normalizer)) with one executemany of per-row UPDATEs."""
+    qn = schema_editor.connection.ops.quote_name
+    rows = [
+        [fn(values[i] or "") for i, fn in keys.values()] + [pk]
+        for pk, *values in model.objects.values_list("pk", *sources).iterator(chunk_size=2000)
+    ]
+    sql = (
+        f"UPDATE {qn(model._meta.db_table)} SET {', '.join(f'{qn(k)} = %s' for k in keys)} "
+        f"WHERE {qn(model._meta.pk.column)} = %s"
+    )
+    with schema_editor.connection.cursor() as cur:
+        cur.executemany(sql, rows)
+
+
+def backfill_match_keys(apps, schema_editor):
+    _backfill(schema_editor, apps.get_model("tracker", "CatalogItem"), ["name", "card_number"], {
+        "name_key": (0, norm), "number_key": (1, number_key), "token_key": (0, token_key),
+    })
+    _backfill(schema_editor, apps.get_model("tracker", "CardCatalog"), ["name", "number", "set_name"], {
+        "name_key": (0, norm), "number_key": (1, number_key), "set_key": (2, norm),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0022_catalog_set_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardcatalog',
+            name='name_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='cardcatalog',
+            name='number_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cardcatalog',
+            name='set_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='name_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='number_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='catalogitem',
+            name='token_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='cardcatalog',
+            index=models.Index(fields=['set_key', 'number_key'], name='cardcatalog_set_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardcatalog',
+            index=models.Index(fields=['number_key', 'name_key'], name='cardcatalog_number_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogitem',
+            index=models.Index(fields=['number_key', 'name_key'], name='catalogitem_number_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogitem',
+            index=models.Index(fields=['name_key'], name='catalogitem_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogitem',
+            index=models.Index(fields=['token_key'], name='catalogitem_token_key_idx'),
+        ),
+        migrations.RunPython(backfill_match_keys, migrations.RunPython.noop),
+    ]
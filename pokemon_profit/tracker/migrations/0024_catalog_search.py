@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# rowid = source pk * 2 + (0 for a CatalogItem, 1 for a CardCatalog entry)
+ITEM_ROW = (
+    "SELECT {t}.id * 2, {t}.name, '', {t}.card_number, "
+    "CASE WHEN {t}.is_sealed THEN 'sealed' ELSE 'single' END"
+)
+CARD_ROW = "SELECT {t}.id * 2 + 1, {t}.name, {t}.set_name, {t}.number, 'card'"
+
+INSTALL = [
+    "CREATE VIRTUAL TABLE tracker_catalog_search USING fts5("
+    "name, set_name, number, kind UNINDEXED, tokenize = 'trigram')",
+
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) "
+    + ITEM_ROW.format(t="i") + " FROM tracker_catalogitem i",
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) "
+    + CARD_ROW.format(t="c") + " FROM tracker_cardcatalog c",
+
+    # CatalogItem
+    "CREATE TRIGGER tracker_catalogitem_search_ins AFTER INSERT ON tracker_catalogitem BEGIN "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + ITEM_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER tracker_catalogitem_search_upd AFTER UPDATE OF name, card_number, is_sealed ON tracker_catalogitem "
+    "WHEN old.name IS NOT new.name OR old.card_number IS NOT new.card_number OR old.is_sealed IS NOT new.is_sealed BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2; "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + ITEM_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER tracker_catalogitem_search_del AFTER DELETE ON tracker_catalogitem BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2; END",
+
+    # CardCatalog
+    "CREATE TRIGGER tracker_cardcatalog_search_ins AFTER INSERT ON tracker_cardcatalog BEGIN "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + CARD_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER tracker_cardcatalog_search_upd AFTER UPDATE OF name, set_name, number ON tracker_cardcatalog "
+    "WHEN old.name IS NOT new.name OR old.set_name IS NOT new.set_name OR old.number IS NOT new.number BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2 + 1; "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + CARD_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER tracker_cardcatalog_search_del AFTER DELETE ON tracker_cardcatalog BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2 + 1; END",
+]
+
+UNINSTALL = [
+    *(f"DROP TRIGGER IF EXISTS tracker_{m}_search_{op}" for m in ("catalogitem", "cardcatalog") for op in ("ins", "upd", "del")),
+    "DROP TABLE IF EXISTS tracker_catalog_search",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; tracker.services.search falls back to icontains elsewhere
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0023_catalog_match_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(INSTALL), _run(UNINSTALL)),
+    ]
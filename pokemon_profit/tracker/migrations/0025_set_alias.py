@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:52
+
+import tracker.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0024_catalog_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SetAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=255)),
+                ('set_id', models.CharField(db_index=True, max_length=80)),
+                ('alias_key', models.CharField(editable=False, max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'set aliases',
+            },
+            bases=(tracker.models.MatchKeysMixin, models.Model),
+        ),
+    ]
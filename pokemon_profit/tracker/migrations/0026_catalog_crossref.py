@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0025_set_alias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCrossRef',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crossrefs', to='tracker.cardcatalog')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crossrefs', to='tracker.catalogitem')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cardcatalog',
+            name='printings',
+            field=models.ManyToManyField(blank=True, related_name='catalog_cards', through='tracker.CatalogCrossRef', to='tracker.catalogitem'),
+        ),
+        migrations.CreateModel(
+            name='CatalogSetGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_id', models.IntegerField()),
+                ('set_id', models.CharField(db_index=True, max_length=80)),
+                ('shared', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('group_id', 'set_id'), name='uniq_catalog_set_group')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='catalogcrossref',
+            index=models.Index(fields=['item', 'card'], name='catalogcrossref_item_card_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='catalogcrossref',
+            constraint=models.UniqueConstraint(fields=('card', 'item'), name='uniq_catalog_crossref'),
+        ),
+    ]
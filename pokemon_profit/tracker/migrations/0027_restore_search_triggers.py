@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Adding CardCatalog.printings (0026) rebuilt tracker_cardcatalog on SQLite,
+# which drops the triggers 0024 put on it. A frozen copy of 0024's SQL:
+# recreate what is missing and refill the index from both catalogs.
+
+# rowid = source pk * 2 + (0 for a CatalogItem, 1 for a CardCatalog entry)
+ITEM_ROW = (
+    "SELECT {t}.id * 2, {t}.name, '', {t}.card_number, "
+    "CASE WHEN {t}.is_sealed THEN 'sealed' ELSE 'single' END"
+)
+CARD_ROW = "SELECT {t}.id * 2 + 1, {t}.name, {t}.set_name, {t}.number, 'card'"
+
+RESTORE = [
+    # CatalogItem
+    "CREATE TRIGGER IF NOT EXISTS tracker_catalogitem_search_ins AFTER INSERT ON tracker_catalogitem BEGIN "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + ITEM_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER IF NOT EXISTS tracker_catalogitem_search_upd AFTER UPDATE OF name, card_number, is_sealed ON tracker_catalogitem "
+    "WHEN old.name IS NOT new.name OR old.card_number IS NOT new.card_number OR old.is_sealed IS NOT new.is_sealed BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2; "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + ITEM_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER IF NOT EXISTS tracker_catalogitem_search_del AFTER DELETE ON tracker_catalogitem BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2; END",
+
+    # CardCatalog
+    "CREATE TRIGGER IF NOT EXISTS tracker_cardcatalog_search_ins AFTER INSERT ON tracker_cardcatalog BEGIN "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + CARD_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER IF NOT EXISTS tracker_cardcatalog_search_upd AFTER UPDATE OF name, set_name, number ON tracker_cardcatalog "
+    "WHEN old.name IS NOT new.name OR old.set_name IS NOT new.set_name OR old.number IS NOT new.number BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2 + 1; "
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) " + CARD_ROW.format(t="new") + "; END",
+    "CREATE TRIGGER IF NOT EXISTS tracker_cardcatalog_search_del AFTER DELETE ON tracker_cardcatalog BEGIN "
+    "DELETE FROM tracker_catalog_search WHERE rowid = old.id * 2 + 1; END",
+
+    # rows written while the triggers were gone
+    "DELETE FROM tracker_catalog_search",
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) "
+    + ITEM_ROW.format(t="i") + " FROM tracker_catalogitem i",
+    "INSERT INTO tracker_catalog_search (rowid, name, set_name, number, kind) "
+    + CARD_ROW.format(t="c") + " FROM tracker_cardcatalog c",
+]
+
+
+def restore(apps, schema_editor):
+    # FTS5 is SQLite-only; tracker.services.search falls back to icontains elsewhere
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in RESTORE:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0026_catalog_crossref'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+# Unrealized profit used to be market value minus everything ever spent on a
+# holding. It is now measured against the open lots only: what was spent less
+# the cost basis the lot matcher charged to sales.
+
+
+def _summed(model, owner, column, outer="pk"):
+    money_field = DecimalField(max_digits=12, decimal_places=2)
+    qs = (
+        model.objects.filter(**{owner: OuterRef(outer)}).order_by().values(owner)
+        .annotate(total=Sum(column, output_field=money_field)).values("total")
+    )
+    return Coalesce(Subquery(qs, output_field=money_field), Value(Decimal("0"), output_field=money_field))
+
+
+def recompute_unrealized(apps, schema_editor):
+    Sale = apps.get_model("tracker", "Sale")
+    for model_name, owner in (("Card", "card"), ("SealedProduct", "sealed_product")):
+        apps.get_model("tracker", model_name).objects.update(
+            cached_unrealized_profit=(
+                F("cached_market_value") - F("cached_total_spent") + _summed(Sale, owner, "cost_basis")
+            ),
+        )
+
+    PortfolioSummary = apps.get_model("tracker", "PortfolioSummary")
+    PortfolioSummary.objects.update(
+        unrealized_profit=(
+            _summed(apps.get_model("tracker", "Card"), "user", "cached_unrealized_profit", "user_id")
+            + _summed(apps.get_model("tracker", "SealedProduct"), "user", "cached_unrealized_profit", "user_id")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0027_restore_search_triggers'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_unrealized, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,135 @@
-from django.db import models
+from django.db import models, transaction
 from django.forms import ValidationError
 from decimal import Decimal, ROUND_HALF_UP
-from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+from django.db.models import Sum, F, Q, DecimalField, ExpressionWrapper, OuterRef, Subquery, Value
 from django.db.models.functions import Coalesce
 from django.conf import settings
 
+from tracker import matching
+
 MONEY_Q = Decimal("0.01")
 
 def money(v) -> Decimal:
     return (v or Decimal("0")).quantize(MONEY_Q, rounding=ROUND_HALF_UP)
 
+FIFO = "fifo"
+LIFO = "lifo"
+SPECIFIC = "specific"
+COST_BASIS_CHOICES = [(FIFO, "FIFO"), (LIFO, "LIFO"), (SPECIFIC, "Specific lot")]
+
+
+def _money_field():
+    return DecimalField(max_digits=12, decimal_places=2)
+
+
+def _zero():
+    return Value(Decimal("0"), output_field=_money_field())
+
+
+def _latest_manual_price(owner):
+    return Subquery(
+        MarketPrice.objects.filter(**{owner: OuterRef("pk")}).order_by("-date").values("price")[:1],
+        output_field=_money_field(),
+    )
+
+
+def _latest_snapshot_market():
+    return F("catalog_item__latest_market")
+
+
+def _summed(model, owner, expr):
+    qs = (
+        model.objects.filter(**{owner: OuterRef("pk")})
+        .order_by()
+        .values(owner)
+        .annotate(total=Sum(expr, output_field=_money_field()))
+        .values("total")
+    )
+    return Coalesce(Subquery(qs, output_field=_money_field()), _zero())
+
+
+class ValuationQuerySet(models.QuerySet):
+    """
+    Adds ann_market_value / ann_total_spent / ann_total_sales /
+    ann_realized_profit / ann_open_cost / ann_unrealized_profit in SQL, so a
+    list of owned items costs one query instead of several per row.
+
+    ann_open_cost is what is still held: purchases less the cost basis the
+    lot matcher charged to sales. Unrealized profit is measured against it.
+    """
+    owner_field = None
+
+    def _market_value_expr(self):
+        return Coalesce(_latest_manual_price(self.owner_field), _latest_snapshot_market(), _zero())
+
+    def with_valuation(self):
+        owner = self.owner_field
+        return self.annotate(
+            ann_market_value=self._market_value_expr(),
+            ann_total_spent=_summed(Purchase, owner, F("price_each") * F("quantity")),
+            ann_total_sales=_summed(Sale, owner, F("price")),
+            ann_realized_profit=_summed(Sale, owner, Coalesce(F("realized_gain"), F("price"))),
+            ann_sold_cost=_summed(Sale, owner, Coalesce(F("cost_basis"), _zero())),
+        ).annotate(
+            ann_open_cost=ExpressionWrapper(
+                F("ann_total_spent") - F("ann_sold_cost"), output_field=_money_field()
+            ),
+        ).annotate(
+            ann_unrealized_profit=ExpressionWrapper(
+                F("ann_market_value") - F("ann_open_cost"), output_field=_money_field()
+            ),
+        )
+
+
+    def refresh_valuation(self, batch_size: int = 500) -> int:
+        """
+        Copies with_valuation() into the cached_* columns, which list views
+        sort and paginate on through (user, column, id) indexes.
+        """
+        rows = self.order_by().with_valuation().values_list("pk", *CACHED_VALUATION_FIELDS.values())
+        objs = [
+            self.model(pk=pk, **{f: money(v) for f, v in zip(CACHED_VALUATION_FIELDS, vals)})
+            for pk, *vals in rows
+        ]
+        self.model.objects.bulk_update(objs, list(CACHED_VALUATION_FIELDS), batch_size=batch_size)
+        return len(objs)
+
+
+# cached column -> with_valuation() annotation
+CACHED_VALUATION_FIELDS = {
+    "cached_market_value": "ann_market_value",
+    "cached_total_spent": "ann_total_spent",
+    "cached_total_sales": "ann_total_sales",
+    "cached_realized_profit": "ann_realized_profit",
+    "cached_unrealized_profit": "ann_unrealized_profit",
+}
+
+
+def _cached_money_field():
+    return models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"), editable=False)
+
+
+def _sort_indexes(prefix: str, fields) -> list:
+    return [
+        models.Index(fields=["user", field, "id"], name=f"{prefix}_user_{field.removeprefix('cached_')[:14]}_idx")
+        for field in fields
+    ]
+
+
+class CardQuerySet(ValuationQuerySet):
+    owner_field = "card"
+
+
+class SealedProductQuerySet(ValuationQuerySet):
+    owner_field = "sealed_product"
+
+    def _market_value_expr(self):
+        return ExpressionWrapper(
+            super()._market_value_expr() * F("quantity"),
+            output_field=_money_field(),
+        )
+
+
 class Card(models.Model):
     name = models.CharField(max_length=100)
     set_name = models.CharField(max_length=255, blank=True, default="")
@@ -20,35 +140,63 @@ class Card(models.Model):
     catalog_id_str = models.CharField(max_length=80, blank=True, null=True)
     catalog_item = models.ForeignKey("CatalogItem", null=True, blank=True, on_delete=models.SET_NULL, related_name="owned_cards")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cards")
+    cost_basis_method = models.CharField(max_length=10, choices=COST_BASIS_CHOICES, default=FIFO)
+
+    # Denormalized with_valuation() figures, see ValuationQuerySet.refresh_valuation
+    cached_market_value = _cached_money_field()
+    cached_total_spent = _cached_money_field()
+    cached_total_sales = _cached_money_field()
+    cached_realized_profit = _cached_money_field()
+    cached_unrealized_profit = _cached_money_field()
+
+    objects = CardQuerySet.as_manager()
+
+    class Meta:
+        indexes = _sort_indexes("card", [
+            "name", "set_name", "card_number", "printing", *CACHED_VALUATION_FIELDS,
+        ])
     
     @property
     def current_market_value(self):
+        if hasattr(self, "ann_market_value"):
+            return money(self.ann_market_value)
+
         latest_manual = self.marketprice_set.order_by("-date").first()
         if latest_manual and latest_manual.price is not None:
             return money(latest_manual.price)
 
-        if self.catalog_item_id:
-            snap = self.catalog_item.prices.order_by("-captured_at").first()
-            if snap and snap.market is not None:
-                return money(snap.market)
+        if self.catalog_item_id and self.catalog_item.latest_market is not None:
+            return money(self.catalog_item.latest_market)
 
         return Decimal("0.00")
 
     @property
     def total_spent(self):
+        if hasattr(self, "ann_total_spent"):
+            return money(self.ann_total_spent)
         return money(sum((p.total_price for p in self.purchase_set.all()), Decimal("0")))
 
     @property
     def total_sales(self):
+        if hasattr(self, "ann_total_sales"):
+            return money(self.ann_total_sales)
         return money(sum((s.price for s in self.sale_set.all()), Decimal("0")))
 
     @property
     def realized_profit(self):
-        return money(self.total_sales - self.total_spent)
+        if hasattr(self, "ann_realized_profit"):
+            return money(self.ann_realized_profit)
+        return realized_gain_of(self.sale_set.all())
+
+    @property
+    def open_cost(self):
+        if hasattr(self, "ann_open_cost"):
+            return money(self.ann_open_cost)
+        return money(self.total_spent - sold_cost_of(self.sale_set.all()))
 
     @property
     def unrealized_profit(self):
-        return money(self.current_market_value - self.total_spent)
+        return money(self.current_market_value - self.open_cost)
     
     def __str__(self):
         return f"{self.name} ({self.set_name} {self.card_number})"
@@ -60,6 +208,21 @@ class SealedProduct(models.Model):
     set_name = models.CharField(max_length=200, blank=True, default="")
     quantity = models.PositiveIntegerField(default=0)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sealed_products")
+    cost_basis_method = models.CharField(max_length=10, choices=COST_BASIS_CHOICES, default=FIFO)
+
+    # Denormalized with_valuation() figures, see ValuationQuerySet.refresh_valuation
+    cached_market_value = _cached_money_field()
+    cached_total_spent = _cached_money_field()
+    cached_total_sales = _cached_money_field()
+    cached_realized_profit = _cached_money_field()
+    cached_unrealized_profit = _cached_money_field()
+
+    objects = SealedProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = _sort_indexes("sealed", [
+            "name", "set_name", "quantity", *CACHED_VALUATION_FIELDS,
+        ])
 
     catalog_item = models.ForeignKey(
         "CatalogItem",
@@ -79,19 +242,22 @@ class SealedProduct(models.Model):
 
     @property
     def current_market_value(self):
+        if hasattr(self, "ann_market_value"):
+            return money(self.ann_market_value)
+
         latest_manual = self.marketprice_set.order_by("-date").first()
         if latest_manual and latest_manual.price is not None:
             return money(latest_manual.price * (self.quantity or 0))
 
-        if self.catalog_item_id:
-            snap = self.catalog_item.prices.order_by("-captured_at").first()
-            if snap and snap.market is not None:
-                return money(snap.market * (self.quantity or 0))
+        if self.catalog_item_id and self.catalog_item.latest_market is not None:
+            return money(self.catalog_item.latest_market * (self.quantity or 0))
 
         return Decimal("0.00")
 
     @property
     def total_spent(self):
+        if hasattr(self, "ann_total_spent"):
+            return money(self.ann_total_spent)
         total = self.purchase_set.filter(sealed_product=self).aggregate(
             total=Coalesce(Sum(self._spent_expr()), Decimal("0"))
         )["total"]
@@ -99,6 +265,8 @@ class SealedProduct(models.Model):
 
     @property
     def total_sales(self):
+        if hasattr(self, "ann_total_sales"):
+            return money(self.ann_total_sales)
         total = self.sale_set.filter(sealed_product=self).aggregate(
             total=Coalesce(Sum("price"), Decimal("0"))
         )["total"]
@@ -106,11 +274,19 @@ class SealedProduct(models.Model):
 
     @property
     def realized_profit(self):
-        return money(self.total_sales - self.total_spent)
+        if hasattr(self, "ann_realized_profit"):
+            return money(self.ann_realized_profit)
+        return realized_gain_of(self.sale_set.all())
     
+    @property
+    def open_cost(self):
+        if hasattr(self, "ann_open_cost"):
+            return money(self.ann_open_cost)
+        return money(self.total_spent - sold_cost_of(self.sale_set.all()))
+
     @property
     def unrealized_profit(self):
-        return money(self.current_market_value - self.total_spent)
+        return money(self.current_market_value - self.open_cost)
     
 class Purchase(models.Model):
     card = models.ForeignKey("Card", null=True, blank=True, on_delete=models.CASCADE)
@@ -119,6 +295,9 @@ class Purchase(models.Model):
     price_each = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="purchases")
+
+    class Meta:
+        indexes = _sort_indexes("purchase", ["date", "quantity", "price_each"])
     
     @property
     def total_price(self):
@@ -136,6 +315,14 @@ class Sale(models.Model):
     date = models.DateField()
     platform = models.CharField(max_length=100, blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sales")
+    # Specific-lot cost basis: the Purchase this unit came out of.
+    lot = models.ForeignKey(Purchase, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    # Filled in by tracker.services.lots whenever the position's lots change.
+    cost_basis = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    realized_gain = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = _sort_indexes("sale", ["date", "price", "platform"])
     
     def __str__(self):
         item = self.card or self.sealed_product
@@ -150,6 +337,33 @@ class Sale(models.Model):
             raise ValidationError("Select either a Card OR a Sealed Product (not both).")
 
 
+def realized_gain_of(sales) -> Decimal:
+    """Sum of per-sale realized gains; a sale not yet matched counts at full price."""
+    return money(sum(
+        (s.realized_gain if s.realized_gain is not None else s.price for s in sales),
+        Decimal("0"),
+    ))
+
+
+def sold_cost_of(sales) -> Decimal:
+    """Cost basis the lot matcher charged to `sales`; unmatched sales carry none."""
+    return money(sum((s.cost_basis or Decimal("0") for s in sales), Decimal("0")))
+
+
+class LotMatch(models.Model):
+    """
+    Part of a Purchase lot consumed by a Sale under the position's cost-basis
+    method. Rebuilt per Card/SealedProduct by tracker.services.lots.
+    """
+    sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name="lot_matches")
+    purchase = models.ForeignKey(Purchase, on_delete=models.CASCADE, related_name="lot_matches")
+    quantity = models.PositiveIntegerField()
+    cost = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.sale_id} <- {self.purchase_id} x{self.quantity}"
+
+
 class TcgApisCardIndex(models.Model):
     group_id = models.IntegerField(db_index=True)
     number = models.CharField(max_length=20, db_index=True)  
@@ -160,7 +374,38 @@ class TcgApisCardIndex(models.Model):
     class Meta:
         unique_together = ("group_id", "number")
         
-class CardCatalog(models.Model):
+class MatchKeysMixin:
+    """
+    Keeps normalized match key columns (see tracker.matching) in sync with
+    their source columns on save(). Bulk writers call fill_match_keys()
+    (or match_keys_for()) themselves.
+    """
+    MATCH_KEYS = {}  # key field -> (source field, normalizer)
+
+    @classmethod
+    def match_keys_for(cls, **sources) -> dict:
+        """Key field values for the given source field values."""
+        return {key: fn(sources[src]) for key, (src, fn) in cls.MATCH_KEYS.items() if src in sources}
+
+    def fill_match_keys(self) -> None:
+        for key, (src, fn) in self.MATCH_KEYS.items():
+            setattr(self, key, fn(getattr(self, src)))
+
+    def save(self, *args, **kwargs):
+        self.fill_match_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields, *(key for key, (src, _) in self.MATCH_KEYS.items() if src in update_fields)
+            }
+        return super().save(*args, **kwargs)
+
+
+def _match_key_field(max_length: int):
+    return models.CharField(max_length=max_length, blank=True, default="", editable=False)
+
+
+class CardCatalog(MatchKeysMixin, models.Model):
     # Stable identity from dataset
     catalog_id = models.CharField(max_length=80, unique=True)  # e.g. "sv3pt5-199" style id (varies by dataset)
 
@@ -172,11 +417,54 @@ class CardCatalog(models.Model):
     image_small = models.URLField(blank=True, null=True)
     image_large = models.URLField(blank=True, null=True)
 
+    # Normalized match keys (tracker.matching), see MatchKeysMixin
+    name_key = _match_key_field(255)
+    number_key = _match_key_field(20)
+    set_key = _match_key_field(255)
+
+    # The TCGCSV products of this card, one per printing (rebuilt by
+    # tracker.services.crossref after every import)
+    printings = models.ManyToManyField(
+        "CatalogItem", through="CatalogCrossRef", related_name="catalog_cards", blank=True,
+    )
+
+    MATCH_KEYS = {
+        "name_key": ("name", matching.norm),
+        "number_key": ("number", matching.number_key),
+        "set_key": ("set_name", matching.norm),
+    }
+
     class Meta:
         indexes = [
             models.Index(fields=["set_id", "number"]),
             models.Index(fields=["set_name", "number"]),
+            models.Index(fields=["set_key", "number_key"], name="cardcatalog_set_number_idx"),
+            models.Index(fields=["number_key", "name_key"], name="cardcatalog_number_name_idx"),
         ]
+
+    def __str__(self):
+        return f"{self.name} ({self.set_name} #{self.number})"
+
+
+class SetAlias(MatchKeysMixin, models.Model):
+    """
+    Another name for a CardCatalog set, e.g. TCGplayer's "SV: Scarlet &
+    Violet 151" for set_id "sv3pt5". link_to_catalog resolves a Card's
+    set_name through these before trying looser matches.
+    """
+    alias = models.CharField(max_length=255)
+    set_id = models.CharField(max_length=80, db_index=True)
+    alias_key = models.CharField(max_length=255, unique=True, editable=False)
+
+    MATCH_KEYS = {"alias_key": ("alias", matching.norm)}
+
+    class Meta:
+        verbose_name_plural = "set aliases"
+
+    def __str__(self):
+        return f"{self.alias} -> {self.set_id}"
+
+
 class MarketPrice(models.Model):
     card = models.ForeignKey(Card, on_delete=models.CASCADE, null=True, blank=True)
     sealed_product = models.ForeignKey(SealedProduct, on_delete=models.CASCADE, null=True, blank=True)
@@ -185,7 +473,7 @@ class MarketPrice(models.Model):
     date = models.DateTimeField(auto_now_add=True)
 
 
-class CatalogItem(models.Model):
+class CatalogItem(MatchKeysMixin, models.Model):
     """
     Represents a TCGplayer product from TCGCSV.
     Works for both sealed products and single cards.
@@ -201,14 +489,63 @@ class CatalogItem(models.Model):
     printing = models.CharField(max_length=60, blank=True, default="Normal")
     is_sealed = models.BooleanField(default=False)
 
+    # Denormalized copy of the newest PriceSnapshot, kept in sync by
+    # PriceSnapshot.save() so current-price reads never scan the history.
+    latest_snapshot = models.ForeignKey(
+        "PriceSnapshot", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    latest_captured_at = models.DateTimeField(null=True, blank=True)
+    latest_low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    latest_mid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    latest_high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    latest_market = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    latest_direct_low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Last time an import saw the latest_* prices unchanged without storing
+    # a duplicate snapshot (import_tcgcsv --skip-unchanged-prices).
+    price_confirmed_at = models.DateTimeField(null=True, blank=True)
+
+    # Hash of the TCGCSV row last imported for this item; an identical row
+    # is skipped on the next import (see tracker.services.tcgcsv).
+    import_fingerprint = models.CharField(max_length=32, blank=True, default="", editable=False)
+
+    # Normalized match keys (tracker.matching), see MatchKeysMixin
+    name_key = _match_key_field(255)
+    number_key = _match_key_field(50)
+    token_key = _match_key_field(255)
+
+    MATCH_KEYS = {
+        "name_key": ("name", matching.norm),
+        "number_key": ("card_number", matching.number_key),
+        "token_key": ("name", matching.token_key),
+    }
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["product_id", "printing"], name="uniq_product_printing")
         ]
+        indexes = [
+            models.Index(fields=["number_key", "name_key"], name="catalogitem_number_name_idx"),
+            models.Index(fields=["name_key"], name="catalogitem_name_key_idx"),
+            models.Index(fields=["token_key"], name="catalogitem_token_key_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} [{self.printing}] (#{self.product_id})"
 
+    @property
+    def prices_as_of(self):
+        """When the latest_* prices were last known to be current."""
+        times = [t for t in (self.latest_captured_at, self.price_confirmed_at) if t is not None]
+        return max(times) if times else None
+
+    def refresh_latest_price(self):
+        """Re-derive the latest_* columns from the full snapshot history."""
+        snap = self.prices.order_by("-captured_at").first()
+        fields = PriceSnapshot.latest_fields(snap)
+        CatalogItem.objects.filter(pk=self.pk).update(**fields)
+        for name, value in fields.items():
+            setattr(self, name, value)
+
 
 class PriceSnapshot(models.Model):
     """
@@ -228,3 +565,169 @@ class PriceSnapshot(models.Model):
             models.UniqueConstraint(fields=["item", "captured_at"], name="uniq_item_captured_at")
         ]
 
+    @staticmethod
+    def latest_fields(snap) -> dict:
+        """CatalogItem latest_* column values for `snap` (or cleared when None)."""
+        return {
+            "latest_snapshot": snap,
+            "latest_captured_at": snap.captured_at if snap else None,
+            "latest_low": snap.low if snap else None,
+            "latest_mid": snap.mid if snap else None,
+            "latest_high": snap.high if snap else None,
+            "latest_market": snap.market if snap else None,
+            "latest_direct_low": snap.direct_low if snap else None,
+        }
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            item = CatalogItem.objects.filter(pk=self.item_id)
+            if item.filter(latest_snapshot_id=self.pk, latest_captured_at__gt=self.captured_at).exists():
+                # the current latest snapshot was moved back in time
+                item.get().refresh_latest_price()
+                return
+            item.filter(
+                Q(latest_captured_at__isnull=True) | Q(latest_captured_at__lte=self.captured_at)
+            ).update(**self.latest_fields(self))
+
+
+
+class PortfolioSummary(models.Model):
+    """
+    Per-user rollup read by the dashboard. Kept current by tracker.signals
+    and rebuilt from scratch by `manage.py rebuild_portfolio_summary`.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="portfolio_summary")
+    cards_count = models.PositiveIntegerField(default=0)
+    sealed_count = models.PositiveIntegerField(default=0)
+    purchases_count = models.PositiveIntegerField(default=0)
+    sales_count = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    market_value = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    realized_profit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    unrealized_profit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Portfolio summary for {self.user}"
+
+
+class PriceRollup(models.Model):
+    """
+    Downsampled market-price history for a CatalogItem (open/high/low/close).
+    Written by `manage.py compact_prices` as old PriceSnapshots age out.
+    """
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    PERIOD_CHOICES = [(DAY, "Daily"), (WEEK, "Weekly"), (MONTH, "Monthly")]
+
+    item = models.ForeignKey(CatalogItem, on_delete=models.CASCADE, related_name="rollups")
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    open = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    close = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    samples = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["item", "period", "period_start"], name="uniq_item_period_start")
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} {self.period} {self.period_start}"
+
+
+class PortfolioValuePoint(models.Model):
+    """
+    One day of a user's portfolio value timeline. Rows from the earliest
+    changed date onward are dropped on writes and rebuilt lazily by
+    tracker.services.timeline.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="value_points")
+    date = models.DateField()
+    market_value = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date"], name="uniq_user_value_date")
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.date}: {self.market_value}"
+
+
+class ImportManifest(models.Model):
+    """
+    A TCGCSV file import_tcgcsv has fully imported. The same file (path,
+    content hash and row filters) is skipped on later runs.
+    """
+    path = models.CharField(max_length=500, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.BigIntegerField()
+    options = models.CharField(max_length=200, blank=True, default="")
+    imported_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path} ({self.sha256[:12]})"
+
+
+class CatalogSetState(models.Model):
+    """
+    A cards/<language>/<set_id>.json member import_catalog has fully
+    imported. The set is skipped while its CRC32, size and set name match.
+    """
+    language = models.CharField(max_length=10)
+    set_id = models.CharField(max_length=80)
+    crc32 = models.BigIntegerField()
+    size = models.BigIntegerField()
+    set_name = models.CharField(max_length=255, blank=True, default="")
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["language", "set_id"], name="uniq_catalog_set_state"),
+        ]
+
+    def __str__(self):
+        return f"{self.language}/{self.set_id} ({self.crc32:08x})"
+
+
+class CatalogSetGroup(models.Model):
+    """
+    A TCGCSV group (group_id) matched to a pokemon-tcg-data set (set_id)
+    by the cards they share. A group can cover more than one set, e.g. a
+    main set and its gallery subset.
+    """
+    group_id = models.IntegerField()
+    set_id = models.CharField(max_length=80, db_index=True)
+    shared = models.PositiveIntegerField(default=0)  # the group's singles matched in this set
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["group_id", "set_id"], name="uniq_catalog_set_group"),
+        ]
+
+    def __str__(self):
+        return f"group {self.group_id} <-> {self.set_id}"
+
+
+class CatalogCrossRef(models.Model):
+    """A CardCatalog entry and one CatalogItem printing of the same card."""
+    card = models.ForeignKey(CardCatalog, on_delete=models.CASCADE, related_name="crossrefs")
+    item = models.ForeignKey(CatalogItem, on_delete=models.CASCADE, related_name="crossrefs")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["card", "item"], name="uniq_catalog_crossref"),
+        ]
+        indexes = [
+            models.Index(fields=["item", "card"], name="catalogcrossref_item_card_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.card_id} <-> {self.item_id}"
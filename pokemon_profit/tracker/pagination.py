@@ -0,0 +1,97 @@
+import base64
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    sort: str
+    per_page: int
+    next_cursor: str | None
+    prev_cursor: str | None
+    toggles: dict  # column key -> sort param that (re)sorts by it
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+
+def _encode(sort: str, value, pk) -> str:
+    raw = json.dumps([sort, None if value is None else str(value), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(sort: str, cursor: str | None):
+    """(value, pk) from a cursor, or None if it is malformed or from another sort."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, pk = json.loads(raw)
+        pk = int(pk)
+    except (ValueError, TypeError):
+        return None
+    if cursor_sort != sort or value is None:
+        return None
+    return value, pk
+
+
+def keyset_paginate(qs, params, *, sorts: dict, default_sort: str) -> KeysetPage:
+    """
+    Cursor (keyset) pagination over `qs`.
+
+    `sorts` maps the public sort key to a model field; each field should have
+    a (user, field, id) index so any page costs the same as the first. The
+    request params are `sort` ("key" or "-key"), `per_page`, and one of
+    `after` / `before` holding a cursor from a previous page.
+    """
+    sort = params.get("sort") or default_sort
+    if sort.lstrip("-") not in sorts:
+        sort = default_sort
+    key = sort.lstrip("-")
+    field = sorts[key]
+    desc = sort.startswith("-")
+
+    try:
+        per_page = int(params.get("per_page") or settings.LIST_PAGE_SIZE)
+    except ValueError:
+        per_page = settings.LIST_PAGE_SIZE
+    per_page = max(1, min(per_page, settings.LIST_MAX_PAGE_SIZE))
+
+    after = _decode(sort, params.get("after"))
+    before = _decode(sort, params.get("before")) if after is None else None
+    cursor = after or before
+    # a previous page is the next page in the opposite direction, reversed
+    backwards = before is not None
+    walk_desc = desc != backwards
+
+    if cursor is not None:
+        value, pk = cursor
+        op = "lt" if walk_desc else "gt"
+        # the inclusive bound lets the database seek into the index;
+        # the OR only breaks ties among rows equal to the cursor value
+        qs = qs.filter(**{f"{field}__{op}e": value}).filter(
+            Q(**{f"{field}__{op}": value}) | Q(**{f"pk__{op}": pk})
+        )
+
+    order = [f"-{field}", "-pk"] if walk_desc else [field, "pk"]
+    rows = list(qs.order_by(*order)[: per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    has_next = more if not backwards else True
+    has_prev = cursor is not None if not backwards else more
+
+    return KeysetPage(
+        object_list=rows,
+        sort=sort,
+        per_page=per_page,
+        next_cursor=_encode(sort, getattr(rows[-1], field), rows[-1].pk) if rows and has_next else None,
+        prev_cursor=_encode(sort, getattr(rows[0], field), rows[0].pk) if rows and has_prev else None,
+        toggles={k: f"-{k}" if sort == k else k for k in sorts},
+    )
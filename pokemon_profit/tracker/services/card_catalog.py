@@ -0,0 +1,247 @@
+import json
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterator, NamedTuple
+
+import django
+from django.db import transaction
+
+from tracker.models import CardCatalog, CatalogSetState
+from tracker.services.shadow import ShadowTable
+
+DEFAULT_CHUNK = 1000
+
+# CardCatalog columns an import overwrites, in record order (match keys last)
+CATALOG_FIELDS = ["name", "set_id", "set_name", "number", "rarity", "image_small", "image_large", *CardCatalog.MATCH_KEYS]
+
+
+@dataclass
+class SyncStats:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+class SetMember(NamedTuple):
+    """A cards/<lang>/<set_id>.json member of the ZIP."""
+    set_id: str
+    set_name: str
+    filename: str
+    crc32: int
+    size: int
+
+
+def load_sets_map(z, lang: str) -> dict:
+    """
+    Returns { set_id: set_name } from the pokemon-tcg-data ZIP.
+    Common path: */sets/en.json
+    """
+    candidates = [n for n in z.namelist() if n.endswith(f"sets/{lang}.json")]
+    if not candidates:
+        return {}
+
+    sets = json.loads(z.read(candidates[0]).decode("utf-8"))
+    if isinstance(sets, dict) and "data" in sets:
+        sets = sets["data"]
+    if not isinstance(sets, list):
+        return {}
+
+    return {str(s.get("id")): str(s.get("name")) for s in sets if s.get("id") and s.get("name")}
+
+
+def card_record(c: dict, set_id: str, set_name: str) -> tuple[str, tuple] | None:
+    """(catalog_id, values in CATALOG_FIELDS order) for one card dict, or None if incomplete."""
+    cid = str(c.get("id") or "").strip()
+    name = (c.get("name") or "").strip()
+    number = str(c.get("number") or "").strip()
+    if not (cid and name and set_id and number):
+        return None
+
+    images = c.get("images") or {}
+    rarity = c.get("rarity")
+    name, set_name, number = name[:255], set_name[:255] if set_name else "", number[:20]
+    keys = CardCatalog.match_keys_for(name=name, number=number, set_name=set_name)
+    return cid, (
+        name,
+        set_id[:80],
+        set_name,
+        number,
+        rarity[:100] if isinstance(rarity, str) else None,
+        images.get("small"),
+        images.get("large"),
+        *(keys[k] for k in CardCatalog.MATCH_KEYS),
+    )
+
+
+def parse_set(raw: bytes, set_id: str, set_name: str) -> tuple[list[tuple], int]:
+    """
+    Decodes one cards/<lang>/<set_id>.json member.
+    Returns ([(catalog_id, values), ...], cards processed).
+    """
+    cards = json.loads(raw.decode("utf-8"))
+    if isinstance(cards, dict) and "data" in cards:
+        cards = cards["data"]
+    if not isinstance(cards, list):
+        return [], 0
+    records = [rec for rec in (card_record(c, set_id, set_name) for c in cards) if rec]
+    return records, len(cards)
+
+
+def set_members(z: zipfile.ZipFile, lang: str, sets_map: dict) -> list[SetMember]:
+    """The card files for `lang` (*/cards/<lang>/<set_id>.json), from the central directory only."""
+    members = []
+    for info in z.infolist():
+        if f"/cards/{lang}/" not in info.filename or not info.filename.endswith(".json"):
+            continue
+        # set_id is the filename without extension (e.g. base1.json -> base1)
+        set_id = info.filename.split("/")[-1].replace(".json", "").strip()
+        members.append(SetMember(set_id, sets_map.get(set_id, ""), info.filename, info.CRC, info.file_size))
+    return members
+
+
+def changed_sets(members: list[SetMember], lang: str, *, force: bool = False) -> tuple[list[SetMember], list[SetMember]]:
+    """
+    Splits `members` into (sets to import, unchanged sets) using
+    CatalogSetState. With `force` nothing is unchanged.
+    """
+    known = {} if force else {
+        s.set_id: (s.crc32, s.size, s.set_name) for s in CatalogSetState.objects.filter(language=lang)
+    }
+    todo, unchanged = [], []
+    for m in members:
+        if known.get(m.set_id) == (m.crc32, m.size, m.set_name):
+            unchanged.append(m)
+        else:
+            todo.append(m)
+    return todo, unchanged
+
+
+def record_sets(members: list[SetMember], lang: str, *, all_set_ids) -> None:
+    """Marks `members` as fully imported and forgets sets no longer in the ZIP."""
+    CatalogSetState.objects.bulk_create(
+        [CatalogSetState(language=lang, set_id=m.set_id, crc32=m.crc32, size=m.size, set_name=m.set_name) for m in members],
+        update_conflicts=True,
+        unique_fields=["language", "set_id"],
+        update_fields=["crc32", "size", "set_name", "imported_at"],
+    )
+    CatalogSetState.objects.filter(language=lang).exclude(set_id__in=list(all_set_ids)).delete()
+
+
+_zip = None
+
+
+def parse_member(zip_path: str, member: SetMember) -> tuple[list[tuple], int]:
+    """Process-pool task: parse_set() for one member; each worker opens the ZIP once."""
+    global _zip
+    if _zip is None or _zip.filename != zip_path:
+        _zip = zipfile.ZipFile(zip_path, "r")
+    return parse_set(_zip.read(member.filename), member.set_id, member.set_name)
+
+
+def parse_sets(z: zipfile.ZipFile, members: list[SetMember], *, workers: int = 1) -> Iterator[tuple[SetMember, list, int]]:
+    """
+    (member, records, cards processed) for every member, in order. With
+    more than one worker the members are decompressed and decoded in a
+    process pool, at most two per worker ahead of the caller.
+    """
+    if workers <= 1 or len(members) < 2:
+        for m in members:
+            yield m, *parse_set(z.read(m.filename), m.set_id, m.set_name)
+        return
+
+    # Spawned, not forked: workers never touch the database and must not
+    # inherit this process's connection, which stays open for the caller.
+    # Importing this module needs the app registry, hence the setup first.
+    todo = iter(members)
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup)
+    try:
+        pending = deque((m, pool.submit(parse_member, z.filename, m)) for m in islice(todo, 2 * workers))
+        while pending:
+            m, future = pending.popleft()
+            records, processed = future.result()
+            for nxt in islice(todo, 1):
+                pending.append((nxt, pool.submit(parse_member, z.filename, nxt)))
+            yield m, records, processed
+    finally:
+        # a caller that stops early (--limit) doesn't wait for the rest
+        pool.shutdown(cancel_futures=True)
+
+
+def _chunks(items, size: int):
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def sync_catalog(records: dict, *, delete_missing: bool = True, keep_set_ids=(), chunk: int = DEFAULT_CHUNK,
+                 shadow: bool = False) -> SyncStats:
+    """
+    Brings CardCatalog in line with { catalog_id: values } without emptying it.
+    Only new and changed rows are written (bulk upserts, one transaction per
+    chunk); rows whose values already match are left alone. With
+    `delete_missing`, catalog_ids absent from `records` are deleted, so
+    Card.catalog is only cleared for entries that really disappeared.
+    Rows of `keep_set_ids` (sets that weren't re-read) are never deleted.
+
+    With `shadow`, the changes are staged in TEMP tables first and applied
+    in a single short transaction, so readers never see a partial sync.
+    """
+    stats = SyncStats()
+    existing = {
+        cid: tuple(values)
+        for cid, *values in CardCatalog.objects.exclude(set_id__in=list(keep_set_ids)).values_list("catalog_id", *CATALOG_FIELDS)
+    }
+
+    writes = []
+    for cid, values in records.items():
+        old = existing.get(cid)
+        if old == values:
+            stats.unchanged += 1
+            continue
+        if old is None:
+            stats.created += 1
+        else:
+            stats.updated += 1
+        writes.append((cid, *values))
+    gone = existing.keys() - records.keys() if delete_missing else set()
+    stats.deleted = len(gone)
+
+    if shadow:
+        _swap_in(writes, gone)
+        return stats
+
+    for batch in _chunks(writes, chunk):
+        with transaction.atomic():
+            CardCatalog.objects.bulk_create(
+                [CardCatalog(catalog_id=cid, **dict(zip(CATALOG_FIELDS, values))) for cid, *values in batch],
+                update_conflicts=True,
+                unique_fields=["catalog_id"],
+                update_fields=CATALOG_FIELDS,
+            )
+
+    for batch in _chunks(gone, chunk):
+        with transaction.atomic():
+            # .delete() (not a raw DELETE) so Card.catalog is SET_NULL
+            CardCatalog.objects.filter(catalog_id__in=batch).delete()
+
+    return stats
+
+
+def _swap_in(writes: list[tuple], gone) -> None:
+    """Stages (catalog_id, *values) upserts and deleted catalog_ids, then applies both in one transaction."""
+    staged = ShadowTable.for_model(CardCatalog, ["catalog_id", *CATALOG_FIELDS], key=["catalog_id"])
+    removed = ShadowTable.for_model(CardCatalog, ["catalog_id"], key=["catalog_id"], name="shadow_tracker_cardcatalog_gone")
+    with staged, removed:
+        staged.stage(writes)
+        removed.stage((cid,) for cid in gone)
+        with transaction.atomic():
+            if writes:
+                staged.merge(CardCatalog, unique_fields=["catalog_id"], update_fields=CATALOG_FIELDS)
+            if gone:
+                CardCatalog.objects.filter(catalog_id__in=removed.values("catalog_id")).delete()
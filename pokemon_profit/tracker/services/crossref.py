@@ -0,0 +1,130 @@
+"""
+Cross-reference between the two catalogs: CardCatalog (pokemon-tcg-data,
+set_id + number) and CatalogItem (TCGCSV, group_id + card_number).
+
+A TCGCSV single matches a CardCatalog entry when their base numbers are
+equal and the card's normalized name starts the product's ("Charizard ex"
+in "Charizard ex - 006/165"). Each group is then mapped to the sets that
+explain most of its singles (CatalogSetGroup), and every single of the
+group is cross-referenced to its card in those sets (CatalogCrossRef), so
+names and numbers that repeat across sets don't cross-link reprints.
+
+rebuild_crossref() runs after each import and only writes the difference.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from tracker.models import CardCatalog, CatalogItem, CatalogSetGroup, CatalogCrossRef
+
+# a set must explain this many of a group's numbered singles (or all of them)
+MIN_SHARED = 3
+CHUNK = 1000
+
+
+@dataclass
+class CrossRefStats:
+    groups: int = 0
+    sets: int = 0
+    links: int = 0
+    added: int = 0
+    removed: int = 0
+
+
+def _prefixes(name_key: str):
+    """Word prefixes of a normalized name, longest first."""
+    words = name_key.split()
+    for i in range(len(words), 0, -1):
+        yield " ".join(words[:i])
+
+
+def _item_matches() -> tuple[dict[int, dict[int, dict[str, int]]], Counter]:
+    """
+    ({ group_id: { item pk: { set_id: card pk } } } for every single with
+    a candidate card, { group_id: numbered singles }).
+    """
+    cards = defaultdict(dict)  # (number_key, name_key) -> { set_id: lowest card pk }
+    for pk, set_id, num_k, name_k in CardCatalog.objects.order_by("pk").values_list(
+        "pk", "set_id", "number_key", "name_key",
+    ):
+        cards[(num_k, name_k)].setdefault(set_id, pk)
+
+    groups = defaultdict(dict)
+    sizes = Counter()
+    items = CatalogItem.objects.filter(is_sealed=False, group_id__isnull=False).exclude(number_key="")
+    for pk, group_id, num_k, name_k in items.order_by("pk").values_list("pk", "group_id", "number_key", "name_key"):
+        sizes[group_id] += 1
+        sets = {}
+        for prefix in _prefixes(name_k):
+            for set_id, card_pk in cards.get((num_k, prefix), {}).items():
+                sets.setdefault(set_id, card_pk)
+        if sets:
+            groups[group_id][pk] = sets
+    return groups, sizes
+
+
+def _cover(matches: dict[int, dict[str, int]], size: int) -> list[tuple[str, int]]:
+    """
+    Greedy cover of a group's matched singles: repeatedly the set that
+    explains the most not yet explained ones. Returns [(set_id, shared)].
+    """
+    left = dict(matches)
+    chosen = []
+    while left:
+        votes = Counter(set_id for sets in left.values() for set_id in sets)
+        set_id, n = min(votes.items(), key=lambda kv: (-kv[1], kv[0]))
+        if n < MIN_SHARED and n < size:
+            break
+        chosen.append((set_id, n))
+        left = {pk: sets for pk, sets in left.items() if set_id not in sets}
+    return chosen
+
+
+def build_crossref() -> tuple[dict[tuple[int, str], int], set[tuple[int, int]]]:
+    """({ (group_id, set_id): shared }, { (card pk, item pk) }) for the current catalogs."""
+    group_sets = {}
+    pairs = set()
+    groups, sizes = _item_matches()
+    for group_id, matches in groups.items():
+        chosen = _cover(matches, sizes[group_id])
+        for set_id, shared in chosen:
+            group_sets[(group_id, set_id)] = shared
+        for item_pk, sets in matches.items():
+            # the first chosen set with this card wins
+            card_pk = next((sets[set_id] for set_id, _ in chosen if set_id in sets), None)
+            if card_pk is not None:
+                pairs.add((card_pk, item_pk))
+    return group_sets, pairs
+
+
+def rebuild_crossref() -> CrossRefStats:
+    """Brings CatalogSetGroup and CatalogCrossRef in line with the catalogs, writing only what changed."""
+    group_sets, pairs = build_crossref()
+    stats = CrossRefStats(groups=len({g for g, _ in group_sets}), sets=len(group_sets), links=len(pairs))
+
+    existing_sets = {
+        (g, s): (pk, shared) for pk, g, s, shared in CatalogSetGroup.objects.values_list("pk", "group_id", "set_id", "shared")
+    }
+    existing_pairs = {(c, i): pk for pk, c, i in CatalogCrossRef.objects.values_list("pk", "card_id", "item_id")}
+    new_pairs = pairs - existing_pairs.keys()
+    gone_pairs = [pk for key, pk in existing_pairs.items() if key not in pairs]
+    stats.added, stats.removed = len(new_pairs), len(gone_pairs)
+
+    with transaction.atomic():
+        CatalogSetGroup.objects.filter(pk__in=[pk for key, (pk, _) in existing_sets.items() if key not in group_sets]).delete()
+        CatalogSetGroup.objects.bulk_create(
+            [
+                CatalogSetGroup(group_id=g, set_id=s, shared=shared)
+                for (g, s), shared in group_sets.items() if existing_sets.get((g, s), (None, None))[1] != shared
+            ],
+            update_conflicts=True,
+            unique_fields=["group_id", "set_id"],
+            update_fields=["shared"],
+        )
+        for start in range(0, len(gone_pairs), CHUNK):
+            CatalogCrossRef.objects.filter(pk__in=gone_pairs[start:start + CHUNK]).delete()
+        CatalogCrossRef.objects.bulk_create(
+            [CatalogCrossRef(card_id=c, item_id=i) for c, i in sorted(new_pairs)], batch_size=CHUNK,
+        )
+    return stats
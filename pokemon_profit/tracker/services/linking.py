@@ -0,0 +1,246 @@
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+from django.db import connection, transaction
+
+from tracker.matching import norm, tokens, number_key
+from tracker.models import Card, CatalogItem, CardCatalog, CatalogCrossRef, SetAlias
+from tracker.services.portfolio import schedule_refresh
+from tracker.services.search import search_ids
+from tracker.services.timeline import invalidate_timeline
+
+# a single's score against an owned card: its number always matches
+NUMBER_SCORE = 20
+NAME_EXACT_SCORE = 15
+NAME_PARTIAL_SCORE = 8   # the card's name inside the item's, e.g. "Charizard" in "Charizard ex"
+PRINTING_SCORE = 6       # a bonus only; never enough without a name match
+CARD_MIN_SCORE = NUMBER_SCORE + NAME_PARTIAL_SCORE
+SEALED_MIN_SCORE = 10
+CROSSREF_SCORE = 35  # number and name already matched by the cross-reference
+
+
+class IndexedItem(NamedTuple):
+    pk: int
+    product_id: int
+    name: str
+    printing: str
+    name_n: str
+    printing_n: str
+
+
+def name_score(name_n: str, other_n: str) -> int:
+    """How well a normalized owned-card name matches a normalized catalog name (0: not at all)."""
+    if not name_n:
+        return 0
+    if name_n == other_n:
+        return NAME_EXACT_SCORE
+    return NAME_PARTIAL_SCORE if name_n in other_n else 0
+
+
+class CatalogIndex:
+    """
+    The CatalogItems of one linking run, read with their stored match keys:
+    singles by base card number and by the CardCatalog entry they are
+    cross-referenced to, sealed products by name token (an inverted index).
+    Matching an owned holding only looks at the items it shares a number
+    or a token with. Within a score tie the lowest pk wins.
+    """
+
+    def __init__(self, *, cards: bool = True, sealed: bool = True):
+        self.by_number = defaultdict(list)
+        self.by_catalog = defaultdict(list)
+        self.by_token = defaultdict(list)
+        self.sealed_items = {}
+        singles = {}
+
+        qs = CatalogItem.objects.order_by("pk")
+        if not (cards and sealed):
+            qs = qs.filter(is_sealed=sealed)
+        for pk, product_id, name, printing, name_k, number_k, token_k, is_sealed in qs.values_list(
+            "pk", "product_id", "name", "printing", "name_key", "number_key", "token_key", "is_sealed",
+        ):
+            item = IndexedItem(pk, product_id, name, printing, name_k, (printing or "").strip().lower())
+            if is_sealed:
+                self.sealed_items[pk] = item
+                for t in token_k.split():
+                    self.by_token[t].append(item)
+            else:
+                singles[pk] = item
+                if number_k:
+                    self.by_number[number_k].append(item)
+
+        if cards:
+            for card_pk, item_pk in CatalogCrossRef.objects.order_by("item_id").values_list("card_id", "item_id"):
+                if item_pk in singles:
+                    self.by_catalog[card_pk].append(singles[item_pk])
+
+    def card_candidates(self, card_number: str) -> list[IndexedItem]:
+        return self.by_number.get(number_key(card_number), [])
+
+    def best_card(self, card, *, catalog_pk: int | None = None) -> tuple[IndexedItem | None, int]:
+        """
+        (best single for `card`, its score); the item is None without
+        candidates. `catalog_pk` (else card.catalog_id) is the CardCatalog
+        entry the card is known to be.
+        """
+        printing = (card.printing or "").strip().lower()
+        linked = self.by_catalog.get(catalog_pk or card.catalog_id)
+        if linked:
+            # the card's CardCatalog entry names its products; only the printing is left to pick
+            return min(linked, key=lambda item: (item.printing_n != printing, item.pk)), CROSSREF_SCORE
+
+        name_n = norm(card.name)
+
+        best, best_score = None, -1
+        for item in self.card_candidates(card.card_number):
+            score = NUMBER_SCORE + name_score(name_n, item.name_n)
+            if printing and item.printing_n == printing:
+                score += PRINTING_SCORE
+            if score > best_score:
+                best, best_score = item, score
+        return best, best_score
+
+    def best_sealed(self, product) -> tuple[IndexedItem | None, int]:
+        """(best sealed item sharing name tokens with `product`, its score)."""
+        overlap = Counter()
+        for t in tokens(product.name):
+            for item in self.by_token.get(t, ()):
+                overlap[item.pk] += 1
+        if not overlap:
+            return None, -1
+        pk = min(overlap, key=lambda pk: (-overlap[pk], pk))
+        return self.sealed_items[pk], overlap[pk] * 10
+
+
+class CatalogEntry(NamedTuple):
+    pk: int
+    name: str
+    set_name: str
+    number: str
+    number_key: str
+
+
+class CardCatalogIndex:
+    """
+    CardCatalog read once, keyed by (normalized set name, base number).
+    A Card's set name resolves, in order, through a SetAlias, to the set
+    with exactly that normalized name, to sets whose name contains it,
+    and finally to the best-ranked search hits; the number then picks the
+    entry (the lowest pk on a tie). Per-set-name work is cached, so a run
+    costs one lookup per Card. A Card already linked to a CatalogItem
+    resolves through the cross-reference instead, and the other way round.
+    """
+
+    def __init__(self):
+        self.entries = {}  # (set_key, number_key) -> CatalogEntry
+        self.by_pk = {}
+        set_key_of = {}  # set_id -> set_key
+        for pk, name, set_id, set_name, number, set_k, num_k in CardCatalog.objects.order_by("pk").values_list(
+            "pk", "name", "set_id", "set_name", "number", "set_key", "number_key",
+        ):
+            entry = CatalogEntry(pk, name, set_name, number, num_k)
+            self.entries.setdefault((set_k, num_k), entry)
+            self.by_pk[pk] = entry
+            set_key_of.setdefault(set_id, set_k)
+        self.set_keys = list(dict.fromkeys(set_key_of.values()))
+        self.aliases = {
+            alias_k: set_key_of[set_id]
+            for alias_k, set_id in SetAlias.objects.values_list("alias_key", "set_id") if set_id in set_key_of
+        }
+        self._containing = {}
+        self._ranked = {}
+
+        self.entry_of_item = {}  # CatalogItem pk -> CatalogEntry
+        self.items_of_entry = defaultdict(list)  # CardCatalog pk -> [(CatalogItem pk, printing)]
+        for card_pk, item_pk, printing in CatalogCrossRef.objects.order_by("card_id", "item_id").values_list(
+            "card_id", "item_id", "item__printing",
+        ):
+            self.entry_of_item.setdefault(item_pk, self.by_pk[card_pk])
+            self.items_of_entry[card_pk].append((item_pk, (printing or "").strip().lower()))
+
+    def for_item(self, item_pk: int | None) -> CatalogEntry | None:
+        """The CardCatalog entry cross-referenced to a CatalogItem."""
+        return self.entry_of_item.get(item_pk)
+
+    def item_for(self, entry_pk: int, printing: str) -> int | None:
+        """The CatalogItem of a CardCatalog entry in `printing` (else its lowest pk)."""
+        printing = (printing or "").strip().lower()
+        items = self.items_of_entry.get(entry_pk)
+        if not items:
+            return None
+        return min(items, key=lambda it: (it[1] != printing, it[0]))[0]
+
+    def find(self, set_name: str, number: str) -> CatalogEntry | None:
+        set_k, num_k = norm(set_name), number_key(number)
+        if not (set_k and num_k):
+            return None
+
+        alias = self.aliases.get(set_k)
+        hit = (alias and self.entries.get((alias, num_k))) or self.entries.get((set_k, num_k))
+        if hit:
+            return hit
+
+        # loose match (sometimes your set_name differs slightly)
+        if set_k not in self._containing:
+            self._containing[set_k] = [k for k in self.set_keys if set_k in k]
+        hits = [self.entries[(k, num_k)] for k in self._containing[set_k] if (k, num_k) in self.entries]
+        if hits:
+            return min(hits, key=lambda e: e.pk)
+
+        # fuzzy: the best-ranked set name containing all the words, in any order
+        if set_name not in self._ranked:
+            self._ranked[set_name] = search_ids(CardCatalog, set_name, limit=500)
+        return next(
+            (self.by_pk[pk] for pk in self._ranked[set_name] if pk in self.by_pk and self.by_pk[pk].number_key == num_k),
+            None,
+        )
+
+
+def _update_rows(model, objs, fields, *, batch_size: int) -> None:
+    """
+    Writes `fields` of `objs`, `batch_size` rows per transaction. One
+    prepared UPDATE is executed per row; bulk_update's CASE expressions
+    cost far more to build than to run.
+    """
+    qn = connection.ops.quote_name
+    opts = model._meta
+    fields = [opts.get_field(f) for f in fields]
+    sql = (
+        f"UPDATE {qn(opts.db_table)} SET {', '.join(f'{qn(f.column)} = %s' for f in fields)} "
+        f"WHERE {qn(opts.pk.column)} = %s"
+    )
+    for start in range(0, len(objs), batch_size):
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.executemany(sql, [
+                [*(f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields), obj.pk]
+                for obj in objs[start:start + batch_size]
+            ])
+
+
+def save_links(model, holdings, *, batch_size: int = 500) -> None:
+    """
+    Writes the new catalog_item of Cards or SealedProducts and schedules
+    what their post_save signal would for a changed link: a valuation
+    refresh and a timeline rebuild.
+    """
+    holdings = list(holdings)
+    if not holdings:
+        return
+    users = {h.user_id for h in holdings}
+    ids = {h.pk for h in holdings}
+    with transaction.atomic():
+        _update_rows(model, holdings, ["catalog_item"], batch_size=batch_size)
+        if model is Card:
+            schedule_refresh(card_ids=ids)
+        else:
+            schedule_refresh(sealed_ids=ids)
+        invalidate_timeline(users)
+
+
+def save_catalog_links(cards, *, batch_size: int = 500) -> None:
+    """
+    Writes the CardCatalog link (and the name, set and number normalized
+    from it) of Cards. These fields don't feed any cached valuation, so
+    nothing is refreshed.
+    """
+    _update_rows(Card, list(cards), ["catalog", "name", "set_name", "card_number"], batch_size=batch_size)
@@ -0,0 +1,96 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+
+from tracker.models import Card, SealedProduct, Purchase, Sale, LotMatch, FIFO, LIFO, SPECIFIC, money
+
+Lot = namedtuple("Lot", "id date quantity price_each")
+Disposal = namedtuple("Disposal", "id date lot_id")
+
+# A Sale records one unit leaving the position.
+UNITS_PER_SALE = 1
+
+
+def match_lots(lots, disposals, method: str = FIFO):
+    """
+    Pure lot matcher. `lots` are Lot tuples, `disposals` Disposal tuples.
+
+    Each disposal consumes UNITS_PER_SALE units from lots bought on or before
+    its date: oldest first (FIFO), newest first (LIFO), or its own `lot_id`
+    first and then FIFO (SPECIFIC). A `lot_id` that is not one of those lots
+    (bought after the sale, or another holding's) is ignored. Units that
+    cannot be matched carry no cost. Returns (matches, cost_by_disposal) where matches is a list of
+    (disposal_id, lot_id, quantity, cost).
+    """
+    lots = sorted(lots, key=lambda l: (l.date, l.id))
+    remaining = {l.id: l.quantity for l in lots}
+
+    matches = []
+    cost_by_disposal = {}
+    for d in sorted(disposals, key=lambda d: (d.date, d.id)):
+        available = [l for l in lots if l.date <= d.date]
+        if method == LIFO:
+            available.reverse()
+        if method == SPECIFIC:
+            chosen = [l for l in available if l.id == d.lot_id]
+            available = chosen + [l for l in available if l.id != d.lot_id]
+
+        need = UNITS_PER_SALE
+        cost = Decimal("0")
+        for lot in available:
+            if not need:
+                break
+            take = min(need, remaining[lot.id])
+            if not take:
+                continue
+            remaining[lot.id] -= take
+            need -= take
+            line = lot.price_each * take
+            cost += line
+            matches.append((d.id, lot.id, take, line))
+        cost_by_disposal[d.id] = money(cost)
+
+    return matches, cost_by_disposal
+
+
+def rebuild_lots(*, card_id: int | None = None, sealed_product_id: int | None = None) -> int:
+    """
+    Recomputes LotMatch rows and Sale.cost_basis / realized_gain for one
+    Card or SealedProduct. Returns the number of sales matched.
+    """
+    if card_id:
+        owner, holding = {"card_id": card_id}, Card.objects.filter(pk=card_id).first()
+    else:
+        owner, holding = {"sealed_product_id": sealed_product_id}, SealedProduct.objects.filter(pk=sealed_product_id).first()
+    if holding is None:
+        return 0
+
+    lots = [Lot(*row) for row in Purchase.objects.filter(**owner).values_list("pk", "date", "quantity", "price_each")]
+    sales = list(Sale.objects.filter(**owner))
+    matches, cost = match_lots(
+        lots,
+        [Disposal(s.pk, s.date, s.lot_id) for s in sales],
+        holding.cost_basis_method,
+    )
+
+    for s in sales:
+        s.cost_basis = cost[s.pk]
+        s.realized_gain = money(s.price - cost[s.pk])
+
+    with transaction.atomic():
+        LotMatch.objects.filter(sale__in=[s.pk for s in sales]).delete()
+        LotMatch.objects.bulk_create([
+            LotMatch(sale_id=sale_id, purchase_id=lot_id, quantity=qty, cost=line)
+            for sale_id, lot_id, qty, line in matches
+        ])
+        Sale.objects.bulk_update(sales, ["cost_basis", "realized_gain"])
+    return len(sales)
+
+
+def schedule_rebuild(holdings) -> None:
+    """Rebuilds lots for (card_id, sealed_product_id) pairs once the transaction commits."""
+    for card_id, sealed_product_id in {h for h in holdings if any(h)}:
+        transaction.on_commit(
+            lambda c=card_id, s=sealed_product_id: rebuild_lots(card_id=c, sealed_product_id=s)
+        )
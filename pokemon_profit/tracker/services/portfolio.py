@@ -0,0 +1,170 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, QuerySet, Sum
+
+from tracker.models import Card, SealedProduct, Purchase, Sale, PortfolioSummary, money
+
+_batch = threading.local()
+
+# cached holding column -> the PortfolioSummary sum it adds up into
+SUMMARY_SUMS = {
+    "cached_total_spent": "total_spent",
+    "cached_total_sales": "total_sales",
+    "cached_market_value": "market_value",
+    "cached_realized_profit": "realized_profit",
+    "cached_unrealized_profit": "unrealized_profit",
+}
+
+
+def rebuild_summary(user_id: int) -> PortfolioSummary | None:
+    """
+    Recomputes one user's PortfolioSummary from their holdings' cached_*
+    columns (refresh_valuation() them first for a from-scratch rebuild) with
+    a fixed number of aggregate queries. Returns None if the user no longer
+    exists. Signals keep the row current with apply_summary_deltas().
+    """
+    if not get_user_model().objects.filter(pk=user_id).exists():
+        return None
+
+    totals = defaultdict(Decimal)
+    for model in (Card, SealedProduct):
+        agg = model.objects.filter(user_id=user_id).aggregate(
+            **{field: Sum(column) for column, field in SUMMARY_SUMS.items()}
+        )
+        for field, val in agg.items():
+            totals[field] += val or Decimal("0")
+
+    summary, _ = PortfolioSummary.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "cards_count": Card.objects.filter(user_id=user_id).count(),
+            "sealed_count": SealedProduct.objects.filter(user_id=user_id).count(),
+            "purchases_count": Purchase.objects.filter(user_id=user_id).count(),
+            "sales_count": Sale.objects.filter(user_id=user_id).count(),
+            **{field: money(totals[field]) for field in SUMMARY_SUMS.values()},
+        },
+    )
+    return summary
+
+
+def get_summary(user) -> PortfolioSummary:
+    summary = PortfolioSummary.objects.filter(user=user).first()
+    return summary or rebuild_summary(user.pk)
+
+
+def refresh_valuations(card_ids=(), sealed_ids=(), chunk: int = 500) -> dict:
+    """
+    Recomputes the cached_* valuation columns of the given holdings and
+    returns how much that moved each owner's summary sums, as
+    {user_id: {summary field: delta}}.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for model, ids in ((Card, sorted(card_ids)), (SealedProduct, sorted(sealed_ids))):
+        for i in range(0, len(ids), chunk):
+            qs = model.objects.filter(pk__in=ids[i:i + chunk]).order_by()
+            before = {pk: vals for pk, *vals in qs.values_list("pk", *SUMMARY_SUMS)}
+            qs.refresh_valuation()
+            for pk, user_id, *vals in qs.values_list("pk", "user_id", *SUMMARY_SUMS):
+                for field, new, old in zip(SUMMARY_SUMS.values(), vals, before[pk]):
+                    deltas[user_id][field] += new - old
+    return deltas
+
+
+def apply_summary_deltas(deltas) -> None:
+    """Adds {user_id: {PortfolioSummary field: delta}} to the stored rows with one UPDATE per user."""
+    for user_id, changes in deltas.items():
+        changes = {field: F(field) + delta for field, delta in changes.items() if delta}
+        if changes:
+            PortfolioSummary.objects.filter(user_id=user_id).update(**changes)
+
+
+def adjust_summary(user_id: int, **deltas) -> None:
+    """
+    Adds `deltas` (PortfolioSummary field -> amount, e.g. cards_count=1) to
+    a user's summary once the current transaction commits. Inside
+    `batched_refresh()` they are summed and applied once on exit.
+    """
+    pending = getattr(_batch, "pending", None)
+    if pending is not None:
+        for field, delta in deltas.items():
+            pending["deltas"][user_id][field] += delta
+        return
+    transaction.on_commit(lambda: apply_summary_deltas({user_id: deltas}))
+
+
+def schedule_refresh(*, card_ids=(), sealed_ids=()) -> None:
+    """
+    Refreshes the given holdings' cached valuation, and their owners'
+    summaries by the change, once the current transaction commits. Inside
+    `batched_refresh()` the ids are collected and refreshed once on exit.
+    """
+    card_ids = {c for c in card_ids if c}
+    sealed_ids = {s for s in sealed_ids if s}
+
+    pending = getattr(_batch, "pending", None)
+    if pending is not None:
+        pending["cards"] |= card_ids
+        pending["sealed"] |= sealed_ids
+        return
+
+    _refresh_on_commit(card_ids, sealed_ids)
+
+
+def _refresh(card_ids, sealed_ids, deltas=None) -> None:
+    with transaction.atomic():
+        changes = refresh_valuations(card_ids, sealed_ids)
+        for user_id, fields in (deltas or {}).items():
+            for field, delta in fields.items():
+                changes[user_id][field] += delta
+        apply_summary_deltas(changes)
+
+
+def _refresh_on_commit(card_ids, sealed_ids, deltas=None) -> None:
+    if card_ids or sealed_ids or deltas:
+        transaction.on_commit(lambda: _refresh(card_ids, sealed_ids, deltas))
+
+
+class Holders(NamedTuple):
+    users: set
+    cards: set
+    sealed: set
+
+
+def holders_of_items(item_ids) -> Holders:
+    """Cards, SealedProducts and their users linked to any of these CatalogItems (ids or a values("pk") queryset)."""
+    if not isinstance(item_ids, QuerySet):
+        item_ids = list(item_ids)
+    cards = list(Card.objects.filter(catalog_item_id__in=item_ids).values_list("pk", "user_id"))
+    sealed = list(SealedProduct.objects.filter(catalog_item_id__in=item_ids).values_list("pk", "user_id"))
+    return Holders(
+        users={u for _, u in cards} | {u for _, u in sealed},
+        cards={pk for pk, _ in cards},
+        sealed={pk for pk, _ in sealed},
+    )
+
+
+@contextmanager
+def batched_refresh():
+    """
+    Collects refreshes and summary adjustments raised by signals (e.g.
+    during an import) and runs each affected holding's refresh, and each
+    user's summary UPDATE, once when the block exits.
+    """
+    if getattr(_batch, "pending", None) is not None:
+        yield
+        return
+
+    _batch.pending = {"cards": set(), "sealed": set(), "deltas": defaultdict(lambda: defaultdict(int))}
+    try:
+        yield
+        pending = _batch.pending
+    finally:
+        _batch.pending = None
+
+    _refresh_on_commit(pending["cards"], pending["sealed"], pending["deltas"])
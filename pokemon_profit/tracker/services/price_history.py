@@ -0,0 +1,243 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracker.models import CatalogItem, PriceSnapshot, PriceRollup
+
+# finest -> coarsest
+ROLLUP_PERIODS = [PriceRollup.DAY, PriceRollup.WEEK, PriceRollup.MONTH]
+
+ITEM_BATCH = 200
+DELETE_CHUNK = 500
+
+
+@dataclass
+class Bar:
+    """One OHLC bucket. `start` is a date for rollups, a datetime for raw snapshots."""
+    start: date | datetime
+    open: Decimal | None
+    high: Decimal | None
+    low: Decimal | None
+    close: Decimal | None
+    samples: int = 1
+
+    def absorb(self, later: "Bar") -> None:
+        """Fold a bar that comes after this one in time into this one."""
+        if self.open is None:
+            self.open = later.open
+        if later.close is not None:
+            self.close = later.close
+        highs = [v for v in (self.high, later.high) if v is not None]
+        lows = [v for v in (self.low, later.low) if v is not None]
+        self.high = max(highs) if highs else None
+        self.low = min(lows) if lows else None
+        self.samples += later.samples
+
+
+def period_start(period: str, d: date) -> date:
+    if period == PriceRollup.DAY:
+        return d
+    if period == PriceRollup.WEEK:
+        return d - timedelta(days=d.weekday())
+    return d.replace(day=1)
+
+
+def period_end(period: str, start: date) -> date:
+    """Last day covered by the bucket starting at `start`."""
+    if period == PriceRollup.DAY:
+        return start
+    if period == PriceRollup.WEEK:
+        return start + timedelta(days=6)
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def _fold(rows, period: str):
+    """
+    rows: (item_id, day, open, high, low, close, samples) sorted by (item_id, day).
+    Yields ((item_id, bucket_start), Bar) per bucket.
+    """
+    key = bar = None
+    for item_id, day, o, h, l, c, n in rows:
+        k = (item_id, period_start(period, day))
+        if k != key:
+            if bar is not None:
+                yield key, bar
+            key, bar = k, Bar(k[1], o, h, l, c, n)
+        else:
+            bar.absorb(Bar(day, o, h, l, c, n))
+    if bar is not None:
+        yield key, bar
+
+
+def _write_rollups(period: str, folded) -> int:
+    folded = list(folded)
+    if not folded:
+        return 0
+
+    # a bucket may already hold older data from a previous run
+    existing = {
+        (r.item_id, r.period_start): r
+        for r in PriceRollup.objects.filter(
+            period=period,
+            item_id__in={k[0] for k, _ in folded},
+            period_start__in={k[1] for k, _ in folded},
+        )
+    }
+
+    objs = []
+    for (item_id, start), bar in folded:
+        prev = existing.get((item_id, start))
+        if prev is not None:
+            merged = Bar(start, prev.open, prev.high, prev.low, prev.close, prev.samples)
+            merged.absorb(bar)
+            bar = merged
+        objs.append(PriceRollup(
+            item_id=item_id, period=period, period_start=start,
+            open=bar.open, high=bar.high, low=bar.low, close=bar.close, samples=bar.samples,
+        ))
+
+    PriceRollup.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["item", "period", "period_start"],
+        update_fields=["open", "high", "low", "close", "samples"],
+    )
+    return len(objs)
+
+
+def _item_batches(qs):
+    item_ids = list(qs.order_by("item_id").values_list("item_id", flat=True).distinct())
+    for i in range(0, len(item_ids), ITEM_BATCH):
+        yield item_ids[i:i + ITEM_BATCH]
+
+
+def _delete_snapshots(pks: list[int]) -> int:
+    """
+    Deletes PriceSnapshots by pk with plain DELETE statements, without the
+    ORM's per-row collection and delete signals. Only for snapshots that are
+    no item's latest one: their signals (latest price / portfolio refresh)
+    would have nothing to do.
+    """
+    qn = connection.ops.quote_name
+    sql = f"DELETE FROM {qn(PriceSnapshot._meta.db_table)} WHERE {qn(PriceSnapshot._meta.pk.column)} IN "
+    removed = 0
+    with connection.cursor() as cur:
+        for i in range(0, len(pks), DELETE_CHUNK):
+            chunk = pks[i:i + DELETE_CHUNK]
+            cur.execute(sql + f"({', '.join(['%s'] * len(chunk))})", chunk)
+            removed += cur.rowcount
+    return removed
+
+
+def compact_snapshots(cutoff: datetime) -> int:
+    """
+    Rolls raw PriceSnapshots captured before `cutoff` into daily rollups and
+    deletes them. Each item's latest snapshot is always kept.
+    Returns the number of snapshots removed.
+    """
+    old = PriceSnapshot.objects.filter(captured_at__lt=cutoff).exclude(
+        pk__in=CatalogItem.objects.filter(latest_snapshot__isnull=False).values("latest_snapshot")
+    )
+
+    removed = 0
+    for item_ids in _item_batches(old):
+        batch = old.filter(item_id__in=item_ids)
+        snapshots = list(batch.order_by("item_id", "captured_at").values_list("pk", "item_id", "captured_at", "market"))
+        rows = [
+            (item_id, captured_at.astimezone(dt_timezone.utc).date(), m, m, m, m, 1)
+            for _, item_id, captured_at, m in snapshots
+            if m is not None
+        ]
+        with transaction.atomic():
+            _write_rollups(PriceRollup.DAY, _fold(rows, PriceRollup.DAY))
+            removed += _delete_snapshots([pk for pk, *_ in snapshots])
+    return removed
+
+
+def compact_rollups(source: str, target: str, cutoff: date) -> int:
+    """
+    Rolls `source` rollups starting before `cutoff` into `target` rollups and
+    deletes them. Returns the number of source rows removed.
+    """
+    old = PriceRollup.objects.filter(period=source, period_start__lt=cutoff)
+
+    removed = 0
+    for item_ids in _item_batches(old):
+        batch = old.filter(item_id__in=item_ids)
+        rows = list(batch.order_by("item_id", "period_start").values_list(
+            "item_id", "period_start", "open", "high", "low", "close", "samples"
+        ))
+        with transaction.atomic():
+            _write_rollups(target, _fold(rows, target))
+            removed += batch.delete()[0]
+    return removed
+
+
+def compact_prices(*, raw_days: int, daily_days: int, weekly_days: int, today: date | None = None) -> dict:
+    """
+    Applies the retention policy: raw snapshots older than raw_days become
+    daily bars, daily bars older than daily_days become weekly bars, weekly
+    bars older than weekly_days become monthly bars. Cutoffs are aligned to
+    bucket boundaries so a bucket is only ever built from complete data.
+    """
+    if not (0 <= raw_days <= daily_days <= weekly_days):
+        raise ValueError("Retention must satisfy raw_days <= daily_days <= weekly_days.")
+
+    today = today or timezone.now().date()
+    raw_cutoff = datetime.combine(today - timedelta(days=raw_days), time.min, tzinfo=dt_timezone.utc)
+
+    return {
+        "snapshots": compact_snapshots(raw_cutoff),
+        "daily": compact_rollups(
+            PriceRollup.DAY, PriceRollup.WEEK,
+            period_start(PriceRollup.WEEK, today - timedelta(days=daily_days)),
+        ),
+        "weekly": compact_rollups(
+            PriceRollup.WEEK, PriceRollup.MONTH,
+            period_start(PriceRollup.MONTH, today - timedelta(days=weekly_days)),
+        ),
+    }
+
+
+def price_history(item_id: int, start: date, end: date | None = None) -> tuple[str | None, list[Bar]]:
+    """
+    Market-price history for one item between `start` and `end` (inclusive).
+
+    Returns (period, bars). `period` is the coarsest tier holding data in the
+    range and every bar is at that resolution; finer tiers (including raw
+    snapshots) are folded up to match. period is None when the range is only
+    covered by raw snapshots, in which case each snapshot is its own bar.
+    """
+    end = end or timezone.now().date()
+
+    # weekly bars are filed under the month their week starts in, so a
+    # monthly bar can hold up to six days of the following month
+    spill = timedelta(days=6)
+    rollups = [
+        r for r in PriceRollup.objects.filter(
+            item_id=item_id,
+            period_start__gte=period_start(PriceRollup.MONTH, start - spill),
+            period_start__lte=end,
+        ).order_by("period_start").values_list("period", "period_start", "open", "high", "low", "close", "samples")
+        if period_end(r[0], r[1]) + (spill if r[0] != PriceRollup.DAY else timedelta(0)) >= start
+    ]
+    snaps = PriceSnapshot.objects.filter(
+        item_id=item_id,
+        captured_at__gte=datetime.combine(start, time.min, tzinfo=dt_timezone.utc),
+        captured_at__lt=datetime.combine(end + timedelta(days=1), time.min, tzinfo=dt_timezone.utc),
+        market__isnull=False,
+    ).order_by("captured_at").values_list("captured_at", "market")
+
+    present = {r[0] for r in rollups}
+    period = next((p for p in reversed(ROLLUP_PERIODS) if p in present), None)
+    if period is None:
+        return None, [Bar(captured_at, m, m, m, m) for captured_at, m in snaps]
+
+    rows = [(item_id, s, o, h, l, c, n) for _, s, o, h, l, c, n in rollups]
+    rows += [(item_id, captured_at.astimezone(dt_timezone.utc).date(), m, m, m, m, 1) for captured_at, m in snaps]
+    rows.sort(key=lambda r: r[1])
+    return period, [bar for _, bar in _fold(rows, period)]
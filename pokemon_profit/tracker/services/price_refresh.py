@@ -0,0 +1,244 @@
+"""
+Concurrent price refresh from TCGAPIs (GET /prices/{productId}).
+
+A thread pool of `concurrency` workers shares one TokenBucket, so the
+whole run never exceeds the configured requests/sec (after an initial
+`burst`). A 429 halves the bucket's rate and pauses every worker until its
+Retry-After (or an exponential backoff) has passed; successes then raise
+the rate back towards the configured one. Workers only do HTTP: results
+come back to the calling thread, which writes MarketPrice rows in batches.
+
+`base_url` makes the refresher point at any server speaking the same API,
+e.g. a local mock for load tests.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from email.utils import mktime_tz, parsedate_tz
+
+import certifi
+import requests
+from django.db import transaction
+from django.utils import timezone
+
+from tracker.models import MarketPrice
+from tracker.services.portfolio import schedule_refresh
+from tracker.services.pricing import BASE, parse_market_price
+from tracker.services.timeline import invalidate_timeline
+
+MIN_RATE = 0.2          # requests/sec the bucket never throttles below
+RECOVERY = 0.02         # share of the target rate regained per success
+BACKOFF_START = 1.0     # seconds, without Retry-After
+BACKOFF_MAX = 15.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `burst`
+    stored. throttle() lowers the rate and pauses all takers; recover()
+    raises it back towards the target.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, *, clock=time.monotonic, sleep=time.sleep):
+        self.target = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def acquire(self) -> None:
+        """Takes one token, waiting as long as needed."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def throttle(self, pause: float) -> None:
+        """A 429: halve the rate and let nobody through for `pause` seconds."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            # requests already in flight when the first 429 came back don't halve it again
+            if now >= self.paused_until:
+                self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.paused_until = max(self.paused_until, now + pause)
+            self.updated = max(self.updated, self.paused_until)
+
+    def recover(self) -> None:
+        with self._lock:
+            if self.rate < self.target:
+                self._refill(self.clock())
+                self.rate = min(self.target, self.rate + self.target * RECOVERY)
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """A Retry-After header (delay-seconds or an HTTP date) in seconds, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, mktime_tz(parsed) - time.time())
+
+
+@dataclass
+class FetchResult:
+    product_id: int
+    price: float | None = None
+    error: str = ""
+    rate_limited: bool = False  # gave up after max_wait of 429s
+
+
+@dataclass
+class RefreshReport:
+    requests: int = 0
+    rate_limited: int = 0       # 429 responses
+    backoff_seconds: float = 0.0  # pauses requested by 429s (they overlap across workers)
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)  # seconds, successful or not
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the request latencies, in seconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, min(len(ordered), round(p / 100 * len(ordered) + 0.5)))
+        return ordered[rank - 1]
+
+
+class PriceRefresher:
+    """
+    Fetches market prices for many product ids with bounded concurrency
+    under one shared TokenBucket; see the module docstring.
+    """
+
+    def __init__(self, *, rate: float = 5.0, burst: int = 10, concurrency: int = 8, base_url: str = BASE,
+                 api_key: str | None = None, timeout: float = 20, max_wait: float = 60):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = max(1, concurrency)
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"x-api-key": api_key} if api_key else {}
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.report = RefreshReport()
+        self._report_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # a Session per worker thread: pooled keep-alive connections, no sharing
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+            session.verify = certifi.where()
+        return session
+
+    def _record(self, latency: float, *, limited: bool = False, backoff: float = 0.0) -> None:
+        with self._report_lock:
+            self.report.requests += 1
+            self.report.latencies.append(latency)
+            self.report.rate_limited += limited
+            self.report.backoff_seconds += backoff
+
+    def fetch(self, product_id: int) -> FetchResult:
+        """One product's price, retrying its 429s until they have cost max_wait seconds of backoff."""
+        url = f"{self.base_url}/prices/{int(product_id)}"
+        backoff = BACKOFF_START
+        waited = 0.0
+        while True:
+            self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                resp = self._session().get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                self._record(time.perf_counter() - start)
+                return FetchResult(product_id, error=str(e))
+            latency = time.perf_counter() - start
+
+            if resp.status_code == 429:
+                pause = retry_after_seconds(resp.headers.get("Retry-After"))
+                if pause is None:
+                    pause, backoff = backoff, min(backoff * 2, BACKOFF_MAX)
+                self._record(latency, limited=True, backoff=pause)
+                if waited + pause > self.max_wait:
+                    return FetchResult(product_id, rate_limited=True,
+                                       error=f"429 persisted > {self.max_wait:g}s for productId={product_id}")
+                self.bucket.throttle(pause)
+                waited += pause
+                continue
+
+            self._record(latency)
+            self.bucket.recover()
+            if resp.status_code >= 400:
+                return FetchResult(product_id, error=f"HTTP {resp.status_code}")
+            try:
+                data = resp.json()
+            except ValueError as e:  # not JSON
+                return FetchResult(product_id, error=f"bad response: {e}")
+            if not isinstance(data, dict):
+                return FetchResult(product_id, error=f"bad response: expected a JSON object, got {type(data).__name__}")
+            return FetchResult(product_id, price=parse_market_price(data))
+
+    def run(self, product_ids):
+        """Yields a FetchResult per product id as they complete (not in order)."""
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="price-refresh") as pool:
+                futures = {pool.submit(self.fetch, pid): pid for pid in product_ids}
+                try:
+                    for future in as_completed(futures):
+                        try:
+                            yield future.result()
+                        except Exception as e:  # one bad product must not end the run
+                            yield FetchResult(futures[future], error=f"{type(e).__name__}: {e}")
+                finally:
+                    for future in futures:
+                        future.cancel()
+        finally:
+            self.report.elapsed = time.perf_counter() - started
+
+
+def save_market_prices(prices: list[MarketPrice], user_ids) -> None:
+    """
+    Inserts MarketPrice rows in one transaction and schedules what their
+    post_save signal would: the holdings' valuation refresh and a timeline
+    rebuild from today.
+    """
+    if not prices:
+        return
+    users = set(user_ids)
+    with transaction.atomic():
+        MarketPrice.objects.bulk_create(prices)
+        schedule_refresh(
+            card_ids={p.card_id for p in prices},
+            sealed_ids={p.sealed_product_id for p in prices},
+        )
+        invalidate_timeline(users, timezone.localdate())
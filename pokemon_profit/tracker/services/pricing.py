@@ -48,29 +48,33 @@ def fetch_price_by_product_id(product_id: int, *, max_wait_seconds: int = 60) ->
             continue
 
         resp.raise_for_status()
-        data = resp.json()
+        return parse_market_price(resp.json())
 
-        # TCGAPIs responses vary; handle a few common shapes safely
-        # Example possibilities:
-        # {success:true, data:{prices:[{marketPrice:...}]}}
-        # {success:true, data:{price:{market:...}}}
-        d = data.get("data") or {}
+def parse_market_price(data: dict) -> float | None:
+    """The market price in a /prices/{productId} response, or None."""
+    # TCGAPIs responses vary; handle a few common shapes safely
+    # Example possibilities:
+    # {success:true, data:{prices:[{marketPrice:...}]}}
+    # {success:true, data:{price:{market:...}}}
+    d = data.get("data") if isinstance(data, dict) else None
+    if not isinstance(d, dict):
+        return None
 
-        # try list form
-        prices = d.get("prices")
-        if isinstance(prices, list) and prices:
-            p0 = prices[0] or {}
-            for key in ("marketPrice", "market", "price", "midPrice"):
-                val = p0.get(key)
-                if isinstance(val, (int, float)):
-                    return float(val)
+    # try list form
+    prices = d.get("prices")
+    if isinstance(prices, list) and prices and isinstance(prices[0], dict):
+        p0 = prices[0]
+        for key in ("marketPrice", "market", "price", "midPrice"):
+            val = p0.get(key)
+            if isinstance(val, (int, float)):
+                return float(val)
 
-        # try dict form
-        price_obj = d.get("price") or d.get("pricing") or {}
-        if isinstance(price_obj, dict):
-            for key in ("market", "marketPrice", "price", "mid"):
-                val = price_obj.get(key)
-                if isinstance(val, (int, float)):
-                    return float(val)
+    # try dict form
+    price_obj = d.get("price") or d.get("pricing") or {}
+    if isinstance(price_obj, dict):
+        for key in ("market", "marketPrice", "price", "mid"):
+            val = price_obj.get(key)
+            if isinstance(val, (int, float)):
+                return float(val)
 
-        return None
+    return None
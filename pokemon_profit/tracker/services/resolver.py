@@ -0,0 +1,123 @@
+"""
+Link-on-write: matches a Card or SealedProduct against the catalogs while
+it is being saved, so new holdings are valued right away instead of
+waiting for the next auto_link_owned run.
+
+The indexes (tracker.services.linking) are built once per process and kept
+warm; every RECHECK_SECONDS a few MAX() queries tell whether an import has
+changed the catalogs since, and only then is the index rebuilt. A lookup
+is a handful of dict probes.
+"""
+import threading
+import time
+from typing import NamedTuple
+
+from django.db.models import Count, Max
+
+from tracker.matching import base_number, norm
+from tracker.models import (
+    CardCatalog, CatalogCrossRef, CatalogItem, CatalogSetState, ImportManifest, SetAlias,
+)
+from tracker.services.linking import (
+    CARD_MIN_SCORE, SEALED_MIN_SCORE, CardCatalogIndex, CatalogEntry, CatalogIndex, IndexedItem, name_score,
+)
+
+RECHECK_SECONDS = 30
+
+
+class Match(NamedTuple):
+    item: IndexedItem | None      # best CatalogItem, if any candidate
+    score: int
+    confident: bool               # good enough to link without asking
+    catalog: CatalogEntry | None = None  # the CardCatalog entry (cards only)
+
+
+def catalog_stamp() -> tuple:
+    """Changes whenever an import (or an edit adding rows) changes what the indexes hold."""
+    return (
+        CatalogItem.objects.aggregate(m=Max("pk"))["m"],
+        CardCatalog.objects.aggregate(m=Max("pk"))["m"],
+        CatalogCrossRef.objects.aggregate(m=Max("pk"))["m"],
+        tuple(SetAlias.objects.aggregate(m=Max("pk"), n=Count("pk")).values()),
+        ImportManifest.objects.aggregate(m=Max("imported_at"))["m"],
+        CatalogSetState.objects.aggregate(m=Max("imported_at"))["m"],
+    )
+
+
+class CatalogResolver:
+    """The CatalogItem and CardCatalog indexes of one process (or one auto_link_owned run)."""
+
+    def __init__(self, *, cards: bool = True, sealed: bool = True, stamp: tuple | None = None):
+        self.stamp = stamp
+        self.items = CatalogIndex(cards=cards, sealed=sealed)
+        self.catalog = CardCatalogIndex() if cards else None
+
+    def match_card(self, card) -> Match:
+        """
+        Best single for `card`: through its CardCatalog entry (already linked,
+        cross-referenced from its CatalogItem, or found by set name and
+        number with a matching name) when the cross-reference knows it, else
+        by number and name. Only a name match makes it confident.
+        """
+        entry = self.catalog.by_pk.get(card.catalog_id) or self.catalog.for_item(card.catalog_item_id)
+        num = base_number(card.card_number)
+        if entry is None and card.set_name and num:
+            entry = self.catalog.find(card.set_name, num)
+            # a set name and number alone (a typo'd set resolves to some set) is not the card
+            if entry is not None and not name_score(norm(card.name), norm(entry.name)):
+                entry = None
+        item, score = self.items.best_card(card, catalog_pk=entry.pk if entry else None)
+        return Match(item, score, item is not None and score >= CARD_MIN_SCORE, entry)
+
+    def match_sealed(self, product) -> Match:
+        item, score = self.items.best_sealed(product)
+        return Match(item, score, item is not None and score >= SEALED_MIN_SCORE)
+
+
+_lock = threading.Lock()
+_warm: CatalogResolver | None = None
+_checked_at = 0.0
+
+
+def get_resolver() -> CatalogResolver:
+    """This process's warm resolver, rebuilt when the catalogs have changed."""
+    global _warm, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _warm is not None and now - _checked_at < RECHECK_SECONDS:
+            return _warm
+        stamp = catalog_stamp()
+        if _warm is None or _warm.stamp != stamp:
+            _warm = CatalogResolver(stamp=stamp)
+        _checked_at = now
+        return _warm
+
+
+def reset_resolver() -> None:
+    """Drops the warm resolver; the next lookup rebuilds it."""
+    global _warm
+    with _lock:
+        _warm = None
+
+
+def link_card(card, *, keep=()) -> Match:
+    """
+    Fills an unsaved Card's empty catalog_item (when the match is
+    confident) and catalog from the warm resolver. Fields named in `keep`
+    (e.g. a form's changed_data, so a link the user just cleared stays
+    cleared) are left alone. Returns the match, for suggestions.
+    """
+    match = get_resolver().match_card(card)
+    if match.confident and card.catalog_item_id is None and "catalog_item" not in keep:
+        card.catalog_item_id = match.item.pk
+    if match.catalog and card.catalog_id is None and "catalog" not in keep:
+        card.catalog_id = match.catalog.pk
+    return match
+
+
+def link_sealed(product, *, keep=()) -> Match:
+    """link_card() for a SealedProduct's catalog_item."""
+    match = get_resolver().match_sealed(product)
+    if match.confident and product.catalog_item_id is None and "catalog_item" not in keep:
+        product.catalog_item_id = match.item.pk
+    return match
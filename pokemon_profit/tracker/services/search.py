@@ -0,0 +1,209 @@
+"""
+Ranked fuzzy search over CatalogItem and CardCatalog.
+
+On SQLite the names, set names and numbers of both tables are mirrored in
+an FTS5 table with the trigram tokenizer (migration 0024); triggers keep
+it in sync with every write, including the importers' bulk upserts and
+shadow swaps. Any substring of three or more characters is an index
+lookup. Other databases fall back to icontains filters.
+"""
+from typing import NamedTuple
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from tracker.models import CatalogItem, CardCatalog
+
+SEARCH_TABLE = "tracker_catalog_search"
+# kept in sync by these (migrations 0024/0027); a table rebuild by a later
+# schema change on either catalog drops them, see tracker.checks
+SEARCH_TRIGGERS = tuple(
+    f"tracker_{table}_search_{op}" for table in ("catalogitem", "cardcatalog") for op in ("ins", "upd", "del")
+)
+ITEM_KINDS = ("single", "sealed")
+CARD_KIND = "card"
+ALL_KINDS = (*ITEM_KINDS, CARD_KIND)
+# bm25 weights for name, set_name, number
+WEIGHTS = (10.0, 3.0, 5.0)
+
+
+class SearchHit(NamedTuple):
+    kind: str   # "single" / "sealed" (CatalogItem) or "card" (CardCatalog)
+    id: int     # pk in the model the kind belongs to
+    name: str
+    set_name: str
+    number: str
+    rank: float  # lower is better
+
+    @property
+    def model(self):
+        return CardCatalog if self.kind == CARD_KIND else CatalogItem
+
+
+def _terms(query: str) -> tuple[list[str], list[str]]:
+    """(terms the trigram index can look up, terms under three characters)."""
+    words = [w for w in (query or "").lower().split() if w.strip('"')]
+    return [w for w in words if len(w) >= 3], [w for w in words if len(w) < 3]
+
+
+def _match_expr(terms: list[str]) -> str:
+    # every term as a quoted phrase, so FTS5 operators in user input are literal
+    return " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _like(term: str) -> str:
+    """A LIKE pattern (with ESCAPE '\\') matching `term` literally anywhere in the value."""
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _index_where(long_terms: list[str], short_terms: list[str], kinds: tuple) -> tuple[str, list]:
+    """The WHERE clause (and its params) selecting index rows that match every term."""
+    where = [f"{connection.ops.quote_name(SEARCH_TABLE)} MATCH %s"]
+    params = [_match_expr(long_terms)]
+    if set(kinds) != set(ALL_KINDS):
+        where.append(f"kind IN ({', '.join(['%s'] * len(kinds))})")
+        params += kinds
+    for t in short_terms:
+        where.append("(name LIKE %s ESCAPE '\\' OR set_name LIKE %s ESCAPE '\\' OR number LIKE %s ESCAPE '\\')")
+        params += [_like(t)] * 3
+    return " AND ".join(where), params
+
+
+def search_catalog(query: str, *, kinds=ALL_KINDS, limit: int = 20, offset: int = 0) -> list[SearchHit]:
+    """
+    The best `limit` entries (after skipping `offset`) whose name, set name
+    or number contain every word of `query` (case-insensitive), best first
+    by bm25 rank (a name match weighs most; shorter names rank higher).
+    """
+    long_terms, short_terms = _terms(query)
+    kinds = tuple(kinds)
+    if not (long_terms or short_terms) or not kinds:
+        return []
+    if connection.vendor != "sqlite" or not long_terms:
+        # nothing for the index to look up
+        return _search_fallback(long_terms + short_terms, kinds, limit, offset)
+
+    table = connection.ops.quote_name(SEARCH_TABLE)
+    where, params = _index_where(long_terms, short_terms, kinds)
+    sql = (
+        f"SELECT rowid, kind, name, set_name, number, bm25({table}, {', '.join(map(str, WEIGHTS))}) AS rank "
+        f"FROM {table} WHERE {where} "
+        f"ORDER BY rank LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, [*params, limit, offset])
+        return [SearchHit(kind, rowid // 2, name, set_name, number, rank) for rowid, kind, name, set_name, number, rank in cur.fetchall()]
+
+
+def _card_q(terms: list[str]) -> Q:
+    q = Q()
+    for t in terms:
+        q &= Q(name__icontains=t) | Q(set_name__icontains=t) | Q(number__icontains=t)
+    return q
+
+
+def _item_q(terms: list[str], item_kinds) -> Q:
+    q = Q()
+    for t in terms:
+        q &= Q(name__icontains=t) | Q(card_number__icontains=t)
+    if len(item_kinds) == 1:
+        q &= Q(is_sealed=item_kinds[0] == "sealed")
+    return q
+
+
+def _search_fallback(terms: list[str], kinds: tuple, limit: int, offset: int = 0) -> list[SearchHit]:
+    hits = []
+    end = offset + limit
+    if CARD_KIND in kinds:
+        for pk, name, set_name, number in CardCatalog.objects.filter(_card_q(terms)).order_by("name", "pk").values_list(
+            "pk", "name", "set_name", "number",
+        )[:end]:
+            hits.append(SearchHit(CARD_KIND, pk, name, set_name, number, 0.0))
+    item_kinds = [k for k in kinds if k in ITEM_KINDS]
+    if item_kinds:
+        for pk, name, number, is_sealed in CatalogItem.objects.filter(_item_q(terms, item_kinds)).order_by("name", "pk").values_list(
+            "pk", "name", "card_number", "is_sealed",
+        )[:end]:
+            hits.append(SearchHit("sealed" if is_sealed else "single", pk, name, "", number, 0.0))
+    return hits[offset:end]
+
+
+def search_filter(model, query: str) -> Q:
+    """
+    A filter for every `model` (CatalogItem or CardCatalog) row matching
+    `query`, with no limit and no ranking, e.g. for admin changelists whose
+    counts and pages must cover all matches.
+    """
+    long_terms, short_terms = _terms(query)
+    if not (long_terms or short_terms):
+        return Q()
+    if connection.vendor != "sqlite" or not long_terms:
+        terms = long_terms + short_terms
+        return _card_q(terms) if model is CardCatalog else _item_q(terms, ITEM_KINDS)
+    kinds = (CARD_KIND,) if model is CardCatalog else ITEM_KINDS
+    where, params = _index_where(long_terms, short_terms, kinds)
+    return Q(pk__in=RawSQL(f"SELECT rowid / 2 FROM {connection.ops.quote_name(SEARCH_TABLE)} WHERE {where}", params))
+
+
+# autocomplete kind -> (model, search kinds)
+AUTOCOMPLETE_KINDS = {
+    "single": (CatalogItem, ("single",)),
+    "sealed": (CatalogItem, ("sealed",)),
+    CARD_KIND: (CardCatalog, (CARD_KIND,)),
+}
+
+
+def autocomplete(query: str, kind: str, *, page: int = 1, per_page: int = 20) -> dict:
+    """
+    One page of search results for a catalog select box:
+    {"results": [{"id": pk, "text": str(obj)}, ...], "more": bool}.
+    Labels are the models' str(), the same text the form widget renders.
+    """
+    model, kinds = AUTOCOMPLETE_KINDS[kind]
+    hits = search_catalog(query, kinds=kinds, limit=per_page + 1, offset=(page - 1) * per_page)
+    ids = [hit.id for hit in hits[:per_page]]
+    objs = model.objects.in_bulk(ids)
+    return {
+        "results": [{"id": pk, "text": str(objs[pk])} for pk in ids if pk in objs],
+        "more": len(hits) > per_page,
+    }
+
+
+def search_ids(model, query: str, *, limit: int = 1000, kinds=None) -> list[int]:
+    """Pks of `model` (CatalogItem or CardCatalog) matching `query`, best first."""
+    kinds = kinds or ((CARD_KIND,) if model is CardCatalog else ITEM_KINDS)
+    return [hit.id for hit in search_catalog(query, kinds=kinds, limit=limit)]
+
+
+def missing_search_triggers(using=None) -> list[str]:
+    """Names of SEARCH_TRIGGERS absent from an SQLite database that has the search table."""
+    conn = connections[using or DEFAULT_DB_ALIAS]
+    if conn.vendor != "sqlite":
+        return []
+    with conn.cursor() as cur:
+        cur.execute("SELECT type, name FROM sqlite_master WHERE name = %s OR type = 'trigger'", [SEARCH_TABLE])
+        found = {(kind, name) for kind, name in cur.fetchall()}
+    if ("table", SEARCH_TABLE) not in found:
+        return []
+    return [name for name in SEARCH_TRIGGERS if ("trigger", name) not in found]
+
+
+def rebuild_search_index() -> int:
+    """Refills the search table from both catalogs (e.g. after raw SQL edits). Returns the row count."""
+    if connection.vendor != "sqlite":
+        return 0
+    with connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cur.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, set_name, number, kind) "
+            "SELECT id * 2, name, '', card_number, CASE WHEN is_sealed THEN 'sealed' ELSE 'single' END "
+            "FROM tracker_catalogitem"
+        )
+        cur.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, set_name, number, kind) "
+            "SELECT id * 2 + 1, name, set_name, number, 'card' FROM tracker_cardcatalog"
+        )
+        cur.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cur.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+        return cur.fetchone()[0]
@@ -0,0 +1,101 @@
+from itertools import islice
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+STAGE_CHUNK = 1000
+
+
+class ShadowTable:
+    """
+    A TEMP table that stages an import's rows for a model. Temp tables live
+    outside the main database file, so filling one takes no lock that web
+    requests could wait on; merge() then copies the staged rows into the
+    live table with one INSERT ... SELECT inside the caller's (short)
+    transaction. Use as a context manager; the table is dropped on exit.
+
+    `columns` are (column name, model field) pairs; the field gives the
+    column type and converts staged values the way the ORM would. Rows
+    staged twice under the same `key` columns keep the later values.
+    """
+
+    def __init__(self, name: str, columns, key):
+        self.name = name
+        self.columns = [(col, field) for col, field in columns]
+        self.key = list(key)
+
+    @classmethod
+    def for_model(cls, model, fields, key, *, name: str = ""):
+        """Shadow of `fields` (model field names) of `model`, keyed like its unique `key` fields."""
+        opts = model._meta
+        columns = [(opts.get_field(f).column, opts.get_field(f)) for f in fields]
+        key = [opts.get_field(f).column for f in key]
+        return cls(name or f"shadow_{opts.db_table}", columns, key)
+
+    @property
+    def column_names(self) -> list[str]:
+        return [col for col, _ in self.columns]
+
+    def __enter__(self):
+        qn = connection.ops.quote_name
+        cols = ", ".join(f"{qn(col)} {field.db_type(connection)}" for col, field in self.columns)
+        with connection.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {qn(self.name)}")
+            cur.execute(f"CREATE TEMP TABLE {qn(self.name)} ({cols}, PRIMARY KEY ({', '.join(map(qn, self.key))}))")
+        return self
+
+    def __exit__(self, *exc):
+        with connection.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(self.name)}")
+
+    def stage(self, rows) -> None:
+        """Adds rows (tuples in column order) to the shadow table."""
+        qn = connection.ops.quote_name
+        cols = self.column_names
+        updates = [c for c in cols if c not in self.key]
+        sql = (
+            f"INSERT INTO {qn(self.name)} ({', '.join(map(qn, cols))}) VALUES ({', '.join(['%s'] * len(cols))}) "
+            f"ON CONFLICT ({', '.join(map(qn, self.key))}) "
+            + (f"DO UPDATE SET {', '.join(f'{qn(c)} = excluded.{qn(c)}' for c in updates)}" if updates else "DO NOTHING")
+        )
+        fields = [field for _, field in self.columns]
+        rows = iter(rows)
+        with connection.cursor() as cur:
+            while chunk := list(islice(rows, STAGE_CHUNK)):
+                cur.executemany(sql, [
+                    [field.get_db_prep_save(v, connection) for field, v in zip(fields, row)] for row in chunk
+                ])
+
+    def count(self) -> int:
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(self.name)}")
+            return cur.fetchone()[0]
+
+    def values(self, column: str) -> RawSQL:
+        """`column` of every staged row, as a subquery for `__in` lookups."""
+        qn = connection.ops.quote_name
+        return RawSQL(f"SELECT {qn(column)} FROM {qn(self.name)}", ())
+
+    def merge(self, model, *, unique_fields, update_fields, select: str | None = None, columns=None) -> int:
+        """
+        Upserts the staged rows into `model`'s table in one statement and
+        returns the number of rows written. `select` (with `columns`, the
+        target columns it produces) replaces the plain copy of every
+        shadow column, e.g. to resolve a foreign key with a join.
+        """
+        qn = connection.ops.quote_name
+        opts = model._meta
+        columns = columns or self.column_names
+        select = select or f"SELECT {', '.join(map(qn, columns))} FROM {qn(self.name)}"
+        unique = [opts.get_field(f).column for f in unique_fields]
+        updates = [opts.get_field(f).column for f in update_fields]
+        # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+        sql = (
+            f"INSERT INTO {qn(opts.db_table)} ({', '.join(map(qn, columns))}) "
+            f"SELECT * FROM ({select}) AS staged WHERE true "
+            f"ON CONFLICT ({', '.join(map(qn, unique))}) "
+            f"DO UPDATE SET {', '.join(f'{qn(c)} = excluded.{qn(c)}' for c in updates)}"
+        )
+        with connection.cursor() as cur:
+            cur.execute(sql)
+            return cur.rowcount
@@ -0,0 +1,595 @@
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from collections import deque
+from itertools import islice
+from multiprocessing.managers import SyncManager
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import django
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.expressions import RawSQL
+from django.utils import timezone as dj_timezone
+
+from tracker.models import CatalogItem, PriceSnapshot, ImportManifest
+from tracker.services.portfolio import schedule_refresh, holders_of_items
+from tracker.services.shadow import ShadowTable
+from tracker.services.timeline import invalidate_timeline
+
+DEFAULT_BATCH_SIZE = 1000
+
+# CatalogItem columns an import overwrites, in ParsedRow.item order (match keys last)
+ITEM_FIELDS = [
+    "name", "image_url", "category_id", "group_id", "tcgcsv_url", "card_number", "rarity", "is_sealed",
+    *CatalogItem.MATCH_KEYS,
+]
+# PriceSnapshot price columns and the CSV columns they come from
+PRICE_COLUMNS = {
+    "low": "lowPrice",
+    "mid": "midPrice",
+    "high": "highPrice",
+    "market": "marketPrice",
+    "direct_low": "directLowPrice",
+}
+PRICE_FIELDS = list(PRICE_COLUMNS)
+# The CSV columns the importer reads, in the order parse_row() unpacks them
+COLUMNS = (
+    "productId", "name", "imageUrl", "categoryId", "groupId", "url", "modifiedOn",
+    *PRICE_COLUMNS.values(), "subTypeName", "extNumber", "extRarity",
+)
+REQUIRED_COLUMNS = ("productId", "name")
+EXPORT_SUFFIXES = (".csv", ".csv.gz", ".zip")
+HASH_CHUNK = 1 << 20
+# Rows per hand-over from a parser process, and hand-overs queued per file
+PARSE_CHUNK = DEFAULT_BATCH_SIZE
+QUEUED_CHUNKS = 4
+
+
+def dec(v):
+    if not v:
+        return None
+    try:
+        return Decimal(v)
+    except InvalidOperation:
+        return None
+
+
+def parse_dt(v):
+    if not v:
+        return datetime.now(timezone.utc)
+    try:
+        dt = datetime.fromisoformat(v)
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return datetime.now(timezone.utc)
+
+
+class ParsedRow(NamedTuple):
+    product_id: int
+    printing: str
+    item: tuple         # ITEM_FIELDS values
+    captured_at: datetime
+    prices: tuple | None  # PRICE_FIELDS values, None when the row carries no price
+    fingerprint: str      # hash of the row's projected CSV values
+
+
+@dataclass
+class ImportStats:
+    items_created: int = 0
+    items_updated: int = 0
+    prices_upserted: int = 0
+    skipped: int = 0
+    rows_unchanged: int = 0
+    prices_confirmed: int = 0
+    files_unchanged: int = 0
+
+    def __iadd__(self, other: "ImportStats"):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        return self
+
+
+def parse_row(values: tuple, *, category_id=None, group_id=None, sealed_only=False, singles_only=False,
+              captured_at: datetime | None = None) -> ParsedRow | None:
+    """
+    Normalizes one projected TCGCSV row (values in COLUMNS order). Returns
+    None for rows the filters exclude. `captured_at` overrides the row's
+    modifiedOn (see --capture-now).
+    """
+    (product_id, name, image_url, category, group, url, modified,
+     low, mid, high, market, direct_low, sub_type, number, rarity) = values
+
+    row_category = int(category) if category else None
+    row_group = int(group) if group else None
+    if category_id and row_category != category_id:
+        return None
+    if group_id and row_group != group_id:
+        return None
+
+    card_number = number.strip()
+    is_sealed = not card_number
+    if sealed_only and not is_sealed:
+        return None
+    if singles_only and is_sealed:
+        return None
+
+    prices = None
+    if low or mid or high or market:
+        prices = (dec(low), dec(mid), dec(high), dec(market), dec(direct_low))
+
+    name = name.strip()
+    keys = CatalogItem.match_keys_for(name=name, card_number=card_number)
+    item = (
+        name,
+        image_url.strip(),
+        row_category,
+        row_group,
+        url,
+        card_number,
+        rarity.strip(),
+        is_sealed,
+        *(keys[k] for k in CatalogItem.MATCH_KEYS),
+    )
+    return ParsedRow(
+        int(product_id),
+        sub_type.strip() or "Normal",
+        item,
+        captured_at or parse_dt(modified),
+        prices,
+        hashlib.blake2b("\x1f".join(values).encode(), digest_size=16).hexdigest(),
+    )
+
+
+def expand_paths(specs) -> list[Path]:
+    """
+    Export files named by `specs`: file paths, directories (their .csv,
+    .csv.gz and .zip files) or glob patterns. Files found through a
+    directory or a glob are kept only if they are TCGCSV exports, so e.g.
+    the card catalog zip next to them is left alone.
+    """
+    paths = []
+    for spec in specs:
+        p = Path(spec)
+        if p.is_dir():
+            paths += sorted(q for q in p.iterdir() if q.is_file() and is_export(q))
+        elif any(c in spec for c in "*?["):
+            paths += sorted(Path(m) for m in glob.glob(spec, recursive=True) if Path(m).is_file() and is_export(Path(m)))
+        else:
+            paths.append(p)
+    return list(dict.fromkeys(paths))
+
+
+def is_export(path) -> bool:
+    """Whether `path` is a TCGCSV export: a .csv, .csv.gz or .zip whose CSV header has the required columns."""
+    if not str(path).lower().endswith(EXPORT_SUFFIXES):
+        return False
+    try:
+        for f in _text_streams(path):
+            header = {h.strip() for h in next(csv.reader(f), [])}
+            if all(c in header for c in REQUIRED_COLUMNS):
+                return True
+    except (OSError, UnicodeDecodeError, csv.Error, zipfile.BadZipFile):
+        pass
+    return False
+
+
+def _text_streams(path) -> Iterator:
+    """Text streams for a .csv, .csv.gz or .zip export (every *.csv member), read in place."""
+    name = str(path).lower()
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(path) as z:
+            for member in sorted(n for n in z.namelist() if n.lower().endswith(".csv")):
+                with z.open(member) as raw, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as f:
+                    yield f
+    elif name.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8-sig", newline="") as f:
+            yield f
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            yield f
+
+
+def read_projected(f) -> Iterator[tuple]:
+    """
+    Streams the COLUMNS of a CSV as tuples. Header positions are resolved
+    once; a column missing from the header reads as "". Nothing else of
+    the row (card text, attacks, ...) is kept, nor are values past the
+    header's last column.
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    pos = {h.strip(): i for i, h in enumerate(header)}
+    missing = [c for c in REQUIRED_COLUMNS if c not in pos]
+    if missing:
+        raise ValueError(f"{getattr(f, 'name', 'CSV')}: missing column(s) {', '.join(missing)}")
+
+    width = len(header)
+    # absent columns point one past the header, at padding
+    project = itemgetter(*(pos.get(c, width) for c in COLUMNS))
+    pad = [""] * (width + 1)
+    for row in reader:
+        if not row:
+            continue
+        # extra values would otherwise sit where absent columns read their ""
+        del row[width:]
+        row += pad[len(row):]
+        yield project(row)
+
+
+def _read(path, row_opts: dict) -> Iterator[ParsedRow | None]:
+    for f in _text_streams(path):
+        for values in read_projected(f):
+            yield parse_row(values, **row_opts)
+
+
+def parse_file(path, row_opts: dict, queue) -> None:
+    """
+    Process-pool task: puts one file's parsed rows on `queue` in lists of
+    up to PARSE_CHUNK (None for a row the filters excluded), then None.
+    """
+    try:
+        rows = _read(path, row_opts)
+        while chunk := list(islice(rows, PARSE_CHUNK)):
+            queue.put(chunk)
+    finally:
+        queue.put(None)
+
+
+def parse_files(paths, row_opts: dict, *, workers: int = 1) -> Iterator[ParsedRow | None]:
+    """
+    Parsed rows of every file, in file order; None stands for a row the
+    filters excluded. With more than one worker the files are parsed in a
+    process pool while the caller (the single DB writer) consumes them.
+    Workers hand rows over in PARSE_CHUNK lists through a bounded queue per
+    file, so no file is ever held in memory whole; at most two files per
+    worker are started ahead of the writer.
+    """
+    if workers <= 1 or len(paths) < 2:
+        for path in paths:
+            yield from _read(path, row_opts)
+        return
+
+    # Spawned, not forked: workers never touch the database and must not
+    # inherit this process's connection, which stays open for the caller
+    # (its transaction and the shadow import's TEMP tables live on it).
+    todo = iter(paths)
+    context = multiprocessing.get_context("spawn")
+    # The queues' manager unpickles the rows too, so it is set up like a worker.
+    manager = SyncManager(ctx=context)
+    manager.start(django.setup)
+    with manager, ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        def submit(path):
+            queue = manager.Queue(QUEUED_CHUNKS)
+            return queue, pool.submit(parse_file, path, row_opts, queue)
+
+        pending = deque(submit(p) for p in islice(todo, 2 * workers))
+        try:
+            while pending:
+                queue, task = pending[0]
+                for p in islice(todo, 1):
+                    pending.append(submit(p))
+                while (chunk := queue.get()) is not None:
+                    yield from chunk
+                pending.popleft()
+                task.result()
+        finally:
+            # Stopped early: drop what has not started, let the rest run out
+            # so no worker is left blocked on a full queue.
+            for queue, task in pending:
+                if not task.cancel() and not task.done():
+                    while queue.get() is not None:
+                        pass
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_options(row_opts: dict) -> str:
+    """The row filters an import ran with; a file only counts as imported under the same ones."""
+    return json.dumps({k: v for k, v in row_opts.items() if k != "captured_at"}, sort_keys=True)
+
+
+def changed_files(paths, options: str, *, force: bool = False) -> tuple[list[tuple], list[Path]]:
+    """
+    Splits `paths` into ([(path, sha256, size)] to import, [unchanged
+    paths]) using the ImportManifest. With `force` nothing is unchanged.
+    """
+    known = {} if force else {
+        m.path: m for m in ImportManifest.objects.filter(path__in=[str(p.resolve()) for p in paths], options=options)
+    }
+    todo, unchanged = [], []
+    for p in paths:
+        digest = file_digest(p)
+        m = known.get(str(p.resolve()))
+        if m is not None and m.sha256 == digest:
+            unchanged.append(p)
+        else:
+            todo.append((p, digest, p.stat().st_size))
+    return todo, unchanged
+
+
+def record_files(files, options: str) -> None:
+    """Marks (path, sha256, size) entries as fully imported."""
+    ImportManifest.objects.bulk_create(
+        [ImportManifest(path=str(p.resolve()), sha256=digest, size=size, options=options) for p, digest, size in files],
+        update_conflicts=True,
+        unique_fields=["path"],
+        update_fields=["sha256", "size", "options", "imported_at"],
+    )
+
+
+class _ItemState(NamedTuple):
+    pk: int
+    latest_at: datetime | None
+    latest_prices: tuple  # latest_* values in PRICE_FIELDS order
+    fingerprint: str
+
+
+def _item_state(keys) -> dict:
+    """{ (product_id, printing): _ItemState } for the existing items among `keys`."""
+    rows = CatalogItem.objects.filter(product_id__in={p for p, _ in keys}).values_list(
+        "product_id", "printing", "pk", "latest_captured_at", "import_fingerprint",
+        *(f"latest_{f}" for f in PRICE_FIELDS),
+    )
+    return {
+        (p, pr): _ItemState(pk, at, tuple(prices), fp)
+        for p, pr, pk, at, fp, *prices in rows if (p, pr) in keys
+    }
+
+
+def _confirms_latest(row: ParsedRow, state: _ItemState | None) -> bool:
+    """True when `row` repeats the item's latest prices at the same or a later time."""
+    return (
+        state is not None and row.prices is not None and state.latest_at is not None
+        and row.captured_at >= state.latest_at and row.prices == state.latest_prices
+    )
+
+
+def _confirm_prices(confirmed: dict) -> None:
+    """Moves price_confirmed_at forward for { item_id: captured_at }."""
+    by_time = {}
+    for item_id, at in confirmed.items():
+        by_time.setdefault(at, []).append(item_id)
+    for at, item_ids in by_time.items():
+        CatalogItem.objects.filter(pk__in=item_ids).filter(
+            Q(price_confirmed_at__isnull=True) | Q(price_confirmed_at__lt=at)
+        ).update(price_confirmed_at=at)
+
+
+def _advance_latest(item_ids) -> None:
+    """
+    bulk_create skips PriceSnapshot.save(); move the latest_* columns of
+    items whose newest snapshot was just written, in one UPDATE.
+    """
+    newest = PriceSnapshot.objects.filter(item=OuterRef("pk")).order_by("-captured_at")
+    CatalogItem.objects.filter(pk__in=item_ids).update(**{
+        name: Subquery(newest.values("pk" if name == "latest_snapshot" else name.removeprefix("latest_"))[:1])
+        for name in PriceSnapshot.latest_fields(None)
+    })
+
+
+def _prices_changed(item_ids, since: datetime) -> None:
+    """What the PriceSnapshot post_save signal does, once per batch."""
+    holders = holders_of_items(item_ids)
+    schedule_refresh(card_ids=holders.cards, sealed_ids=holders.sealed)
+    invalidate_timeline(holders.users, dj_timezone.localdate(since))
+
+
+def _plan_batch(rows: list[ParsedRow], stats: ImportStats, *, force: bool, skip_unchanged_prices: bool,
+                fingerprints=None) -> tuple[dict, dict, list[ParsedRow]]:
+    """
+    Compares a batch with the items' current state (reads only). Returns
+    (existing item state, { item_id: captured_at } whose latest prices are
+    just confirmed, the rows left to write). `fingerprints` overrides the
+    stored fingerprint of items already written earlier in the run.
+    """
+    existing = _item_state({(r.product_id, r.printing) for r in rows})
+
+    confirmed = {}
+    if skip_unchanged_prices:
+        for r in rows:
+            st = existing.get((r.product_id, r.printing))
+            if _confirms_latest(r, st):
+                confirmed[st.pk] = max(r.captured_at, confirmed.get(st.pk, r.captured_at))
+        stats.prices_confirmed = len(confirmed)
+
+    if not force:
+        fingerprints = fingerprints or {}
+        changed = [
+            r for r in rows
+            if fingerprints.get((r.product_id, r.printing), getattr(existing.get((r.product_id, r.printing)), "fingerprint", None))
+            != r.fingerprint
+        ]
+        stats.rows_unchanged = len(rows) - len(changed)
+        rows = changed
+    return existing, confirmed, rows
+
+
+def _needs_snapshot(row: ParsedRow, state: _ItemState | None, skip_unchanged_prices: bool) -> bool:
+    return row.prices is not None and not (skip_unchanged_prices and _confirms_latest(row, state))
+
+
+def write_batch(rows: list[ParsedRow], *, force: bool = False, skip_unchanged_prices: bool = False) -> ImportStats:
+    """
+    Upserts a batch of parsed rows in one transaction: one bulk upsert for
+    the CatalogItems, one for their PriceSnapshots, plus a few lookups.
+    Rows whose fingerprint matches the item's last import are skipped
+    unless `force`. With `skip_unchanged_prices`, a row repeating the
+    item's latest prices only moves CatalogItem.price_confirmed_at instead
+    of adding a snapshot. A later row for the same item (or item and
+    timestamp) wins, as it did with row-at-a-time update_or_create.
+    """
+    stats = ImportStats()
+    if not rows:
+        return stats
+
+    with transaction.atomic():
+        existing, confirmed, rows = _plan_batch(rows, stats, force=force, skip_unchanged_prices=skip_unchanged_prices)
+        _confirm_prices(confirmed)
+        if not rows:
+            return stats
+
+        items = {(r.product_id, r.printing): r for r in rows}
+        CatalogItem.objects.bulk_create(
+            [
+                CatalogItem(product_id=p, printing=pr, import_fingerprint=r.fingerprint, **dict(zip(ITEM_FIELDS, r.item)))
+                for (p, pr), r in items.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["product_id", "printing"],
+            update_fields=[*ITEM_FIELDS, "import_fingerprint"],
+        )
+        state = existing if items.keys() <= existing.keys() else _item_state(items.keys())
+
+        snapshots = {}
+        for r in rows:
+            st = state[(r.product_id, r.printing)]
+            if not _needs_snapshot(r, existing.get((r.product_id, r.printing)), skip_unchanged_prices):
+                continue
+            snapshots[(st.pk, r.captured_at)] = PriceSnapshot(
+                item_id=st.pk, captured_at=r.captured_at, source="tcgcsv", **dict(zip(PRICE_FIELDS, r.prices)),
+            )
+            stats.prices_upserted += 1
+
+        if snapshots:
+            PriceSnapshot.objects.bulk_create(
+                list(snapshots.values()),
+                update_conflicts=True,
+                unique_fields=["item", "captured_at"],
+                update_fields=[*PRICE_FIELDS, "source"],
+            )
+            latest_at = {st.pk: st.latest_at for st in state.values()}
+            _advance_latest({
+                item_id for item_id, at in snapshots
+                if latest_at.get(item_id) is None or at >= latest_at[item_id]
+            })
+            _prices_changed({item_id for item_id, _ in snapshots}, min(at for _, at in snapshots))
+
+    stats.items_created = len(items.keys() - existing.keys())
+    stats.items_updated = len(rows) - stats.items_created
+    return stats
+
+
+class ShadowImport:
+    """
+    import_tcgcsv --shadow. Each batch is compared with the live tables
+    (reads only) and what write_batch() would write is staged in TEMP
+    tables instead; apply() then merges everything into CatalogItem and
+    PriceSnapshot in one short transaction, so readers never see a
+    partially imported run. Rows are compared with the catalog as it was
+    before the run, except that a repeated row is still recognised as
+    unchanged.
+    """
+
+    def __init__(self, *, force: bool = False, skip_unchanged_prices: bool = False):
+        self.force = force
+        self.skip_unchanged_prices = skip_unchanged_prices
+        self.items = ShadowTable.for_model(
+            CatalogItem, ["product_id", "printing", *ITEM_FIELDS, "import_fingerprint"], key=["product_id", "printing"],
+        )
+        item_field, snap_field = CatalogItem._meta.get_field, PriceSnapshot._meta.get_field
+        self.prices = ShadowTable(
+            f"shadow_{PriceSnapshot._meta.db_table}",
+            [
+                ("product_id", item_field("product_id")),
+                ("printing", item_field("printing")),
+                *((f, snap_field(f)) for f in ["captured_at", *PRICE_FIELDS, "source"]),
+            ],
+            key=["product_id", "printing", "captured_at"],
+        )
+        self.confirmed = {}
+        self.fingerprints = {}  # (product_id, printing) -> fingerprint staged this run
+        self.first_price_at = None
+
+    def __enter__(self):
+        self.items.__enter__()
+        self.prices.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.prices.__exit__(*exc)
+        self.items.__exit__(*exc)
+
+    def add(self, rows: list[ParsedRow]) -> ImportStats:
+        """Stages one batch; the returned stats count what apply() will write."""
+        stats = ImportStats()
+        if not rows:
+            return stats
+
+        existing, confirmed, rows = _plan_batch(
+            rows, stats, force=self.force, skip_unchanged_prices=self.skip_unchanged_prices, fingerprints=self.fingerprints,
+        )
+        for item_id, at in confirmed.items():
+            self.confirmed[item_id] = max(at, self.confirmed.get(item_id, at))
+
+        created = {(r.product_id, r.printing) for r in rows} - existing.keys() - self.fingerprints.keys()
+        self.items.stage((r.product_id, r.printing, *r.item, r.fingerprint) for r in rows)
+        self.fingerprints.update(((r.product_id, r.printing), r.fingerprint) for r in rows)
+
+        snapshots = [r for r in rows if _needs_snapshot(r, existing.get((r.product_id, r.printing)), self.skip_unchanged_prices)]
+        self.prices.stage((r.product_id, r.printing, r.captured_at, *r.prices, "tcgcsv") for r in snapshots)
+        if snapshots:
+            first = min(r.captured_at for r in snapshots)
+            self.first_price_at = min(first, self.first_price_at or first)
+
+        stats.prices_upserted = len(snapshots)
+        stats.items_created = len(created)
+        stats.items_updated = len(rows) - stats.items_created
+        return stats
+
+    def _staged_items(self, where: str = "") -> RawSQL:
+        """Ids of the items with a staged snapshot (matching `where`), as a subquery."""
+        qn = connection.ops.quote_name
+        return RawSQL(
+            f"SELECT ci.id FROM {qn(self.prices.name)} s JOIN {qn(CatalogItem._meta.db_table)} ci "
+            f"ON ci.product_id = s.product_id AND ci.printing = s.printing {where}",
+            (),
+        )
+
+    def apply(self) -> None:
+        """Swaps the staged rows in: one transaction of set-based statements."""
+        qn = connection.ops.quote_name
+        with transaction.atomic():
+            _confirm_prices(self.confirmed)
+            self.items.merge(
+                CatalogItem, unique_fields=["product_id", "printing"], update_fields=[*ITEM_FIELDS, "import_fingerprint"],
+            )
+            if self.first_price_at is None:
+                return
+            price_cols = ["captured_at", *PRICE_FIELDS, "source"]
+            self.prices.merge(
+                PriceSnapshot,
+                unique_fields=["item", "captured_at"],
+                update_fields=[*PRICE_FIELDS, "source"],
+                columns=["item_id", *price_cols],
+                select=(
+                    f"SELECT ci.id, {', '.join(f's.{qn(c)}' for c in price_cols)} "
+                    f"FROM {qn(self.prices.name)} s JOIN {qn(CatalogItem._meta.db_table)} ci "
+                    f"ON ci.product_id = s.product_id AND ci.printing = s.printing"
+                ),
+            )
+            # latest_* still describe the catalog before the run here
+            _advance_latest(self._staged_items(
+                "WHERE ci.latest_captured_at IS NULL OR s.captured_at >= ci.latest_captured_at"
+            ))
+        # reads only; the refreshes are deferred by the caller's batched_refresh()
+        _prices_changed(CatalogItem.objects.filter(pk__in=self._staged_items()).values("pk"), self.first_price_at)
@@ -0,0 +1,224 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from tracker.models import (
+    Card, SealedProduct, Purchase, Sale, MarketPrice, CatalogItem, PriceSnapshot, PriceRollup,
+    PortfolioValuePoint, money,
+)
+from tracker.services.price_history import period_end
+
+WRITE_BATCH = 1000
+
+
+def _day_start(d: date) -> datetime:
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def _owned(user_id: int) -> Q:
+    return Q(card__user_id=user_id) | Q(sealed_product__user_id=user_id)
+
+
+def _holding(card_id, sealed_product_id):
+    return ("card", card_id) if card_id else ("sealed", sealed_product_id)
+
+
+class _Valuation:
+    """
+    Running portfolio value. Every change is applied as a delta so a day
+    costs O(events that day) rather than O(holdings).
+    """
+
+    def __init__(self, item_of: dict):
+        self.item_of = item_of
+        self.holders = defaultdict(list)
+        for h, item_id in item_of.items():
+            if item_id:
+                self.holders[item_id].append(h)
+        self.qty = defaultdict(int)
+        self.manual = {}
+        self.item_price = {}
+        self.value = Decimal("0")
+        self.spent = Decimal("0")
+
+    def price(self, h) -> Decimal:
+        p = self.manual.get(h)
+        if p is None:
+            p = self.item_price.get(self.item_of.get(h))
+        return p or Decimal("0")
+
+    def add_qty(self, h, dq: int):
+        self.value += dq * self.price(h)
+        self.qty[h] += dq
+
+    def set_manual(self, h, p: Decimal):
+        old = self.price(h)
+        self.manual[h] = p
+        self.value += self.qty[h] * (self.price(h) - old)
+
+    def set_item_price(self, item_id, p: Decimal):
+        old = self.item_price.get(item_id) or Decimal("0")
+        self.item_price[item_id] = p
+        for h in self.holders.get(item_id, ()):
+            if self.manual.get(h) is None:
+                self.value += self.qty[h] * (p - old)
+
+
+def _opening_state(user_id: int, start: date) -> _Valuation:
+    """Holdings, cost and as-of prices at the end of the day before `start`."""
+    item_of = {("card", pk): item for pk, item in Card.objects.filter(user_id=user_id).values_list("pk", "catalog_item_id")}
+    item_of.update({
+        ("sealed", pk): item
+        for pk, item in SealedProduct.objects.filter(user_id=user_id).values_list("pk", "catalog_item_id")
+    })
+    state = _Valuation(item_of)
+    start_dt = _day_start(start)
+
+    item_ids = {i for i in item_of.values() if i}
+    snap = PriceSnapshot.objects.filter(item=OuterRef("pk"), captured_at__lt=start_dt, market__isnull=False)
+    rollup = PriceRollup.objects.filter(item=OuterRef("pk"), period_start__lt=start, close__isnull=False)
+    for item_id, p in CatalogItem.objects.filter(pk__in=item_ids).annotate(
+        p=Coalesce(
+            Subquery(snap.order_by("-captured_at").values("market")[:1]),
+            Subquery(rollup.order_by("-period_start").values("close")[:1]),
+        )
+    ).values_list("pk", "p"):
+        if p is not None:
+            state.item_price[item_id] = p
+
+    for kind, model, owner in (("card", Card, "card"), ("sealed", SealedProduct, "sealed_product")):
+        manual = MarketPrice.objects.filter(**{owner: OuterRef("pk")}, date__lt=start_dt)
+        for pk, p in model.objects.filter(user_id=user_id).annotate(
+            p=Subquery(manual.order_by("-date").values("price")[:1])
+        ).values_list("pk", "p"):
+            if p is not None:
+                state.manual[(kind, pk)] = p
+
+    for card_id, sealed_id, q, c in (
+        Purchase.objects.filter(_owned(user_id), date__lt=start)
+        .values("card_id", "sealed_product_id")
+        .annotate(q=Sum("quantity"), c=Sum(F("quantity") * F("price_each")))
+        .values_list("card_id", "sealed_product_id", "q", "c")
+    ):
+        state.add_qty(_holding(card_id, sealed_id), q or 0)
+        state.spent += c or Decimal("0")
+
+    for card_id, sealed_id, n in (
+        Sale.objects.filter(_owned(user_id), date__lt=start)
+        .values("card_id", "sealed_product_id")
+        .annotate(n=Count("id"))
+        .values_list("card_id", "sealed_product_id", "n")
+    ):
+        state.add_qty(_holding(card_id, sealed_id), -n)
+
+    return state
+
+
+def _events(user_id: int, state: _Valuation, start: date, through: date) -> dict:
+    """{ day: [callable(state)] } for everything that happens in [start, through]."""
+    events = defaultdict(list)
+    start_dt, end_dt = _day_start(start), _day_start(through + timedelta(days=1))
+    item_ids = list(state.holders)
+
+    for period, start_day, item_id, p in PriceRollup.objects.filter(
+        item_id__in=item_ids, period_start__gte=start, period_start__lte=through, close__isnull=False
+    ).order_by("period_start").values_list("period", "period_start", "item_id", "close"):
+        day = min(period_end(period, start_day), through)
+        events[day].append(lambda s, i=item_id, p=p: s.set_item_price(i, p))
+
+    for captured_at, item_id, p in PriceSnapshot.objects.filter(
+        item_id__in=item_ids, captured_at__gte=start_dt, captured_at__lt=end_dt, market__isnull=False
+    ).order_by("captured_at").values_list("captured_at", "item_id", "market"):
+        events[timezone.localdate(captured_at)].append(lambda s, i=item_id, p=p: s.set_item_price(i, p))
+
+    for d, card_id, sealed_id, p in MarketPrice.objects.filter(
+        _owned(user_id), date__gte=start_dt, date__lt=end_dt
+    ).order_by("date").values_list("date", "card_id", "sealed_product_id", "price"):
+        h = _holding(card_id, sealed_id)
+        events[timezone.localdate(d)].append(lambda s, h=h, p=p: s.set_manual(h, p))
+
+    for d, card_id, sealed_id, q, each in Purchase.objects.filter(
+        _owned(user_id), date__gte=start, date__lte=through
+    ).values_list("date", "card_id", "sealed_product_id", "quantity", "price_each"):
+        h = _holding(card_id, sealed_id)
+
+        def buy(s, h=h, q=q, each=each):
+            s.add_qty(h, q)
+            s.spent += q * each
+        events[d].append(buy)
+
+    for d, card_id, sealed_id in Sale.objects.filter(
+        _owned(user_id), date__gte=start, date__lte=through
+    ).values_list("date", "card_id", "sealed_product_id"):
+        h = _holding(card_id, sealed_id)
+        events[d].append(lambda s, h=h: s.add_qty(h, -1))
+
+    return events
+
+
+def extend_timeline(user_id: int, through: date | None = None) -> int:
+    """
+    Appends PortfolioValuePoints from the day after the last stored point
+    (or the user's first purchase) through `through`, default today.
+    Returns the number of days written.
+    """
+    through = through or timezone.localdate()
+    last = PortfolioValuePoint.objects.filter(user_id=user_id).aggregate(last=Max("date"))["last"]
+    if last is not None:
+        start = last + timedelta(days=1)
+    else:
+        start = Purchase.objects.filter(_owned(user_id)).aggregate(first=Min("date"))["first"]
+    if start is None or start > through:
+        return 0
+
+    state = _opening_state(user_id, start)
+    events = _events(user_id, state, start, through)
+
+    points = []
+    written = 0
+    day = start
+    while day <= through:
+        for apply in events.get(day, ()):
+            apply(state)
+        points.append(PortfolioValuePoint(
+            user_id=user_id, date=day, market_value=money(state.value), total_spent=money(state.spent),
+        ))
+        if len(points) >= WRITE_BATCH:
+            written += _write(points)
+            points = []
+        day += timedelta(days=1)
+    return written + _write(points)
+
+
+def _write(points) -> int:
+    PortfolioValuePoint.objects.bulk_create(
+        points,
+        update_conflicts=True,
+        unique_fields=["user", "date"],
+        update_fields=["market_value", "total_spent"],
+    )
+    return len(points)
+
+
+def invalidate_timeline(user_ids, since: date | None = None) -> None:
+    """Drops stored points from `since` onward (all points when None)."""
+    user_ids = {u for u in user_ids if u}
+    if not user_ids:
+        return
+    qs = PortfolioValuePoint.objects.filter(user_id__in=user_ids)
+    if since is not None:
+        qs = qs.filter(date__gte=since)
+    qs.delete()
+
+
+def portfolio_timeline(user, *, days: int | None = None):
+    """The user's value timeline, brought up to date first."""
+    extend_timeline(user.pk)
+    qs = PortfolioValuePoint.objects.filter(user=user).order_by("date")
+    if days:
+        qs = qs.filter(date__gt=timezone.localdate() - timedelta(days=days))
+    return qs
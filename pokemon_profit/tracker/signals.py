@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from django.db.models.signals import pre_save, pre_delete, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Card, SealedProduct, Purchase, Sale, MarketPrice, PriceSnapshot, CatalogItem
+from .services.lots import schedule_rebuild
+from .services.portfolio import SUMMARY_SUMS, adjust_summary, schedule_refresh, holders_of_items
+from .services.timeline import invalidate_timeline
+
+# the PortfolioSummary counter each model's rows add up into
+SUMMARY_COUNTS = {
+    Card: "cards_count",
+    SealedProduct: "sealed_count",
+    Purchase: "purchases_count",
+    Sale: "sales_count",
+}
+
+
+def _owner_ids(instance) -> set[int]:
+    users = set()
+    if instance.card_id:
+        users.update(Card.objects.filter(pk=instance.card_id).values_list("user_id", flat=True))
+    if instance.sealed_product_id:
+        users.update(SealedProduct.objects.filter(pk=instance.sealed_product_id).values_list("user_id", flat=True))
+    return users
+
+
+@receiver(pre_save, sender=Card)
+@receiver(pre_save, sender=SealedProduct)
+@receiver(pre_save, sender=Purchase)
+@receiver(pre_save, sender=Sale)
+@receiver(pre_delete, sender=Card)
+@receiver(pre_delete, sender=SealedProduct)
+def remember_previous(sender, instance, **kwargs):
+    # edits can move a row to another date/item; both sides need refreshing.
+    # A deleted holding's stored cached_* columns are what its summary holds.
+    instance._previous = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+
+
+def _summary_changed(sender, instance, prev, signal) -> None:
+    """
+    Keeps the users' PortfolioSummary counters, and a holding's sums, in
+    step with what this save or delete wrote: the row as it was is taken
+    out of its user's summary and the row as it is now put in.
+    """
+    holding = sender in (Card, SealedProduct)
+    if signal is post_delete:
+        before, after = (prev or instance) if holding else instance, None
+    else:
+        before, after = prev, instance
+
+    changes = defaultdict(lambda: defaultdict(int))
+    for obj, sign in ((before, -1), (after, 1)):
+        if obj is None:
+            continue
+        changes[obj.user_id][SUMMARY_COUNTS[sender]] += sign
+        if holding:
+            for column, field in SUMMARY_SUMS.items():
+                changes[obj.user_id][field] += sign * getattr(obj, column)
+    for user_id, deltas in changes.items():
+        if any(deltas.values()):
+            adjust_summary(user_id, **deltas)
+
+
+@receiver([post_save, post_delete], sender=Card)
+@receiver([post_save, post_delete], sender=SealedProduct)
+def owned_item_changed(sender, instance, signal, **kwargs):
+    prev = getattr(instance, "_previous", None)
+    _summary_changed(sender, instance, prev, signal)
+    if prev is not None and prev.cost_basis_method != instance.cost_basis_method:
+        holding = (instance.pk, None) if sender is Card else (None, instance.pk)
+        schedule_rebuild({holding})
+
+    if sender is Card:
+        schedule_refresh(card_ids={instance.pk})
+    else:
+        schedule_refresh(sealed_ids={instance.pk})
+
+    if prev is not None and prev.catalog_item_id != instance.catalog_item_id:
+        invalidate_timeline({instance.user_id})
+
+
+@receiver([post_save, post_delete], sender=Purchase)
+@receiver([post_save, post_delete], sender=Sale)
+def transaction_changed(sender, instance, signal, **kwargs):
+    users = {instance.user_id} | _owner_ids(instance)
+    holdings = {(instance.card_id, instance.sealed_product_id)}
+    since = instance.date
+
+    prev = getattr(instance, "_previous", None)
+    _summary_changed(sender, instance, prev, signal)
+    if prev is not None:
+        users |= {prev.user_id} | _owner_ids(prev)
+        holdings.add((prev.card_id, prev.sealed_product_id))
+        since = min(since, prev.date)
+
+    # lots first: the valuation/summary refresh reads the realized gains they write
+    schedule_rebuild(holdings)
+    schedule_refresh(
+        card_ids={c for c, _ in holdings},
+        sealed_ids={s for _, s in holdings},
+    )
+    invalidate_timeline(users, since)
+
+
+@receiver([post_save, post_delete], sender=MarketPrice)
+def market_price_changed(sender, instance, **kwargs):
+    users = _owner_ids(instance)
+    schedule_refresh(card_ids={instance.card_id}, sealed_ids={instance.sealed_product_id})
+    invalidate_timeline(users, timezone.localdate(instance.date))
+
+
+@receiver([post_save, post_delete], sender=PriceSnapshot)
+def price_snapshot_changed(sender, instance, **kwargs):
+    holders = holders_of_items([instance.item_id])
+    schedule_refresh(card_ids=holders.cards, sealed_ids=holders.sealed)
+    invalidate_timeline(holders.users, timezone.localdate(instance.captured_at))
+
+
+@receiver(post_delete, sender=PriceSnapshot)
+def price_snapshot_deleted(sender, instance, **kwargs):
+    # deleting the latest snapshot nulls CatalogItem.latest_snapshot (SET_NULL)
+    for item in CatalogItem.objects.filter(pk=instance.item_id, latest_snapshot__isnull=True):
+        item.refresh_latest_price()
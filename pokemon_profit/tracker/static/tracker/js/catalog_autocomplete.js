@@ -0,0 +1,88 @@
+// Search box for catalog <select data-autocomplete> widgets (tracker.forms.CatalogSelect).
+// The page only renders the selected option; typing fetches matches from the
+// catalog_autocomplete view and replaces the other options.
+(function () {
+  "use strict";
+
+  const DELAY_MS = 200;
+  const MIN_CHARS = 2;
+
+  function option(value, text) {
+    const opt = document.createElement("option");
+    opt.value = value;
+    opt.textContent = text;
+    return opt;
+  }
+
+  function setup(select) {
+    const search = document.createElement("input");
+    search.type = "search";
+    search.placeholder = "Search catalog…";
+    search.autocomplete = "off";
+    search.className = "catalog-search";
+    select.parentNode.insertBefore(search, select);
+
+    const more = document.createElement("button");
+    more.type = "button";
+    more.textContent = "More results";
+    more.hidden = true;
+    select.insertAdjacentElement("afterend", more);
+
+    let timer = null;
+    let query = "";
+    let page = 1;
+    let controller = null;
+
+    function keepOnly(selectedValue) {
+      for (const opt of Array.from(select.options)) {
+        if (opt.value !== "" && opt.value !== selectedValue) opt.remove();
+      }
+    }
+
+    async function load(append) {
+      if (controller) controller.abort();
+      controller = new AbortController();
+      const url = new URL(select.dataset.autocomplete, window.location.origin);
+      url.search = new URLSearchParams({ kind: select.dataset.kind, q: query, page: page });
+      let data;
+      try {
+        const resp = await fetch(url, { signal: controller.signal, credentials: "same-origin" });
+        if (!resp.ok) return;
+        data = await resp.json();
+      } catch (err) {
+        return; // aborted by a newer search, or offline
+      }
+      const selected = select.value;
+      if (!append) keepOnly(selected);
+      for (const item of data.results) {
+        if (String(item.id) !== selected) select.appendChild(option(item.id, item.text));
+      }
+      more.hidden = !data.more;
+      if (!append && data.results.length) select.size = Math.min(10, select.options.length);
+    }
+
+    search.addEventListener("input", function () {
+      clearTimeout(timer);
+      query = search.value.trim();
+      page = 1;
+      if (query.length < MIN_CHARS) {
+        keepOnly(select.value);
+        more.hidden = true;
+        select.size = 0;
+        return;
+      }
+      timer = setTimeout(function () { load(false); }, DELAY_MS);
+    });
+
+    more.addEventListener("click", function () {
+      page += 1;
+      load(true);
+    });
+
+    select.addEventListener("change", function () { select.size = 0; });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("select[data-autocomplete]").forEach(setup);
+  });
+})();
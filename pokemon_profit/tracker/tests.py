@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import json
+import math
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .analytics.engine import PriceHistory, compute_metrics, drawdowns, load_history, log_returns
+from .benchmarks import compare
+from .checks import search_triggers_check
+from .forms import CardForm, SaleForm
+from .matching import norm, number_key, token_key
+from .models import (
+    FIFO, LIFO, SPECIFIC, Card, CardCatalog, CatalogCrossRef, CatalogItem, CatalogSetGroup, CatalogSetState, MarketPrice,
+    PortfolioSummary, PortfolioValuePoint, PriceRollup, PriceSnapshot,
+    Purchase, Sale, SealedProduct,
+)
+from .pagination import keyset_paginate
+from .services import price_refresh
+from .services.linking import CARD_MIN_SCORE
+from .services.lots import Disposal, Lot, match_lots
+from .services.portfolio import get_summary, rebuild_summary
+from .services.price_history import compact_prices, compact_snapshots
+from .services.price_refresh import PriceRefresher, TokenBucket
+from .services.resolver import CatalogResolver, link_card
+from .services.search import autocomplete, missing_search_triggers, search_filter, search_ids
+from .services.tcgcsv import (
+    COLUMNS, ShadowImport, expand_paths, parse_file, parse_files, parse_row, read_projected, write_batch,
+)
+from .services.timeline import extend_timeline
+
+
+class MockPriceServer:
+    """
+    A local TCGAPIs stand-in on a free port. `responses` maps a product id
+    to a list of (status, body, headers) served in order (the last one
+    repeats); other products get a 200 with a market price.
+    """
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.hits = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                pid = int(self.path.rstrip("/").rsplit("/", 1)[1])
+                n = server.hits[pid] = server.hits.get(pid, 0) + 1
+                script = server.responses.get(pid)
+                if script:
+                    status, body, headers = script[min(n, len(script)) - 1]
+                else:
+                    status, body, headers = 200, {"data": {"prices": [{"marketPrice": 1.25}]}}, {}
+                raw = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+RATE_LIMITED = (429, {"error": "slow down"}, {"Retry-After": "0.05"})
+OK = (200, {"data": {"prices": [{"marketPrice": 3.5}]}}, {})
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.slept = []
+
+        def sleep(seconds):
+            self.slept.append(seconds)
+            self.now += seconds
+
+        self.bucket = TokenBucket(4, burst=2, clock=lambda: self.now, sleep=sleep)
+
+    def test_burst_then_rate(self):
+        for _ in range(3):
+            self.bucket.acquire()
+        self.assertEqual(self.slept, [0.25])
+
+    def test_throttle_halves_once_per_pause_and_recovers(self):
+        self.bucket.throttle(1.0)
+        self.bucket.throttle(1.0)  # in flight during the same pause
+        self.assertEqual(self.bucket.rate, 2.0)
+        self.bucket.acquire()
+        self.assertGreaterEqual(self.now, 1.0)
+        self.bucket.recover()
+        self.assertAlmostEqual(self.bucket.rate, 2.0 + 4 * price_refresh.RECOVERY)
+
+
+class PriceRefresherTests(SimpleTestCase):
+    def test_429_with_retry_after_halves_rate_then_succeeds(self):
+        with MockPriceServer({7: [RATE_LIMITED, OK]}) as server:
+            refresher = PriceRefresher(rate=10, burst=1, concurrency=1, base_url=server.url)
+            results = list(refresher.run([7]))
+        self.assertEqual([(r.product_id, r.price, r.error) for r in results], [(7, 3.5, "")])
+        self.assertEqual(server.hits[7], 2)
+        self.assertEqual(refresher.report.rate_limited, 1)
+        # halved by the 429, then one success' worth of recovery
+        self.assertAlmostEqual(refresher.bucket.rate, 5 + 10 * price_refresh.RECOVERY)
+
+    def test_gives_up_after_max_wait(self):
+        with MockPriceServer({8: [RATE_LIMITED]}) as server:
+            refresher = PriceRefresher(rate=50, burst=5, concurrency=1, base_url=server.url, max_wait=0.12)
+            (result,) = refresher.run([8])
+        self.assertTrue(result.rate_limited)
+        self.assertIsNone(result.price)
+        # two 0.05s pauses fit in 0.12s, the third would not
+        self.assertEqual(server.hits[8], 3)
+
+    def test_non_object_json_is_an_error_not_a_crash(self):
+        with MockPriceServer({1: [(200, [1, 2], {})], 2: [(200, "oops", {})], 3: [(200, b"not json", {})]}) as server:
+            refresher = PriceRefresher(rate=100, burst=10, concurrency=3, base_url=server.url)
+            results = {r.product_id: r for r in refresher.run([1, 2, 3, 4])}
+        for pid in (1, 2, 3):
+            self.assertIsNone(results[pid].price)
+            self.assertTrue(results[pid].error.startswith("bad response"), results[pid].error)
+        self.assertEqual(results[4].price, 1.25)
+
+
+class UpdatePricesCommandTests(TestCase):
+    def test_writes_market_prices_in_batches(self):
+        user = get_user_model().objects.create_user("prices", password="x")
+        for pid in range(1, 6):
+            item = CatalogItem.objects.create(product_id=pid, name=f"Item {pid}")
+            Card.objects.create(user=user, name=f"Card {pid}", catalog_item=item)
+        Card.objects.create(user=user, name="Unlinked")
+
+        save = price_refresh.save_market_prices
+        with MockPriceServer({3: [RATE_LIMITED, OK]}) as server, \
+                mock.patch("tracker.management.commands.update_prices.save_market_prices", wraps=save) as saved:
+            out = StringIO()
+            call_command("update_prices", base_url=server.url, rate=100, burst=10, batch_size=2, stdout=out)
+
+        self.assertEqual([len(call.args[0]) for call in saved.call_args_list], [2, 2, 1])
+        self.assertEqual(MarketPrice.objects.filter(card__user=user).count(), 5)
+        self.assertEqual(MarketPrice.objects.get(card__catalog_item__product_id=3).price, Decimal("3.50"))
+        self.assertIn("Done. Updated=5, Skipped=1, RateLimited=0, Errors=0", out.getvalue())
+        self.assertIn("429s=1", out.getvalue())
+
+
+class MatchLotsTests(SimpleTestCase):
+    LOTS = [
+        Lot(1, date(2024, 1, 1), 2, Decimal("10.00")),
+        Lot(2, date(2024, 2, 1), 1, Decimal("20.00")),
+        Lot(3, date(2024, 4, 1), 1, Decimal("40.00")),
+    ]
+
+    def costs(self, disposals, method):
+        return match_lots(self.LOTS, disposals, method)[1]
+
+    def test_fifo_takes_oldest_lot_first(self):
+        sales = [Disposal(i, date(2024, 3, 1), None) for i in (1, 2, 3, 4)]
+        self.assertEqual(self.costs(sales, FIFO), {1: Decimal("10.00"), 2: Decimal("10.00"),
+                                                   3: Decimal("20.00"), 4: Decimal("0.00")})
+
+    def test_lifo_takes_newest_lot_bought_by_the_sale_date(self):
+        sales = [Disposal(1, date(2024, 3, 1), None), Disposal(2, date(2024, 5, 1), None)]
+        self.assertEqual(self.costs(sales, LIFO), {1: Decimal("20.00"), 2: Decimal("40.00")})
+
+    def test_partial_sells_drain_a_lot_across_sales(self):
+        matches, _ = match_lots(self.LOTS, [Disposal(i, date(2024, 1, 15), None) for i in (1, 2, 3)], FIFO)
+        self.assertEqual(matches, [(1, 1, 1, Decimal("10.00")), (2, 1, 1, Decimal("10.00"))])
+
+    def test_specific_uses_its_lot_then_fifo(self):
+        sales = [Disposal(1, date(2024, 3, 1), 2), Disposal(2, date(2024, 3, 2), 2)]
+        self.assertEqual(self.costs(sales, SPECIFIC), {1: Decimal("20.00"), 2: Decimal("10.00")})
+
+    def test_specific_ignores_lot_bought_after_the_sale_or_unknown(self):
+        sales = [Disposal(1, date(2024, 3, 1), 3), Disposal(2, date(2024, 3, 1), 99)]
+        matches, cost = match_lots(self.LOTS, sales, SPECIFIC)
+        self.assertEqual(cost, {1: Decimal("10.00"), 2: Decimal("10.00")})
+        self.assertNotIn(3, [lot_id for _, lot_id, _, _ in matches])
+
+
+class SaleFormLotTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("lots", password="x")
+        self.card = Card.objects.create(user=user, name="Pikachu")
+        other = Card.objects.create(user=user, name="Eevee")
+        self.box = SealedProduct.objects.create(user=user, name="Booster Box")
+        self.lot = Purchase.objects.create(user=user, card=self.card, price_each="5", date=date(2024, 2, 1))
+        self.other_lot = Purchase.objects.create(user=user, card=other, price_each="5", date=date(2024, 1, 1))
+
+    def form(self, lot, when=date(2024, 3, 1), **holding):
+        data = {"date": when, "price": "9", "platform": "", "lot": lot.pk}
+        data.update({k: v.pk for k, v in (holding or {"card": self.card}).items()})
+        return SaleForm(data)
+
+    def test_lot_of_the_same_card_dated_before_the_sale(self):
+        self.assertTrue(self.form(self.lot).is_valid())
+
+    def test_lot_of_another_holding_is_rejected(self):
+        self.assertIn("lot", self.form(self.other_lot).errors)
+        self.assertIn("lot", self.form(self.lot, sealed_product=self.box).errors)
+
+    def test_lot_bought_after_the_sale_is_rejected(self):
+        self.assertIn("lot", self.form(self.lot, when=date(2024, 1, 15)).errors)
+
+
+class PortfolioSummaryDeltaTests(TestCase):
+    FIELDS = [
+        "cards_count", "sealed_count", "purchases_count", "sales_count", "total_spent", "total_sales",
+        "market_value", "realized_profit", "unrealized_profit",
+    ]
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("summary", password="x")
+        self.item = CatalogItem.objects.create(product_id=1, name="Charizard")
+        get_summary(self.user)
+
+    def assertMatchesRebuild(self):
+        stored = PortfolioSummary.objects.get(user=self.user)
+        kept = {f: getattr(stored, f) for f in self.FIELDS}
+        Card.objects.all().refresh_valuation()
+        SealedProduct.objects.all().refresh_valuation()
+        rebuilt = rebuild_summary(self.user.pk)
+        self.assertEqual(kept, {f: getattr(rebuilt, f) for f in self.FIELDS})
+        return stored
+
+    def test_signals_apply_deltas_that_match_a_full_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            card = Card.objects.create(user=self.user, name="Charizard", catalog_item=self.item)
+            box = SealedProduct.objects.create(user=self.user, name="Booster Box", quantity=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            lot = Purchase.objects.create(user=self.user, card=card, quantity=2, price_each="10", date=date(2024, 1, 1))
+            Purchase.objects.create(user=self.user, sealed_product=box, quantity=2, price_each="100", date=date(2024, 1, 1))
+            MarketPrice.objects.create(sealed_product=box, price="120")
+        with self.captureOnCommitCallbacks(execute=True):
+            PriceSnapshot.objects.create(item=self.item, captured_at=datetime(2024, 2, 1, tzinfo=timezone.utc), market="30")
+            sale = Sale.objects.create(user=self.user, card=card, price="25", date=date(2024, 2, 1), lot=lot)
+        summary = self.assertMatchesRebuild()
+        self.assertEqual((summary.cards_count, summary.purchases_count, summary.sales_count), (1, 2, 1))
+        self.assertEqual(summary.total_spent, Decimal("220.00"))
+        self.assertEqual(summary.realized_profit, Decimal("15.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.price = Decimal("40")
+            sale.save()
+            box.quantity = 3
+            box.save()
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            card.delete()
+        summary = self.assertMatchesRebuild()
+        self.assertEqual((summary.cards_count, summary.purchases_count, summary.sales_count), (0, 1, 0))
+
+    def test_unrealized_profit_counts_only_the_open_lots(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            card = Card.objects.create(user=self.user, name="Charizard")
+            Purchase.objects.create(user=self.user, card=card, quantity=1, price_each="10", date=date(2024, 1, 1))
+            Purchase.objects.create(user=self.user, card=card, quantity=1, price_each="16", date=date(2024, 1, 2))
+            MarketPrice.objects.create(card=card, price="30")
+        with self.captureOnCommitCallbacks(execute=True):
+            Sale.objects.create(user=self.user, card=card, price="25", date=date(2024, 2, 1))
+
+        card = Card.objects.with_valuation().get(pk=card.pk)
+        self.assertEqual((card.open_cost, card.unrealized_profit), (Decimal("16.00"), Decimal("14.00")))
+        self.assertEqual(Card.objects.get(pk=card.pk).unrealized_profit, Decimal("14.00"))
+        self.assertEqual(self.assertMatchesRebuild().unrealized_profit, Decimal("14.00"))
+
+
+class CompactSnapshotsTests(TestCase):
+    def test_rolls_old_snapshots_into_days_and_keeps_the_latest(self):
+        item = CatalogItem.objects.create(product_id=1, name="Charizard")
+        start = datetime(2024, 1, 1, 8, tzinfo=timezone.utc)
+        for hours, market in ((0, "10"), (6, "14"), (24, "12"), (48, None)):
+            PriceSnapshot.objects.create(item=item, captured_at=start + timedelta(hours=hours), market=market)
+        PriceSnapshot.objects.create(item=item, captured_at=start + timedelta(hours=72), market="11")
+        item.refresh_latest_price()
+
+        self.assertEqual(compact_snapshots(start + timedelta(days=30)), 4)
+        self.assertEqual(list(PriceSnapshot.objects.values_list("market", flat=True)), [Decimal("11.00")])
+        self.assertEqual(
+            list(PriceRollup.objects.order_by("period_start").values_list("period_start", "open", "high", "close", "samples")),
+            [(date(2024, 1, 1), Decimal("10.00"), Decimal("14.00"), Decimal("14.00"), 2),
+             (date(2024, 1, 2), Decimal("12.00"), Decimal("12.00"), Decimal("12.00"), 1)],
+        )
+
+    def test_history_view_serves_the_coarsest_tier_covering_the_range(self):
+        item = CatalogItem.objects.create(product_id=1, name="Charizard")
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+        PriceRollup.objects.create(item=item, period=PriceRollup.WEEK, period_start=monday - timedelta(days=14),
+                                   open="10", high="12", low="9", close="11", samples=7)
+        PriceRollup.objects.create(item=item, period=PriceRollup.DAY, period_start=monday - timedelta(days=7),
+                                   open="11", high="13", low="11", close="13", samples=1)
+        PriceSnapshot.objects.create(item=item, market="15",
+                                     captured_at=datetime.combine(monday - timedelta(days=6), datetime.min.time(), timezone.utc))
+
+        self.client.force_login(get_user_model().objects.create_user("history"))
+        data = self.client.get(f"/catalog/{item.pk}/history/", {"days": 30}).json()
+        self.assertEqual(data["period"], PriceRollup.WEEK)
+        self.assertEqual(
+            [(b["start"], b["open"], b["high"], b["close"], b["samples"]) for b in data["bars"]],
+            [((monday - timedelta(days=14)).isoformat(), "10.00", "12.00", "11.00", 7),
+             ((monday - timedelta(days=7)).isoformat(), "11.00", "15.00", "15.00", 2)],
+        )
+        self.assertEqual(self.client.get("/catalog/999/history/").status_code, 404)
+
+
+class CatalogSearchTests(TestCase):
+    def setUp(self):
+        for pk, name in enumerate(["Charizard 50% Off", "Charmander", "Char_x Promo", "Charcadet 50 Off"], 1):
+            CatalogItem.objects.create(product_id=pk, name=name)
+
+    def names(self, query):
+        return set(CatalogItem.objects.filter(pk__in=search_ids(CatalogItem, query)).values_list("name", flat=True))
+
+    def test_short_terms_match_percent_and_underscore_literally(self):
+        self.assertEqual(self.names("char %"), {"Charizard 50% Off"})
+        self.assertEqual(self.names("char _"), {"Char_x Promo"})
+        self.assertEqual(self.names("char 50"), {"Charizard 50% Off", "Charcadet 50 Off"})
+
+    def test_search_filter_is_not_capped(self):
+        self.assertEqual(len(search_ids(CatalogItem, "char", limit=2)), 2)
+        self.assertEqual(CatalogItem.objects.filter(search_filter(CatalogItem, "char")).count(), 4)
+        self.assertEqual(CatalogItem.objects.filter(search_filter(CatalogItem, "char _")).count(), 1)
+
+    def test_card_catalog_entries_are_indexed_on_write(self):
+        card = CardCatalog.objects.create(catalog_id="base1-4", name="Charizard", set_id="base1", set_name="Base", number="4")
+        self.assertEqual(search_ids(CardCatalog, "chariz"), [card.pk])
+        self.assertEqual(search_ids(CardCatalog, "base 4"), [card.pk])
+        card.name = "Blastoise"
+        card.save()
+        self.assertEqual(search_ids(CardCatalog, "chariz"), [])
+        self.assertEqual(search_ids(CardCatalog, "blast"), [card.pk])
+        card.delete()
+        self.assertEqual(search_ids(CardCatalog, "blast"), [])
+
+    def test_missing_search_triggers_fail_the_database_check(self):
+        self.assertEqual(missing_search_triggers(), [])
+        self.assertEqual(search_triggers_check(None, databases=["default"]), [])
+        with connection.cursor() as cur:
+            cur.execute("DROP TRIGGER tracker_cardcatalog_search_ins")  # rolled back with the test
+        self.assertEqual(missing_search_triggers(), ["tracker_cardcatalog_search_ins"])
+        self.assertEqual([e.id for e in search_triggers_check(None, databases=["default"])], ["tracker.W001"])
+
+
+class AnalyticsEngineTests(SimpleTestCase):
+    # item 1: 10 -> 20 -> 15 -> 30, item 2: 4 -> 2 -> 1
+    HISTORY = PriceHistory.from_rows([1, 1, 1, 1, 2, 2, 2], range(7), [10, 20, 15, 30, 4, 2, 1])
+
+    def test_log_returns_restart_at_each_item(self):
+        r, valid = log_returns(self.HISTORY)
+        self.assertEqual(valid.tolist(), [False, True, True, True, False, True, True])
+        expected = [0, math.log(2), math.log(0.75), math.log(2), 0, math.log(0.5), math.log(0.5)]
+        for got, want in zip(r, expected):
+            self.assertAlmostEqual(got, want)
+
+    def test_drawdowns_from_each_items_own_peak(self):
+        for got, want in zip(drawdowns(self.HISTORY), [0, 0, -0.25, 0, 0, -0.5, -0.75]):
+            self.assertAlmostEqual(got, want)
+
+    def test_metrics_per_item(self):
+        m = compute_metrics(self.HISTORY, window=2)
+        returns = [math.log(2), math.log(0.75), math.log(2)]
+        mean = sum(returns) / 3
+        std = math.sqrt(sum((r - mean) ** 2 for r in returns) / 2)
+        self.assertEqual(m["item_id"].tolist(), [1, 2])
+        self.assertEqual(m["points"].tolist(), [4, 3])
+        for key, want in {
+            "total_return": [2.0, -0.75],
+            "mean_return": [mean, math.log(0.5)],
+            "volatility": [std, 0.0],
+            "rolling_mean": [22.5, 1.5],
+            "max_drawdown": [-0.25, -0.75],
+        }.items():
+            for got, w in zip(m[key], want):
+                self.assertAlmostEqual(got, w, msg=key)
+
+
+class LoadHistoryTests(TestCase):
+    def setUp(self):
+        self.item = CatalogItem.objects.create(product_id=1, name="Charizard")
+        for day, market in enumerate(["10", "12", "9", "15", "14", "18"], 1):
+            PriceSnapshot.objects.create(item=self.item, captured_at=datetime(2024, 1, day, 12, tzinfo=timezone.utc), market=market)
+        self.item.refresh_latest_price()
+
+    def metrics(self, **opts):
+        m = compute_metrics(load_history(**opts))
+        return {k: v.tolist() for k, v in m.items()}
+
+    def test_metrics_survive_compaction_into_daily_rollups(self):
+        before = self.metrics()
+        compact_prices(raw_days=1, daily_days=30, weekly_days=60, today=date(2024, 1, 10))
+        self.assertEqual(PriceSnapshot.objects.count(), 1)
+        self.assertEqual(self.metrics(), before)
+
+    def test_since_keeps_the_rollups_covering_it(self):
+        compact_prices(raw_days=1, daily_days=30, weekly_days=60, today=date(2024, 1, 10))
+        self.assertEqual(self.metrics(since=datetime(2024, 1, 4, tzinfo=timezone.utc))["points"], [3])
+        self.assertEqual(self.metrics(field="low")["points"], [])
+
+
+class BenchmarkSuiteSmokeTests(TestCase):
+    CASES = ["view:dashboard", "command:auto_link_owned"]
+
+    def setUp(self):
+        out = StringIO()
+        call_command(
+            "seed_benchmark_data", users=1, items=12, sealed_items=2, sets=2, days=5, cards_per_user=6,
+            sealed_per_user=1, purchases_per_holding=2, stdout=out,
+        )
+        self.assertIn("Done ✅", out.getvalue())
+        self.tmp = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def run_benchmarks(self, output, **opts):
+        out = StringIO()
+        call_command(
+            "run_benchmarks", only=self.CASES, repeat=1, csv_rows=10, catalog_zip=str(self.tmp / "missing.zip"),
+            output=str(self.tmp / output), stdout=out, **opts,
+        )
+        return json.loads((self.tmp / output).read_text()), out.getvalue()
+
+    def test_report_shape_and_regressions(self):
+        report, out = self.run_benchmarks("report.json")
+        self.assertIn("Running 2 benchmarks", out)
+        self.assertEqual(set(report), {"meta", "cases"})
+        self.assertEqual(report["meta"]["dataset"]["users"], 1)
+        self.assertTrue(report["meta"]["user"].startswith("bench_user_"))
+        self.assertEqual(set(report["cases"]), set(self.CASES))
+        for case in report["cases"].values():
+            self.assertLessEqual({"seconds", "runs", "queries", "peak_kb"}, set(case))
+            self.assertEqual(len(case["runs"]), 1)
+            self.assertGreater(case["queries"], 0)
+        self.assertEqual(report["cases"]["view:dashboard"]["status"], 200)
+
+        self.assertEqual(compare(report, report), [])
+        baseline = json.loads(json.dumps(report))
+        dashboard = baseline["cases"]["view:dashboard"]
+        dashboard["queries"] -= 1
+        dashboard["seconds"] = report["cases"]["view:dashboard"]["seconds"] / 2
+        del baseline["cases"]["command:auto_link_owned"]
+        self.assertEqual(
+            [(r["case"], r["metric"]) for r in compare(report, baseline, tolerance=0.2)],
+            [("view:dashboard", "seconds"), ("view:dashboard", "queries")],
+        )
+
+        (self.tmp / "baseline.json").write_text(json.dumps(baseline))
+        with self.assertRaisesMessage(CommandError, "regression(s)"):
+            self.run_benchmarks("again.json", baseline=str(self.tmp / "baseline.json"), tolerance=1e6,
+                                fail_on_regression=True)
+
+    def test_reset_drops_seeded_data_and_what_imports_derived_from_it(self):
+        real_user = get_user_model().objects.create_user("real")
+        real_item = CatalogItem.objects.create(product_id=5, name="Pikachu", card_number="5")
+        seeded = CatalogItem.objects.filter(product_id__gte=900_000_000, is_sealed=False).first()
+        Card.objects.create(user=real_user, name="Pikachu", catalog_item=seeded)
+        # as import_catalog's cross-reference rebuild leaves them
+        entry = CardCatalog.objects.create(catalog_id="x-1", name=seeded.name, set_id="x", set_name="X", number="1")
+        CatalogCrossRef.objects.create(card=entry, item=seeded)
+        CatalogCrossRef.objects.create(card=entry, item=real_item)
+        CatalogSetGroup.objects.create(group_id=seeded.group_id, set_id="x", shared=1)
+
+        out = StringIO()
+        call_command("seed_benchmark_data", reset_only=True, stdout=out)
+        connection.check_constraints()
+        self.assertIn("Done ✅", out.getvalue())
+        self.assertFalse(get_user_model().objects.filter(username__startswith="bench_user_").exists())
+        self.assertEqual(list(CatalogItem.objects.values_list("pk", flat=True)), [real_item.pk])
+        self.assertEqual(list(CatalogCrossRef.objects.values_list("item_id", flat=True)), [real_item.pk])
+        self.assertFalse(CatalogSetGroup.objects.exists())
+        self.assertIsNone(Card.objects.get(user=real_user).catalog_item_id)
+        self.assertFalse(PriceSnapshot.objects.exists())
+
+
+TCGCSV_HEADER = "productId,name,extCardText,marketPrice,subTypeName,extNumber,modifiedOn\n"
+
+
+def write_tcgcsv_files(directory, files):
+    """{file name: [(product id, name, market price), ...]} as small TCGCSV exports in `directory`."""
+    for name, rows in files.items():
+        lines = [f'{pid},{title},"long, quoted text",{price},Normal,{pid % 100}/100,2025-01-01T00:00:00\n'
+                 for pid, title, price in rows]
+        (Path(directory) / name).write_text(TCGCSV_HEADER + "".join(lines))
+
+
+
+class ImportTcgcsvTests(TestCase):
+    FILES = {
+        "a.csv": [(101, "Pikachu", "1.50"), (102, "Raichu", "3.00")],
+        "b.csv": [(201, "Bulbasaur", "0.75")],
+        "c.csv": [(301, "Mew", "9.99"), (302, "Mewtwo", "12.00")],
+    }
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        write_tcgcsv_files(self.dir, self.FILES)
+
+    def assertImported(self):
+        self.assertEqual(
+            dict(CatalogItem.objects.values_list("product_id", "latest_market")),
+            {pid: Decimal(price) for rows in self.FILES.values() for pid, _, price in rows},
+        )
+
+    def test_shadow_import_with_several_workers(self):
+        out = StringIO()
+        # closing it would drop the shadow import's TEMP tables (a no-op on the in-memory test DB)
+        with mock.patch.object(connection, "close", side_effect=AssertionError("closed the writer connection")):
+            call_command("import_tcgcsv", str(self.dir), shadow=True, workers=2, stdout=out)
+        self.assertIn("with 2 parser process(es)", out.getvalue())
+        self.assertIn("items_created=5", out.getvalue())
+        self.assertImported()
+
+    def test_capture_now_snapshots_unchanged_rows_unless_skipping_unchanged_prices(self):
+        for _ in range(2):
+            call_command("import_tcgcsv", str(self.dir), capture_now=True, workers=1, stdout=StringIO())
+        self.assertEqual(PriceSnapshot.objects.count(), 10)
+
+        out = StringIO()
+        call_command("import_tcgcsv", str(self.dir), capture_now=True, skip_unchanged_prices=True, workers=1, stdout=out)
+        self.assertEqual(PriceSnapshot.objects.count(), 10)
+        self.assertIn("prices_confirmed=5", out.getvalue())
+        self.assertEqual(CatalogItem.objects.filter(price_confirmed_at__isnull=False).count(), 5)
+
+    def test_directories_only_pick_up_tcgcsv_exports(self):
+        with zipfile.ZipFile(self.dir / "catalog.zip", "w") as z:
+            z.writestr("cards/base1.json", "[]")
+        with zipfile.ZipFile(self.dir / "exports.zip", "w") as z:
+            z.writestr("d.csv", TCGCSV_HEADER + "401,Eevee,,2.00,Normal,1/1,2025-01-01T00:00:00\n")
+        (self.dir / "notes.csv").write_text("title,body\nhello,world\n")
+        expected = [self.dir / n for n in ("a.csv", "b.csv", "c.csv", "exports.zip")]
+        self.assertEqual(expand_paths([str(self.dir)]), expected)
+        self.assertEqual(expand_paths([str(self.dir / "*")]), expected)
+
+    def test_parallel_parse_leaves_the_callers_transaction_alone(self):
+        paths = expand_paths([str(self.dir)])
+        closing = mock.patch.object(connection, "close", side_effect=AssertionError("closed mid-transaction"))
+        with transaction.atomic(), closing:
+            Card.objects.create(user=get_user_model().objects.create_user("atomic"), name="Before")
+            rows = list(parse_files(paths, {}, workers=2))
+            self.assertTrue(connection.in_atomic_block)
+            self.assertEqual(Card.objects.filter(name="Before").count(), 1)
+        self.assertEqual(sorted(r.product_id for r in rows), [101, 102, 201, 301, 302])
+
+    def test_values_past_the_header_are_dropped(self):
+        text = "productId,name\n7,Eevee,stray,values,Normal,9/9\n8\n"
+        rows = list(read_projected(StringIO(text)))
+        self.assertEqual(rows[0][:2], ("7", "Eevee"))
+        self.assertEqual(set(rows[0][2:]) | set(rows[1][1:]), {""})
+
+    def test_parser_task_hands_rows_over_in_chunks(self):
+        handed = []
+        put = mock.Mock(put=handed.append)
+        with mock.patch("tracker.services.tcgcsv.PARSE_CHUNK", 1):
+            parse_file(self.dir / "a.csv", {}, put)
+        self.assertEqual([c and [r.product_id for r in c] for c in handed], [[101], [102], None])
+
+
+class CatalogResolverTests(TestCase):
+    def setUp(self):
+        self.umbreon = CatalogItem.objects.create(product_id=1, name="Umbreon V", card_number="4", printing="Normal")
+        self.entry = CardCatalog.objects.create(
+            catalog_id="swsh7-4", name="Umbreon V", set_id="swsh7", set_name="Evolving Skies", number="4",
+        )
+        CatalogCrossRef.objects.create(card=self.entry, item=self.umbreon)
+        self.resolver = CatalogResolver()
+
+    def match(self, name, set_name):
+        return self.resolver.match_card(Card(name=name, set_name=set_name, card_number="4", printing="Normal"))
+
+    def test_number_and_printing_without_a_name_match_is_not_confident(self):
+        match = self.match("Charizard", "Some Typo Sett")
+        self.assertEqual((match.item.pk, match.confident), (self.umbreon.pk, False))
+        self.assertLess(match.score, CARD_MIN_SCORE)
+
+    def test_set_and_number_entry_needs_the_name_too(self):
+        match = self.match("Charizard", "Evolving Skies")
+        self.assertIsNone(match.catalog)
+        self.assertFalse(match.confident)
+
+    def test_partial_and_exact_names_link(self):
+        self.assertTrue(self.match("Umbreon", "Some Typo Sett").confident)
+        match = self.match("Umbreon V", "Evolving Skies")
+        self.assertEqual((match.item.pk, match.catalog.pk, match.confident), (self.umbreon.pk, self.entry.pk, True))
+
+    def test_link_card_leaves_an_unconfident_card_unlinked(self):
+        with mock.patch("tracker.services.resolver.get_resolver", return_value=self.resolver):
+            card = Card(name="Charizard", set_name="Some Typo Sett", card_number="4", printing="Normal")
+            link_card(card)
+            self.assertIsNone(card.catalog_item_id)
+            card = Card(name="Umbreon V", set_name="Evolving Skies", card_number="4", printing="Normal")
+            link_card(card)
+            self.assertEqual((card.catalog_item_id, card.catalog_id), (self.umbreon.pk, self.entry.pk))
+
+
+class LatestPriceTests(TestCase):
+    def setUp(self):
+        self.item = CatalogItem.objects.create(product_id=1, name="Charizard")
+
+    def snap(self, day, market):
+        return PriceSnapshot.objects.create(item=self.item, captured_at=datetime(2024, 1, day, tzinfo=timezone.utc), market=market)
+
+    def latest(self):
+        self.item.refresh_from_db()
+        return self.item.latest_snapshot_id, self.item.latest_market
+
+    def test_an_older_snapshot_does_not_replace_the_latest(self):
+        newest = self.snap(5, "20")
+        self.snap(3, "10")
+        self.assertEqual(self.latest(), (newest.pk, Decimal("20.00")))
+
+    def test_moving_or_deleting_the_latest_falls_back_to_the_history(self):
+        older, newest = self.snap(3, "10"), self.snap(5, "20")
+        newest.captured_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        newest.save()
+        self.assertEqual(self.latest(), (older.pk, Decimal("10.00")))
+        older.delete()
+        self.assertEqual(self.latest(), (newest.pk, Decimal("20.00")))
+        newest.delete()
+        self.assertEqual(self.latest(), (None, None))
+
+    def test_valuation_reads_the_latest_price_without_the_history(self):
+        user = get_user_model().objects.create_user("latest")
+        card = Card.objects.create(user=user, name="Charizard", catalog_item=self.item)
+        self.snap(3, "10")
+        self.snap(5, "20")
+        with self.assertNumQueries(1):
+            self.assertEqual(Card.objects.with_valuation().get(pk=card.pk).current_market_value, Decimal("20.00"))
+
+
+class PortfolioTimelineTests(TestCase):
+    START = date(2024, 3, 1)
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("timeline")
+        item = CatalogItem.objects.create(product_id=1, name="Charizard")
+        self.card = Card.objects.create(user=self.user, name="Charizard", catalog_item=item)
+        box = SealedProduct.objects.create(user=self.user, name="Booster Box")
+        PriceSnapshot.objects.create(item=item, captured_at=datetime(2024, 2, 1, 12, tzinfo=timezone.utc), market="10")
+        PriceSnapshot.objects.create(item=item, captured_at=datetime(2024, 3, 2, 12, tzinfo=timezone.utc), market="15")
+        Purchase.objects.create(user=self.user, card=self.card, quantity=2, price_each="8", date=self.START)
+        Purchase.objects.create(user=self.user, sealed_product=box, quantity=1, price_each="100", date=self.START)
+        manual = MarketPrice.objects.create(sealed_product=box, price="120")
+        MarketPrice.objects.filter(pk=manual.pk).update(date=datetime(2024, 3, 3, 12, tzinfo=timezone.utc))  # auto_now_add
+        Sale.objects.create(user=self.user, card=self.card, price="20", date=self.day(3))
+
+    def day(self, n):
+        return self.START + timedelta(days=n - 1)
+
+    def points(self):
+        return list(PortfolioValuePoint.objects.filter(user=self.user).order_by("date")
+                    .values_list("date", "market_value", "total_spent"))
+
+    def test_replays_holdings_and_as_of_prices_per_day(self):
+        self.assertEqual(extend_timeline(self.user.pk, through=self.day(4)), 4)
+        self.assertEqual(self.points(), [
+            (self.day(1), Decimal("20.00"), Decimal("116.00")),
+            (self.day(2), Decimal("30.00"), Decimal("116.00")),
+            (self.day(3), Decimal("135.00"), Decimal("116.00")),
+            (self.day(4), Decimal("135.00"), Decimal("116.00")),
+        ])
+
+    def test_extends_from_the_last_point_and_rebuilds_after_a_backdated_change(self):
+        extend_timeline(self.user.pk, through=self.day(3))
+        self.assertEqual(extend_timeline(self.user.pk, through=self.day(3)), 0)
+        self.assertEqual(extend_timeline(self.user.pk, through=self.day(5)), 2)
+
+        Sale.objects.create(user=self.user, card=self.card, price="20", date=self.day(2))
+        self.assertEqual([d for d, _, _ in self.points()], [self.day(1)])
+        self.assertEqual(extend_timeline(self.user.pk, through=self.day(5)), 4)
+        incremental = self.points()
+
+        PortfolioValuePoint.objects.all().delete()
+        extend_timeline(self.user.pk, through=self.day(5))
+        self.assertEqual(self.points(), incremental)
+        self.assertEqual([v for _, v, _ in incremental], [Decimal(v) for v in ("20.00", "15.00", "120.00", "120.00", "120.00")])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("pages")
+        card = Card.objects.create(user=self.user, name="Pikachu")
+        # ties on date, so pages have to break them by id
+        for day in (1, 1, 2, 2, 2, 3, 4):
+            Purchase.objects.create(user=self.user, card=card, price_each=str(day), date=date(2024, 1, day))
+        self.purchases = Purchase.objects.filter(user=self.user)
+
+    def page(self, **params):
+        return keyset_paginate(self.purchases, {"per_page": 3, **params}, sorts={"date": "date"}, default_sort="-date")
+
+    def test_walks_every_row_once_forwards_and_back(self):
+        expected = list(self.purchases.order_by("-date", "-pk").values_list("pk", flat=True))
+        pages, page = [], self.page()
+        while True:
+            pages.append([p.pk for p in page])
+            if not page.next_cursor:
+                break
+            page = self.page(after=page.next_cursor)
+        self.assertEqual([pk for chunk in pages for pk in chunk], expected)
+        self.assertEqual([len(chunk) for chunk in pages], [3, 3, 1])
+
+        back = []
+        while page.prev_cursor:
+            page = self.page(before=page.prev_cursor)
+            back.insert(0, [p.pk for p in page])
+        self.assertEqual(back, pages[:-1])
+
+    def test_cursor_from_another_sort_or_garbage_starts_over(self):
+        first = [p.pk for p in self.page()]
+        other = self.page(sort="date").next_cursor
+        self.assertEqual([p.pk for p in self.page(after=other)], first)
+        self.assertEqual([p.pk for p in self.page(after="not-a-cursor")], first)
+        self.assertIsNone(self.page().prev_cursor)
+
+    def test_list_view_sorts_by_a_computed_profit_column(self):
+        for name, price in (("Eevee", "5"), ("Mew", "50"), ("Snorlax", "20")):
+            card = Card.objects.create(user=self.user, name=name)
+            MarketPrice.objects.create(card=card, price=price)
+        Card.objects.all().refresh_valuation()
+        self.client.force_login(self.user)
+        response = self.client.get("/cards/", {"sort": "-unrealized", "per_page": 2})
+        self.assertEqual([c.name for c in response.context["page"]], ["Mew", "Snorlax"])
+        response = self.client.get("/cards/", {"sort": "-unrealized", "per_page": 2, "after": response.context["page"].next_cursor})
+        self.assertEqual([c.name for c in response.context["page"]], ["Eevee", "Pikachu"])
+
+
+def tcgcsv_row(pid, name, market, modified="2025-01-01T00:00:00"):
+    """A parsed TCGCSV row for a single card."""
+    values = dict.fromkeys(COLUMNS, "") | {
+        "productId": str(pid), "name": name, "marketPrice": market, "modifiedOn": modified, "extNumber": "1/100",
+    }
+    return parse_row(tuple(values[c] for c in COLUMNS))
+
+
+class WriteBatchTests(TestCase):
+    def queries(self, rows):
+        with CaptureQueriesContext(connection) as ctx:
+            write_batch(rows)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        small = self.queries([tcgcsv_row(pid, f"Card {pid}", "1.00") for pid in range(3)])
+        large = self.queries([tcgcsv_row(pid, f"Card {pid}", "1.00") for pid in range(100, 130)])
+        self.assertEqual(small, large)
+        self.assertEqual((CatalogItem.objects.count(), PriceSnapshot.objects.count()), (33, 33))
+
+    def test_a_later_row_for_the_same_item_wins(self):
+        stats = write_batch([tcgcsv_row(1, "Pikachu", "1.00"), tcgcsv_row(1, "Pikachu V", "2.00")])
+        self.assertEqual((stats.items_created, stats.prices_upserted), (1, 2))
+        item = CatalogItem.objects.get()
+        self.assertEqual((item.name, item.latest_market), ("Pikachu V", Decimal("2.00")))
+        self.assertEqual(list(PriceSnapshot.objects.values_list("market", flat=True)), [Decimal("2.00")])
+
+    def test_rows_unchanged_since_the_last_import_are_skipped_unless_forced(self):
+        rows = [tcgcsv_row(1, "Pikachu", "1.00"), tcgcsv_row(2, "Raichu", "3.00")]
+        write_batch(rows)
+        stats = write_batch(rows + [tcgcsv_row(3, "Pichu", "0.50")])
+        self.assertEqual((stats.rows_unchanged, stats.items_created, stats.items_updated), (2, 1, 0))
+        stats = write_batch(rows, force=True)
+        self.assertEqual((stats.rows_unchanged, stats.items_updated, stats.prices_upserted), (0, 2, 2))
+
+
+class SkipUnchangedPricesTests(TestCase):
+    def setUp(self):
+        write_batch([tcgcsv_row(1, "Pikachu", "1.00", "2025-01-01T00:00:00")])
+        self.item = CatalogItem.objects.get()
+
+    def later(self, market, modified="2025-01-02T00:00:00"):
+        return [tcgcsv_row(1, "Pikachu", market, modified)]
+
+    def test_repeated_prices_confirm_instead_of_adding_a_snapshot(self):
+        stats = write_batch(self.later("1.00"), skip_unchanged_prices=True)
+        self.assertEqual((stats.prices_upserted, stats.prices_confirmed), (0, 1))
+        self.item.refresh_from_db()
+        self.assertEqual(PriceSnapshot.objects.count(), 1)
+        self.assertEqual(self.item.prices_as_of, datetime(2025, 1, 2, tzinfo=timezone.utc))
+
+    def test_a_changed_price_or_an_older_row_still_gets_a_snapshot(self):
+        stats = write_batch(self.later("1.25"), skip_unchanged_prices=True)
+        self.assertEqual((stats.prices_upserted, stats.prices_confirmed), (1, 0))
+        stats = write_batch(self.later("1.00", "2024-12-31T00:00:00"), skip_unchanged_prices=True)
+        self.assertEqual((stats.prices_upserted, stats.prices_confirmed), (1, 0))
+        self.assertEqual(PriceSnapshot.objects.count(), 3)
+
+    def test_shadow_import_confirms_the_same_way(self):
+        with ShadowImport(skip_unchanged_prices=True) as shadow:
+            stats = shadow.add(self.later("1.00"))
+            shadow.apply()
+        self.assertEqual((stats.prices_upserted, stats.prices_confirmed), (0, 1))
+        self.assertEqual(PriceSnapshot.objects.count(), 1)
+        self.assertEqual(CatalogItem.objects.get().price_confirmed_at, datetime(2025, 1, 2, tzinfo=timezone.utc))
+
+
+def write_catalog_zip(path, sets):
+    """{set_id: (set name, [(card id, name, number), ...])} as a pokemon-tcg-data style ZIP."""
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("data-master/sets/en.json", json.dumps([{"id": sid, "name": name} for sid, (name, _) in sets.items()]))
+        for sid, (_, cards) in sets.items():
+            z.writestr(f"data-master/cards/en/{sid}.json", json.dumps([
+                {"id": cid, "name": name, "number": number, "rarity": "Common", "images": {"small": f"{cid}.png"}}
+                for cid, name, number in cards
+            ]))
+
+
+class ImportCatalogTests(TestCase):
+    SETS = {
+        "base1": ("Base", [("base1-4", "Charizard", "4"), ("base1-58", "Pikachu", "58")]),
+        "swsh7": ("Evolving Skies", [("swsh7-95", "Umbreon V", "95")]),
+    }
+
+    def setUp(self):
+        self.zip = Path(self.enterContext(tempfile.TemporaryDirectory())) / "catalog.zip"
+        self.user = get_user_model().objects.create_user("catalog")
+
+    def run_import(self, sets, **opts):
+        write_catalog_zip(self.zip, sets)
+        out = StringIO()
+        call_command("import_catalog", str(self.zip), workers=1, stdout=out, **opts)
+        return out.getvalue()
+
+    def test_resync_updates_in_place_and_keeps_links(self):
+        self.run_import(self.SETS)
+        charizard = CardCatalog.objects.get(catalog_id="base1-4")
+        card = Card.objects.create(user=self.user, name="Charizard", catalog=charizard)
+
+        sets = {**self.SETS, "base1": ("Base Set", [("base1-4", "Charizard", "4")])}
+        out = self.run_import(sets, force=True)
+        self.assertIn("created=0, updated=1, unchanged=1, deleted=1", out)
+        card.refresh_from_db()
+        self.assertEqual(card.catalog_id, charizard.pk)
+        self.assertEqual(card.catalog.set_name, "Base Set")
+        self.assertFalse(CardCatalog.objects.filter(catalog_id="base1-58").exists())
+
+    def test_a_removed_entry_only_unlinks_its_own_cards(self):
+        self.run_import(self.SETS)
+        pikachu = Card.objects.create(user=self.user, name="Pikachu", catalog=CardCatalog.objects.get(catalog_id="base1-58"))
+        umbreon = Card.objects.create(user=self.user, name="Umbreon V", catalog=CardCatalog.objects.get(catalog_id="swsh7-95"))
+        self.run_import({**self.SETS, "base1": ("Base", [("base1-4", "Charizard", "4")])})
+        pikachu.refresh_from_db()
+        umbreon.refresh_from_db()
+        self.assertIsNone(pikachu.catalog_id)
+        self.assertIsNotNone(umbreon.catalog_id)
+
+    def test_no_delete_and_limit_keep_missing_entries(self):
+        self.run_import(self.SETS)
+        self.run_import({"base1": self.SETS["base1"]}, no_delete=True)
+        self.assertEqual(CardCatalog.objects.count(), 3)
+        self.run_import({"swsh7": self.SETS["swsh7"]}, limit=1)
+        self.assertEqual(CardCatalog.objects.count(), 3)
+
+
+class CatalogSetChangeTests(TestCase):
+    SETS = ImportCatalogTests.SETS
+
+    def setUp(self):
+        self.zip = Path(self.enterContext(tempfile.TemporaryDirectory())) / "catalog.zip"
+
+    def run_import(self, sets, **opts):
+        write_catalog_zip(self.zip, sets)
+        out = StringIO()
+        call_command("import_catalog", str(self.zip), **{"workers": 1, **opts}, stdout=out)
+        return out.getvalue()
+
+    def test_unchanged_sets_are_skipped_and_their_entries_kept(self):
+        self.assertIn("sets_read=2, sets_unchanged=0", self.run_import(self.SETS))
+        self.assertIn("sets_read=0, sets_unchanged=2", self.run_import(self.SETS))
+
+        sets = {**self.SETS, "swsh7": ("Evolving Skies", [("swsh7-95", "Umbreon V", "95"), ("swsh7-215", "Umbreon VMAX", "215")])}
+        out = self.run_import(sets)
+        self.assertIn("created=1, updated=0, unchanged=1, deleted=0", out)
+        self.assertIn("sets_read=1, sets_unchanged=1", out)
+        self.assertEqual(CardCatalog.objects.count(), 4)
+
+    def test_a_set_dropped_from_the_zip_is_forgotten(self):
+        self.run_import(self.SETS)
+        self.run_import({"base1": self.SETS["base1"]})
+        self.assertEqual(list(CatalogSetState.objects.values_list("set_id", flat=True)), ["base1"])
+        self.assertFalse(CardCatalog.objects.filter(set_id="swsh7").exists())
+
+    def test_workers_parse_the_same_catalog_without_closing_the_connection(self):
+        closing = mock.patch.object(connection, "close", side_effect=AssertionError("closed the connection"))
+        with transaction.atomic(), closing:
+            self.run_import(self.SETS, workers=2)
+        self.assertEqual(
+            set(CardCatalog.objects.values_list("catalog_id", "set_name")),
+            {("base1-4", "Base"), ("base1-58", "Base"), ("swsh7-95", "Evolving Skies")},
+        )
+
+
+class MatchKeyTests(TestCase):
+    def test_normalizers(self):
+        self.assertEqual(norm("  Pikachu & Friends!! "), "pikachu and friends")
+        self.assertEqual([number_key(n) for n in ("004/102", "SV001", "0", "TG07/TG30")], ["4", "sv001", "0", "tg07"])
+        self.assertEqual(token_key("The Pokemon Charizards ex"), "charizard ex")
+
+    def test_save_keeps_keys_in_sync_even_with_update_fields(self):
+        item = CatalogItem.objects.create(product_id=1, name="Charizard ex", card_number="006/165")
+        self.assertEqual((item.name_key, item.number_key, item.token_key), ("charizard ex", "6", "charizard ex"))
+        item.name = "Mew ex"
+        item.save(update_fields=["name"])
+        item.refresh_from_db()
+        self.assertEqual((item.name_key, item.number_key, item.token_key), ("mew ex", "6", "ex mew"))
+
+    def test_bulk_imports_fill_the_keys(self):
+        write_batch([tcgcsv_row(1, "Pikachu V", "1.00")])
+        item = CatalogItem.objects.get()
+        self.assertEqual((item.name_key, item.number_key), ("pikachu v", "1"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_catalog_zip(Path(tmp) / "catalog.zip", {"sv3pt5": ("Scarlet & Violet 151", [("sv3pt5-25", "Pikachu", "025")])})
+            call_command("import_catalog", str(Path(tmp) / "catalog.zip"), workers=1, stdout=StringIO())
+        entry = CardCatalog.objects.get()
+        self.assertEqual((entry.name_key, entry.number_key, entry.set_key), ("pikachu", "25", "scarlet and violet 151"))
+
+
+class LinkToCatalogTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("linker")
+        self.pikachu = CardCatalog.objects.create(catalog_id="sv3pt5-25", name="Pikachu", set_id="sv3pt5",
+                                                  set_name="151", number="25")
+        self.umbreon = CardCatalog.objects.create(catalog_id="swsh7-95", name="Umbreon V", set_id="swsh7",
+                                                  set_name="Evolving Skies", number="95")
+        self.holo = CatalogItem.objects.create(product_id=1, name="Pikachu", card_number="025/165", printing="Holofoil")
+        CatalogCrossRef.objects.create(card=self.pikachu, item=self.holo)
+
+    def link(self, *args, **opts):
+        out = StringIO()
+        call_command("link_to_catalog", *args, stdout=out, **opts)
+        return out.getvalue()
+
+    def card(self, set_name, number, **fields):
+        return Card.objects.create(user=self.user, name=fields.pop("name", "x"), set_name=set_name, card_number=number, **fields)
+
+    def test_set_alias_then_loose_set_names_resolve(self):
+        aliased = self.card("SV: Scarlet & Violet 151", "025/165", printing="Holofoil")
+        loose = self.card("evolving", "95")
+        out = self.link(alias=["SV: Scarlet & Violet 151=sv3pt5"])
+        self.assertIn("Linked=2, Skipped=0, NotFound=0, ItemsLinked=1", out)
+        aliased.refresh_from_db()
+        loose.refresh_from_db()
+        self.assertEqual((aliased.catalog_id, aliased.catalog_item_id, aliased.card_number), (self.pikachu.pk, self.holo.pk, "25/165"))
+        self.assertEqual((loose.catalog_id, loose.set_name), (self.umbreon.pk, "Evolving Skies"))
+
+    def test_a_linked_catalog_item_resolves_through_the_cross_reference(self):
+        card = self.card("", "", catalog_item=self.holo)
+        self.link()
+        card.refresh_from_db()
+        self.assertEqual((card.catalog_id, card.name), (self.pikachu.pk, "Pikachu"))
+
+    def test_queries_do_not_grow_with_the_number_of_cards(self):
+        def queries(n):
+            Card.objects.all().delete()
+            for _ in range(n):
+                self.card("Evolving Skies", "95")
+            with CaptureQueriesContext(connection) as ctx:
+                self.link(batch_size=100)
+            return len(ctx.captured_queries)
+        self.assertEqual(queries(2), queries(20))
+
+    def test_bad_aliases_are_rejected(self):
+        with self.assertRaisesMessage(CommandError, "Expected ALIAS=SET_ID"):
+            self.link(alias=["no set id"])
+        with self.assertRaisesMessage(CommandError, "Unknown set_id 'nope'"):
+            self.link(alias=["Something=nope"])
+
+
+class CatalogAutocompleteTests(TestCase):
+    URL = "/catalog/autocomplete/"
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for pid in range(1, 26):
+            CatalogItem.objects.create(product_id=pid, name=f"Pikachu {pid}", card_number=str(pid))
+        CatalogItem.objects.create(product_id=99, name="Pikachu Booster Box", is_sealed=True)
+        self.user = get_user_model().objects.create_user("complete")
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        return self.client.get(self.URL, params)
+
+    def test_pages_through_one_kind_of_catalog_entry(self):
+        first = self.get(q="pikachu", kind="single").json()
+        second = self.get(q="pikachu", kind="single", page=2).json()
+        self.assertEqual((len(first["results"]), first["more"]), (20, True))
+        self.assertEqual((len(second["results"]), second["more"]), (5, False))
+        texts = [r["text"] for r in first["results"] + second["results"]]
+        self.assertNotIn("Booster Box", " ".join(texts))
+        self.assertEqual([r["text"] for r in self.get(q="pikachu", kind="sealed").json()["results"]],
+                         [str(CatalogItem.objects.get(product_id=99))])
+
+    def test_rejects_unknown_kinds_short_queries_and_anonymous_users(self):
+        self.assertEqual(self.get(q="pikachu", kind="nope").status_code, 400)
+        self.assertEqual(self.get(q="p", kind="single").json(), {"results": [], "more": False})
+        self.client.logout()
+        self.assertEqual(self.get(q="pikachu", kind="single").status_code, 302)
+
+    def test_identical_requests_are_served_from_the_cache(self):
+        with mock.patch("tracker.views.autocomplete", wraps=autocomplete) as search:
+            self.get(q="pikachu", kind="single")
+            self.get(q="pikachu", kind="single")
+            self.get(q="pikachu 2", kind="single")
+        self.assertEqual(search.call_count, 2)
+
+    def test_form_renders_only_the_selected_option(self):
+        item = CatalogItem.objects.get(product_id=7)
+        card = Card.objects.create(user=self.user, name="Pikachu", catalog_item=item)
+        html = str(CardForm(instance=card)["catalog_item"])
+        self.assertEqual(html.count("<option"), 2)
+        self.assertIn(f'value="{item.pk}" selected', html)
+        self.assertIn('data-kind="single"', html)
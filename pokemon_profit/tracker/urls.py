@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path("", views.dashboard, name="dashboard"),
+    path("timeline/", views.timeline, name="timeline"),
     path("cards/", views.card_list, name="card_list"),
     path("sealed/", views.sealed_list, name="sealed_list"),
     path("purchases/", views.purchase_list, name="purchase_list"),
@@ -10,6 +11,8 @@ urlpatterns = [
     path("signup/", views.signup, name="signup"),
     path("login/", views.user_login, name="login"),
     path("logout/", views.user_logout, name="logout"),
+    path("catalog/autocomplete/", views.catalog_autocomplete, name="catalog_autocomplete"),
+    path("catalog/<int:pk>/history/", views.catalog_price_history, name="catalog_price_history"),
     path("cards/add/", views.card_create, name="card_create"),
     path("sealed/add/", views.sealed_create, name="sealed_create"),
     path("purchases/add/", views.purchase_create, name="purchase_create"),
@@ -1,66 +1,100 @@
-from decimal import Decimal
-from django.db.models import Sum
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.cache import cache_page
 from .forms import CardForm, SealedProductForm, PurchaseForm, SaleForm
-from .models import Card, SealedProduct, Purchase, Sale
+from .models import Card, SealedProduct, Purchase, Sale, CatalogItem
+from .pagination import keyset_paginate
+from .services.portfolio import get_summary
+from .services.price_history import price_history
+from .services.resolver import get_resolver, link_card, link_sealed
+from .services.search import AUTOCOMPLETE_KINDS, autocomplete
+from .services.timeline import portfolio_timeline
+
+# public sort key -> model field; each field has a (user, field, id) index
+VALUATION_SORTS = {
+    "market": "cached_market_value",
+    "spent": "cached_total_spent",
+    "sales": "cached_total_sales",
+    "realized": "cached_realized_profit",
+    "unrealized": "cached_unrealized_profit",
+}
+CARD_SORTS = {"name": "name", "set": "set_name", "number": "card_number", "printing": "printing", **VALUATION_SORTS}
+SEALED_SORTS = {"name": "name", "set": "set_name", "quantity": "quantity", **VALUATION_SORTS}
+PURCHASE_SORTS = {"date": "date", "quantity": "quantity", "price": "price_each"}
+SALE_SORTS = {"date": "date", "price": "price", "platform": "platform"}
+AUTOCOMPLETE_MIN_CHARS = 2
+AUTOCOMPLETE_TTL = 60  # seconds; the catalog only changes on import
+PRICE_HISTORY_DAYS = 365
 
 @login_required
 def dashboard(request):
-    user = request.user
+    summary = get_summary(request.user)
 
-    cards_qs = Card.objects.filter(user=user)
-    sealed_qs = SealedProduct.objects.filter(user=user)
-
-    cards_count = cards_qs.count()
-    sealed_count = sealed_qs.count()
-    purchases_count = Purchase.objects.filter(user=user).count()
-    sales_count = Sale.objects.filter(user=user).count()
+    return render(request, "tracker/dashboard.html", {
+        "cards_count": summary.cards_count,
+        "sealed_count": summary.sealed_count,
+        "purchases_count": summary.purchases_count,
+        "sales_count": summary.sales_count,
+        "total_sales": summary.total_sales,
+        "total_spent": summary.total_spent,
+        "realized_profit": summary.realized_profit,
+        "unrealized_profit": summary.unrealized_profit,
+    })
 
-    total_sales = (
-        Sale.objects.filter(user=user)
-        .aggregate(total=Sum("price"))["total"]
-        or Decimal("0")
-    )
+@login_required
+def timeline(request):
+    try:
+        days = max(1, int(request.GET.get("days", 90)))
+    except ValueError:
+        days = 90
 
-    total_spent_cards = sum((c.total_spent for c in cards_qs), Decimal("0"))
-    total_spent_sealed = sum((s.total_spent for s in sealed_qs), Decimal("0"))
-    total_spent = total_spent_cards + total_spent_sealed
+    points = list(portfolio_timeline(request.user, days=days))
 
-    realized_profit = total_sales - total_spent
+    # simple inline SVG line: x = day index, y = market value
+    chart = ""
+    if points:
+        top = max(p.market_value for p in points) or 1
+        step = 600 / max(len(points) - 1, 1)
+        chart = " ".join(
+            f"{i * step:.1f},{200 - float(p.market_value / top) * 200:.1f}" for i, p in enumerate(points)
+        )
 
-    return render(request, "tracker/dashboard.html", {
-        "cards_count": cards_count,
-        "sealed_count": sealed_count,
-        "purchases_count": purchases_count,
-        "sales_count": sales_count,
-        "total_sales": total_sales,
-        "total_spent": total_spent,
-        "realized_profit": realized_profit,
+    return render(request, "tracker/timeline.html", {
+        "points": points[::-1],
+        "chart": chart,
+        "days": days,
     })
 
 @login_required
 def card_list(request):
-    cards = Card.objects.filter(user=request.user).select_related("catalog_item").all()
-    return render(request, "tracker/card_list.html", {"cards" : cards})
+    cards = Card.objects.filter(user=request.user).with_valuation()
+    page = keyset_paginate(cards, request.GET, sorts=CARD_SORTS, default_sort="name")
+    return render(request, "tracker/card_list.html", {"cards" : page, "page": page})
 
 @login_required
 def sealed_list(request):
-    sealed = SealedProduct.objects.filter(user=request.user).select_related("catalog_item").all()
-    return render(request, "tracker/sealed_list.html", {"sealed" : sealed})
+    sealed = SealedProduct.objects.filter(user=request.user).with_valuation()
+    page = keyset_paginate(sealed, request.GET, sorts=SEALED_SORTS, default_sort="name")
+    return render(request, "tracker/sealed_list.html", {"sealed" : page, "page": page})
 
 @login_required
 def purchase_list(request):
-    purchases = Purchase.objects.filter(user=request.user).select_related("card", "sealed_product").order_by("-date")
-    return render(request, "tracker/purchase_list.html", {"purchases" : purchases})
+    purchases = Purchase.objects.filter(user=request.user).select_related("card", "sealed_product")
+    page = keyset_paginate(purchases, request.GET, sorts=PURCHASE_SORTS, default_sort="-date")
+    return render(request, "tracker/purchase_list.html", {"purchases" : page, "page": page})
 
 @login_required
 def sale_list(request):
-    sales = (
-Sale.objects.filter(user=request.user).select_related("card", "sealed_product").order_by("-date"))
-    return render(request, "tracker/sale_list.html", {"sales": sales})
+    sales = Sale.objects.filter(user=request.user).select_related("card", "sealed_product")
+    page = keyset_paginate(sales, request.GET, sorts=SALE_SORTS, default_sort="-date")
+    return render(request, "tracker/sale_list.html", {"sales": page, "page": page})
+
 def signup(request):
     if request.user.is_authenticated:
         return redirect("dashboard")
@@ -93,6 +127,53 @@ def user_logout(request):
     logout(request)
     return redirect("login")
         
+@login_required
+@cache_page(AUTOCOMPLETE_TTL)
+def catalog_autocomplete(request):
+    kind = request.GET.get("kind", "")
+    if kind not in AUTOCOMPLETE_KINDS:
+        return JsonResponse({"error": f"unknown kind {kind!r}"}, status=400)
+    q = request.GET.get("q", "").strip()
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
+    if len(q) < AUTOCOMPLETE_MIN_CHARS:
+        return JsonResponse({"results": [], "more": False})
+    return JsonResponse(autocomplete(q, kind, page=page))
+
+@login_required
+def catalog_price_history(request, pk):
+    """
+    An item's market-price bars over the last `days` days, from the
+    coarsest retention tier holding that range (see compact_prices).
+    """
+    item = get_object_or_404(CatalogItem, pk=pk)
+    try:
+        days = max(1, int(request.GET.get("days", PRICE_HISTORY_DAYS)))
+    except ValueError:
+        days = PRICE_HISTORY_DAYS
+
+    today = timezone.now().date()
+    period, bars = price_history(item.pk, today - timedelta(days=days - 1), today)
+    return JsonResponse({
+        "period": period,
+        "bars": [
+            {"start": b.start.isoformat(), "open": b.open, "high": b.high, "low": b.low, "close": b.close,
+             "samples": b.samples}
+            for b in bars
+        ],
+    })
+
+def _suggest(form, match):
+    """Pre-selects a confident catalog match on an unlinked holding's form, or names a weaker one."""
+    if match.item is None:
+        return
+    if match.confident:
+        form.initial["catalog_item"] = match.item.pk
+    else:
+        form.fields["catalog_item"].help_text = f"Possible match: {match.item.name} [{match.item.printing}]"
+
 @login_required
 def card_create(request):
     if request.method == "POST":
@@ -100,6 +181,7 @@ def card_create(request):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.user = request.user
+            link_card(obj, keep=form.changed_data)
             obj.save()
             form.save_m2m()
             return redirect("card_list")
@@ -114,6 +196,7 @@ def sealed_create(request):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.user = request.user
+            link_sealed(obj, keep=form.changed_data)
             obj.save()
             return redirect("sealed_list")
     else:
@@ -152,6 +235,8 @@ def sale_create(request):
                 form.add_error("card", "That card is not yours.")
             elif obj.sealed_product and obj.sealed_product.user_id != request.user.id:
                 form.add_error("sealed_product", "That sealed product is not yours.")
+            elif obj.lot and obj.lot.user_id != request.user.id:
+                form.add_error("lot", "That purchase is not yours.")
             else:
                 obj.save()
                 return redirect("sale_list")
@@ -159,6 +244,7 @@ def sale_create(request):
         form = SaleForm()
         form.fields["card"].queryset = form.fields["card"].queryset.filter(user=request.user)
         form.fields["sealed_product"].queryset = form.fields["sealed_product"].queryset.filter(user=request.user)
+        form.fields["lot"].queryset = Purchase.objects.filter(user=request.user)
     return render(request, "tracker/form.html", {"form": form, "title": "Add Sale"})
 
 @login_required
@@ -169,11 +255,14 @@ def card_edit(request, pk):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.user = request.user
+            link_card(obj, keep=form.changed_data)
             obj.save()
             form.save_m2m()
             return redirect("card_list")
     else:
         form = CardForm(instance=card)
+        if card.catalog_item_id is None:
+            _suggest(form, get_resolver().match_card(card))
     return render(request, "tracker/form.html", {"form": form, "title": "Edit Card"})
 
 @login_required
@@ -196,10 +285,13 @@ def sealed_edit(request, pk):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.user = request.user
+            link_sealed(obj, keep=form.changed_data)
             obj.save()
             return redirect("sealed_list")
     else:
         form = SealedProductForm(instance=sealed)
+        if sealed.catalog_item_id is None:
+            _suggest(form, get_resolver().match_sealed(sealed))
     return render(request, "tracker/form.html", {"form": form, "title": "Edit Sealed Product"})
 
 @login_required
@@ -252,6 +344,7 @@ def sale_edit(request, pk):
         form = SaleForm(request.POST, instance=sale)
         form.fields["card"].queryset = Card.objects.filter(user=request.user)
         form.fields["sealed_product"].queryset = SealedProduct.objects.filter(user=request.user)
+        form.fields["lot"].queryset = Purchase.objects.filter(user=request.user)
         if form.is_valid():
             obj = form.save(commit=False)
             obj.user = request.user
@@ -261,6 +354,7 @@ def sale_edit(request, pk):
         form = SaleForm(instance=sale)
         form.fields["card"].queryset = Card.objects.filter(user=request.user)
         form.fields["sealed_product"].queryset = SealedProduct.objects.filter(user=request.user)
+        form.fields["lot"].queryset = Purchase.objects.filter(user=request.user)
     return render(request, "tracker/form.html", {"form": form, "title": "Edit Sale"})
 
 @login_required